@@ -0,0 +1,374 @@
+"""
+AQL, the Atom8 script language. A script compiles to the same steps the editor builds, and is expanded lazily,
+so a loop over a large dataset never holds all of its steps in memory.
+
+One statement per line; '#' starts a comment at the start of a line, or after a space when a space or the end
+of the line follows it, so selectors such as css #login and URL fragments keep their '#'; values with spaces go
+in quotes. ${name} and ${name.key} are
+replaced with variables, loop items and block parameters when the statement runs.
+
+    set <name> = <value>
+    navigate <url> [strategy normal|eager|none] [ready dom|idle|<by> <locator>] [as <description>]
+    click <by> <locator> [as <description>]
+    type <by> <locator> <text> [as <description>]
+    screenshot <file> [element <by> <locator> | clip <x,y,width,height>]
+    js <code> [as <description>]
+    sleep <seconds>
+    python <path> [in process|pool|background] [timeout <seconds>] [result <name>] [as <description>]
+    maximize
+    compare <reference> <test> <output> [element <by> <locator> | clip <x,y,width,height>]
+    assert page-load|step-duration under <milliseconds>
+    assert transfer-size under <kilobytes>
+
+    for <name> in csv <path> | json <path> | list <value>... | range <start> <stop>:
+        <statements>
+    end
+
+    block <name> [<parameter>...]:
+        <statements>
+    end
+    call <name> [<argument>...]
+
+<by> is one of xpath, css, id, name, class, tag, link or partial-link. Dataset and Python script paths are
+relative to the script.
+"""
+import csv
+import json
+import os
+import re
+import shlex
+from collections import ChainMap
+
+LOCATORS = {
+    "xpath": "XPath",
+    "css": "CSS Selector",
+    "id": "ID",
+    "name": "Name",
+    "class": "Class Name",
+    "tag": "Tag Name",
+    "link": "Link Text",
+    "partial-link": "Partial Link Text",
+}
+
+READY = {"dom": "DOMContentLoaded", "idle": "Network Idle", "load": "Page Load Strategy"}
+
+SCRIPT_MODES = {"process": "In Process", "pool": "Process Pool", "background": "Background"}
+
+ASSERTIONS = {
+    "page-load": "Assert Page Load Under",
+    "step-duration": "Assert Step Duration Under",
+    "transfer-size": "Assert Transfer Size Under",
+}
+
+MAX_CALL_DEPTH = 50
+
+VARIABLE = re.compile(r"\$\{([A-Za-z_][\w.]*)\}")
+
+
+class AqlError(ValueError):
+    def __init__(self, message, line=None):
+        super().__init__(f"Line {line}: {message}" if line else message)
+        self.line = line
+
+
+class Statement:
+    def __init__(self, line, command, args, body=None):
+        self.line = line
+        self.command = command
+        self.args = args
+        self.body = body
+
+
+class Program:
+    def __init__(self, statements, blocks, base_dir):
+        self.statements = statements
+        self.blocks = blocks
+        self.baseDir = base_dir
+
+
+def _strip_comment(text):
+    """
+    Text before a comment: a '#' outside quotes that starts the line, or stands alone after whitespace.
+    """
+    quote = None
+    escaped = False
+    for index, char in enumerate(text):
+        if escaped:
+            escaped = False
+        elif char == "\\" and quote != "'":
+            escaped = True
+        elif quote:
+            if char == quote:
+                quote = None
+        elif char in "'\"":
+            quote = char
+        elif char == "#":
+            before, after = text[:index], text[index + 1:index + 2]
+            if not before.strip() or before[-1].isspace() and (not after or after.isspace()):
+                return before
+    return text
+
+
+def _tokenize(text, line):
+    try:
+        return shlex.split(text)
+    except ValueError as e:
+        raise AqlError(str(e), line)
+
+
+def _options(args, line, allowed, start):
+    """
+    Parse trailing 'keyword value...' options, e.g. ['as', 'Log in'] -> {'as': ['Log in']}.
+    allowed maps each keyword to how many values it takes.
+    """
+    options = {}
+    index = start
+    while index < len(args):
+        keyword = args[index]
+        if keyword not in allowed:
+            raise AqlError(f"Unexpected '{keyword}'", line)
+        count = allowed[keyword]
+        if keyword == "ready" and index + 1 < len(args) and args[index + 1] in LOCATORS:
+            count = 2
+        values = args[index + 1:index + 1 + count]
+        if len(values) < count:
+            raise AqlError(f"'{keyword}' needs {count} value{'s' if count > 1 else ''}", line)
+        options[keyword] = values
+        index += 1 + count
+    return options
+
+
+# Positional argument counts and trailing options of each step command.
+STEP_COMMANDS = {
+    "navigate": (1, {"strategy": 1, "ready": 1, "as": 1}),
+    "click": (2, {"as": 1}),
+    "type": (3, {"as": 1}),
+    "screenshot": (1, {"element": 2, "clip": 1}),
+    "js": (1, {"as": 1}),
+    "sleep": (1, {}),
+    "python": (1, {"in": 1, "timeout": 1, "result": 1, "as": 1}),
+    "maximize": (0, {}),
+    "compare": (3, {"element": 2, "clip": 1}),
+    "assert": (3, {}),
+}
+
+
+def _check_statement(command, args, line):
+    if command == "set":
+        if len(args) != 3 or args[1] != "=" or not args[0].isidentifier():
+            raise AqlError("Expected: set <name> = <value>", line)
+    elif command == "call":
+        if not args:
+            raise AqlError("Expected: call <name> [<argument>...]", line)
+    elif command in STEP_COMMANDS:
+        count, allowed = STEP_COMMANDS[command]
+        if len(args) < count:
+            raise AqlError(f"'{command}' needs {count} argument{'s' if count != 1 else ''}", line)
+        options = _options(args, line, allowed, count)
+        if command in ("click", "type") and args[0] not in LOCATORS:
+            raise AqlError(f"Unknown locator '{args[0]}'; use one of {', '.join(LOCATORS)}", line)
+        if command == "navigate":
+            if options.get("strategy", ["normal"])[0] not in ("normal", "eager", "none"):
+                raise AqlError("Strategy must be normal, eager or none", line)
+            ready = options.get("ready", ["load"])[0]
+            if ready not in READY and ready not in LOCATORS:
+                raise AqlError(f"Unknown ready condition '{ready}'", line)
+        if command == "python" and options.get("in", ["process"])[0] not in SCRIPT_MODES:
+            raise AqlError(f"Scripts run in {', '.join(SCRIPT_MODES)}", line)
+        if "element" in options and options["element"][0] not in LOCATORS:
+            raise AqlError(f"Unknown locator '{options['element'][0]}'; use one of {', '.join(LOCATORS)}", line)
+        if "element" in options and "clip" in options:
+            raise AqlError("Capture either an element or a clip region, not both", line)
+        if command == "assert" and (args[0] not in ASSERTIONS or args[1] != "under"):
+            raise AqlError(f"Expected: assert {'|'.join(ASSERTIONS)} under <budget>", line)
+    else:
+        raise AqlError(f"Unknown command '{command}'", line)
+
+
+def _check_loop(args, line):
+    if len(args) < 3 or args[1] != "in" or not args[0].isidentifier():
+        raise AqlError("Expected: for <name> in csv|json|list|range ...:", line)
+    source = args[2]
+    if source in ("csv", "json") and len(args) != 4 or source == "range" and len(args) != 5:
+        raise AqlError(f"Expected: for <name> in {source} " + ("<start> <stop>" if source == "range" else "<path>"),
+                       line)
+    if source not in ("csv", "json", "list", "range"):
+        raise AqlError(f"Unknown dataset '{source}'; use csv, json, list or range", line)
+
+
+def parse(source, base_dir="."):
+    """
+    Compile AQL source into a Program, checking every statement and block call. Raises AqlError with the line.
+    """
+    root = []
+    stack = [(None, root)]
+    blocks = {}
+    calls = []
+
+    for number, text in enumerate(source.splitlines(), 1):
+        stripped = _strip_comment(text).strip()
+        opens = stripped.endswith(":")
+        args = _tokenize(stripped[:-1] if opens else stripped, number)
+        if not args:
+            continue
+        command, args = args[0].lower(), args[1:]
+
+        if command == "end":
+            if len(stack) == 1:
+                raise AqlError("'end' without a matching for or block", number)
+            stack.pop()
+            continue
+        if opens:
+            if command == "for":
+                _check_loop(args, number)
+            elif command == "block":
+                if not args or not all(arg.isidentifier() for arg in args):
+                    raise AqlError("Expected: block <name> [<parameter>...]:", number)
+                if len(stack) > 1:
+                    raise AqlError("Blocks must be defined at the top level", number)
+                if args[0] in blocks:
+                    raise AqlError(f"Block '{args[0]}' is already defined", number)
+            else:
+                raise AqlError("Only for and block statements end with ':'", number)
+            statement = Statement(number, command, args, [])
+            if command == "block":
+                blocks[args[0]] = statement
+            else:
+                stack[-1][1].append(statement)
+            stack.append((statement, statement.body))
+            continue
+
+        _check_statement(command, args, number)
+        if command == "call":
+            calls.append((args[0], len(args) - 1, number))
+        stack[-1][1].append(Statement(number, command, args))
+
+    if len(stack) > 1:
+        raise AqlError(f"'{stack[-1][0].command}' is missing its 'end'", stack[-1][0].line)
+    for name, count, number in calls:
+        if name not in blocks:
+            raise AqlError(f"Unknown block '{name}'", number)
+        if count != len(blocks[name].args) - 1:
+            raise AqlError(f"Block '{name}' takes {len(blocks[name].args) - 1} arguments", number)
+    return Program(root, blocks, base_dir)
+
+
+def parse_file(path):
+    with open(path, "r", encoding="utf-8") as file:
+        return parse(file.read(), os.path.dirname(os.path.abspath(path)))
+
+
+def _substitute(value, scope, line):
+    def lookup(match):
+        name, *keys = match.group(1).split(".")
+        if name not in scope:
+            raise AqlError(f"Unknown variable '{name}'", line)
+        result = scope[name]
+        for key in keys:
+            try:
+                result = result[key]
+            except (KeyError, TypeError):
+                raise AqlError(f"'{match.group(1)}' has no value", line)
+        return str(result)
+
+    return VARIABLE.sub(lookup, value)
+
+
+def _dataset(statement, values, base_dir):
+    source = values[2]
+    if source == "list":
+        return values[3:]
+    if source == "range":
+        try:
+            return range(int(values[3]), int(values[4]) + 1)
+        except ValueError:
+            raise AqlError("range bounds must be whole numbers", statement.line)
+    path = os.path.join(base_dir, values[3])
+    try:
+        if source == "csv":
+            # Opened here, so a missing file is reported before the loop runs; rows are read as it goes.
+            return _iter_csv(open(path, "r", encoding="utf-8", newline=""), path, statement.line)
+        with open(path, "r", encoding="utf-8") as file:
+            return json.load(file)
+    except (OSError, ValueError) as e:
+        raise AqlError(f"Cannot read {path}: {e}", statement.line)
+
+
+def _iter_csv(file, path, line):
+    with file:
+        try:
+            yield from csv.DictReader(file)
+        except (OSError, csv.Error, UnicodeDecodeError) as e:
+            raise AqlError(f"Cannot read {path}: {e}", line)
+
+
+def _step(command, args, line, base_dir):
+    count, allowed = STEP_COMMANDS[command]
+    options = _options(args, line, allowed, count)
+    description = options.get("as", [""])[0]
+    if command == "navigate":
+        strategy = options.get("strategy", [""])[0]
+        ready = options.get("ready", [""])
+        if not strategy and not ready[0]:
+            return ('Navigate to URL', args[0], description)
+        if ready[0] in LOCATORS:
+            return ('Navigate to URL', args[0], description, strategy, 'Element Present', LOCATORS[ready[0]],
+                    ready[1])
+        return ('Navigate to URL', args[0], description, strategy, READY.get(ready[0], ""), "", "")
+    if command in ("click", "type"):
+        text = args[2] if command == "type" else ""
+        return ('Click Element' if command == "click" else 'Input Text', LOCATORS[args[0]], args[1], text,
+                description)
+    if "element" in options:
+        scope = (LOCATORS[options["element"][0]], options["element"][1])
+    elif "clip" in options:
+        scope = ('Clip', options["clip"][0])
+    else:
+        scope = ()
+    if command == "screenshot":
+        return ('Take Screenshot', args[0] if args[0].endswith('.png') else args[0] + '.png') + scope
+    if command == "js":
+        return ('Execute JavaScript', args[0], description)
+    if command == "sleep":
+        return ('Sleep', args[0])
+    if command == "python":
+        mode = options.get("in", [""])[0]
+        timeout = options.get("timeout", [""])[0]
+        result = options.get("result", [""])[0]
+        path = os.path.join(base_dir, args[0])
+        if not (mode or timeout or result):
+            return ('Execute Python Script', path, description)
+        return ('Execute Python Script', path, description, SCRIPT_MODES.get(mode, ""), timeout, result)
+    if command == "maximize":
+        return ('Maximize Window',)
+    if command == "compare":
+        return ('Compare Images', args[0], args[1], args[2]) + scope
+    return (ASSERTIONS[args[0]], args[2], "")
+
+
+def _expand(statements, scope, program, depth):
+    for statement in statements:
+        values = [_substitute(arg, scope, statement.line) for arg in statement.args]
+        if statement.command == "set":
+            name = values[0]
+            target = next((layer for layer in scope.maps if name in layer), scope.maps[-1])
+            target[name] = values[2]
+        elif statement.command == "for":
+            for item in _dataset(statement, values, program.baseDir):
+                yield from _expand(statement.body, scope.new_child({values[0]: item}), program, depth)
+        elif statement.command == "call":
+            if depth >= MAX_CALL_DEPTH:
+                raise AqlError(f"Blocks call each other more than {MAX_CALL_DEPTH} levels deep", statement.line)
+            block = program.blocks[values[0]]
+            parameters = dict(zip(block.args[1:], values[1:]))
+            yield from _expand(block.body, scope.new_child(parameters), program, depth + 1)
+        else:
+            yield _step(statement.command, values, statement.line, program.baseDir)
+
+
+def steps(program, variables=None):
+    """
+    Steps of a program, produced one at a time as they are needed. Variables are read and set in the given dict,
+    so running against an engine's variables lets scripts see values set by earlier Python steps and vice versa.
+    """
+    return _expand(program.statements, ChainMap(variables if variables is not None else {}), program, 0)
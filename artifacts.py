@@ -0,0 +1,222 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+from datetime import datetime
+
+import atm8file
+from settings import app_data_path
+
+ENCODINGS = ["png", "webp"]
+BASELINE_PREFIX = "baseline:"
+
+
+class ArtifactStore:
+    """
+    Content-addressed store for screenshots and comparison images.
+
+    Objects are kept once under objects/<first two hex digits>/<sha256 of the PNG>.<encoding>, however many runs
+    capture the same image. Each run writes a manifest to runs/ naming the objects it produced, and baselines.json
+    maps baseline names to objects, so promoting a screenshot to a baseline is a reference, not a copy.
+    Objects no manifest or baseline refers to any more are removed by gc().
+
+    With the webp encoding objects are re-encoded losslessly (through OpenCV) for a smaller footprint; the key is
+    always the hash of the PNG as captured, so the encoding can change without breaking deduplication.
+    """
+
+    def __init__(self, root, encoding="png", logger=None):
+        self.root = root
+        self.encoding = encoding if encoding in ENCODINGS else "png"
+        self.logger = logger
+        self.objectsPath = os.path.join(root, "objects")
+        self.runsPath = os.path.join(root, "runs")
+        self.baselinesPath = os.path.join(root, "baselines.json")
+
+    def objectPath(self, key, encoding=None):
+        return os.path.join(self.objectsPath, key[:2], f"{key}.{encoding or self.encoding}")
+
+    def find(self, key):
+        """
+        Path of a stored object in whatever encoding it was written, or None.
+        """
+        for encoding in [self.encoding] + [other for other in ENCODINGS if other != self.encoding]:
+            path = self.objectPath(key, encoding)
+            if os.path.exists(path):
+                return path
+        return None
+
+    def put(self, png):
+        """
+        Store PNG bytes and return their key. An image already in the store is not written again.
+        """
+        key = hashlib.sha256(png).hexdigest()
+        existing = self.find(key)
+        if existing:
+            # Touched so a concurrent gc() sees it as recently written until this run's manifest refers to it.
+            os.utime(existing)
+            return key
+        data, encoding = self.encode(png)
+        path = self.objectPath(key, encoding)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with atm8file.atomic_write(path, "wb") as file:
+            file.write(data)
+        return key
+
+    def encode(self, png):
+        if self.encoding == "png":
+            return png, "png"
+        try:
+            import cv2
+            import numpy
+            image = cv2.imdecode(numpy.frombuffer(png, numpy.uint8), cv2.IMREAD_UNCHANGED)
+            ok, data = cv2.imencode(".webp", image, [cv2.IMWRITE_WEBP_QUALITY, 101])
+            if ok:
+                return data.tobytes(), "webp"
+        except ImportError:
+            pass
+        if self.logger:
+            self.logger.warning("WebP encoding needs OpenCV; storing the screenshot as PNG.")
+        return png, "png"
+
+    def read(self, key):
+        path = self.find(key)
+        if path is None:
+            raise FileNotFoundError(f"No stored image {key}")
+        with open(path, "rb") as file:
+            return file.read()
+
+    def resolve(self, reference):
+        """
+        Path of an image reference: 'baseline:<name>' or an object key is looked up in the store, anything else is
+        taken as a file path.
+        """
+        if reference.startswith(BASELINE_PREFIX):
+            name = reference[len(BASELINE_PREFIX):]
+            key = self.baselines().get(name)
+            if key is None:
+                raise KeyError(f"No baseline named '{name}'")
+            reference = key
+        if len(reference) == 64 and all(char in "0123456789abcdef" for char in reference):
+            path = self.find(reference)
+            if path is None:
+                raise FileNotFoundError(f"No stored image {reference}")
+            return path
+        return reference
+
+    def writeManifest(self, run_id, test_name, artifacts):
+        """
+        Record the artifacts of one run: a list of {"name", "key", "kind", "step"} entries.
+        """
+        os.makedirs(self.runsPath, exist_ok=True)
+        path = os.path.join(self.runsPath, f"{run_id}.json")
+        with atm8file.atomic_write(path) as file:
+            json.dump({"run": run_id, "test": test_name, "created": datetime.now().isoformat(timespec="seconds"),
+                       "artifacts": artifacts}, file, indent=2)
+        return path
+
+    def manifests(self):
+        """
+        Run manifests, newest first.
+        """
+        if not os.path.isdir(self.runsPath):
+            return []
+        manifests = []
+        for name in os.listdir(self.runsPath):
+            if name.endswith(".json"):
+                try:
+                    with open(os.path.join(self.runsPath, name), "r", encoding="utf-8") as file:
+                        manifests.append(json.load(file))
+                except (OSError, json.JSONDecodeError):
+                    continue
+        return sorted(manifests, key=lambda manifest: manifest.get("created", ""), reverse=True)
+
+    def manifest(self, run_id):
+        with open(os.path.join(self.runsPath, f"{run_id}.json"), "r", encoding="utf-8") as file:
+            return json.load(file)
+
+    def baselines(self):
+        try:
+            with open(self.baselinesPath, "r", encoding="utf-8") as file:
+                return json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def promote(self, name, key):
+        """
+        Make the stored image key the baseline called name, replacing any previous one.
+        """
+        if self.find(key) is None:
+            raise FileNotFoundError(f"No stored image {key}")
+        baselines = self.baselines()
+        baselines[name] = key
+        os.makedirs(self.root, exist_ok=True)
+        with atm8file.atomic_write(self.baselinesPath) as file:
+            json.dump(baselines, file, indent=2, sort_keys=True)
+
+    def export(self, run_id, directory):
+        """
+        Copy the artifacts of a run out of the store under the names they were taken with.
+        """
+        os.makedirs(directory, exist_ok=True)
+        paths = []
+        for artifact in self.manifest(run_id)["artifacts"]:
+            source = self.find(artifact["key"])
+            if source is None:
+                continue
+            target = os.path.join(directory, os.path.splitext(artifact["name"])[0] + os.path.splitext(source)[1])
+            shutil.copyfile(source, target)
+            paths.append(target)
+        return paths
+
+    def gc(self, keep_runs=None, keep_days=None, dry_run=False, grace=3600):
+        """
+        Apply the retention policy, dropping the manifests of runs beyond the newest keep_runs or older than
+        keep_days, then delete every object no remaining manifest or baseline refers to. Objects written in the
+        last `grace` seconds are kept, as they may belong to a run that has not written its manifest yet.
+        Returns (manifests removed, objects removed, bytes freed).
+        """
+        manifests = self.manifests()
+        cutoff = time.time() - keep_days * 86400 if keep_days else None
+        kept, expired = [], []
+        for index, manifest in enumerate(manifests):
+            created = manifest.get("created")
+            too_old = cutoff is not None and created and datetime.fromisoformat(created).timestamp() < cutoff
+            if (keep_runs is not None and index >= keep_runs) or too_old:
+                expired.append(manifest)
+            else:
+                kept.append(manifest)
+
+        live = set(self.baselines().values())
+        for manifest in kept:
+            live.update(artifact["key"] for artifact in manifest.get("artifacts", []))
+
+        removed, freed = 0, 0
+        if os.path.isdir(self.objectsPath):
+            for prefix in os.scandir(self.objectsPath):
+                if not prefix.is_dir():
+                    continue
+                for entry in os.scandir(prefix.path):
+                    if os.path.splitext(entry.name)[0] in live or entry.stat().st_mtime > time.time() - grace:
+                        continue
+                    removed += 1
+                    freed += entry.stat().st_size
+                    if not dry_run:
+                        os.remove(entry.path)
+        if not dry_run:
+            for manifest in expired:
+                path = os.path.join(self.runsPath, f"{manifest['run']}.json")
+                if os.path.exists(path):
+                    os.remove(path)
+        return len(expired), removed, freed
+
+
+def store_from_settings(settings, logger=None):
+    """
+    The artifact store configured in settings, or None when screenshots go to plain timestamped files.
+    """
+    if settings.get("artifactStorage", "Content-Addressed") != "Content-Addressed":
+        return None
+    root = settings.get("artifactPath") or (os.path.join(settings["savePath"], "store") if settings.get("savePath")
+                                            else app_data_path("artifacts"))
+    return ArtifactStore(root, settings.get("artifactEncoding", "png"), logger)
@@ -0,0 +1,507 @@
+"""
+An asyncio engine that speaks the W3C WebDriver protocol directly, for runs with many concurrent sessions.
+
+The Selenium client ties up a thread per session. Here every session is a coroutine on one event loop, and the
+commands of all sessions on a server share a small pool of keep-alive HTTP connections. Steps have the same
+meaning as in AutomationEngine: the step handlers are shared, and this engine only overrides the primitives through
+which they talk to the browser, sleep and block.
+
+In Process Python scripts run on a worker thread with the run's namespace, where driver is a ScriptDriver: the
+session behind the blocking, Selenium-style calls scripts make on a threaded run.
+"""
+import asyncio
+import base64
+import json
+import os
+import socket
+import time
+import urllib.parse
+
+from engine import AutomationEngine, CHROME_OPTIONS, EDGE_OPTIONS, LOCATOR_STRATEGIES, PERFORMANCE_LOGGING_OPTION
+from launch import launch_profile, resolve_driver
+from remote import BROWSER_NAMES, NodePool, RemoteNode
+
+# Key of a web element reference in W3C responses.
+ELEMENT_KEY = "element-6066-11e4-a52e-4f735466cecc"
+
+# Vendor prefix of the Chrome DevTools endpoints of chromedriver and msedgedriver.
+CDP_VENDORS = {"Chrome": "goog", "Edge": "ms"}
+
+
+class WebDriverError(Exception):
+    def __init__(self, error, message, status=None):
+        super().__init__(f"{error}: {message}")
+        self.error = error
+        self.status = status
+
+
+def w3c_capabilities(browser_type, options, page_load_strategy="normal", extra=None, binary=""):
+    """
+    New Session payload for a browser with the checked browser options, as browser_options() builds for Selenium.
+    """
+    if browser_type == "Chrome":
+        capabilities = {"goog:chromeOptions": {"args": [CHROME_OPTIONS[option] for option in options if
+                                                        option in CHROME_OPTIONS]}}
+        if PERFORMANCE_LOGGING_OPTION in options:
+            capabilities["goog:loggingPrefs"] = {"performance": "ALL"}
+    elif browser_type == "Edge":
+        capabilities = {"ms:edgeOptions": {"args": [EDGE_OPTIONS[option] for option in options if
+                                                    option in EDGE_OPTIONS]}}
+        if PERFORMANCE_LOGGING_OPTION in options:
+            capabilities["ms:loggingPrefs"] = {"performance": "ALL"}
+    else:
+        raise ValueError("Unsupported browser type")
+    if binary:
+        capabilities["goog:chromeOptions" if browser_type == "Chrome" else "ms:edgeOptions"]["binary"] = binary
+    capabilities.update(browserName=BROWSER_NAMES[browser_type], pageLoadStrategy=page_load_strategy)
+    capabilities.update(extra or {})
+    return {"capabilities": {"alwaysMatch": capabilities, "firstMatch": [{}]}}
+
+
+async def read_response(reader):
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionResetError("The server closed the connection")
+    status = int(status_line.split()[1])
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    if headers.get("transfer-encoding", "").lower() == "chunked":
+        body = bytearray()
+        while True:
+            size = int((await reader.readline()).split(b";")[0], 16)
+            if size == 0:
+                while await reader.readline() not in (b"\r\n", b"\n", b""):
+                    pass
+                break
+            body += await reader.readexactly(size)
+            await reader.readexactly(2)
+    elif "content-length" in headers:
+        body = await reader.readexactly(int(headers["content-length"]))
+    else:
+        body = await reader.read()
+        headers["connection"] = "close"
+    return status, headers, bytes(body)
+
+
+def w3c_locator(using, value):
+    """
+    The W3C form of a Selenium locator. WebDriver servers only take CSS, XPath, link text and tag name, so id, name
+    and class name become CSS selectors, as in Selenium's own client.
+    """
+    if using == "id":
+        return "css selector", f'[id="{value}"]'
+    if using == "name":
+        return "css selector", f'[name="{value}"]'
+    if using == "class name":
+        return "css selector", f".{value}"
+    return using, value
+
+
+class HttpConnectionPool:
+    """
+    Keep-alive HTTP/1.1 connections to one WebDriver server, shared by every session on it. At most limit
+    requests are in flight at once; idle connections are reused, and one the server has dropped is replaced.
+    """
+
+    def __init__(self, url, limit=32, timeout=300.0):
+        parts = urllib.parse.urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or (443 if parts.scheme == "https" else 80)
+        self.ssl = parts.scheme == "https"
+        self.basePath = parts.path.rstrip("/")
+        self.timeout = timeout
+        self.idle = []
+        self.semaphore = asyncio.Semaphore(limit)
+
+    async def request(self, method, path, payload=None):
+        body = b"" if payload is None else json.dumps(payload).encode("utf-8")
+        head = (f"{method} {self.basePath}{path} HTTP/1.1\r\nHost: {self.host}:{self.port}\r\n"
+                f"Accept: application/json\r\nContent-Type: application/json;charset=UTF-8\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: keep-alive\r\n\r\n").encode("latin-1")
+        async with self.semaphore:
+            while True:
+                reused = bool(self.idle)
+                reader, writer = self.idle.pop() if reused else await asyncio.open_connection(
+                    self.host, self.port, ssl=self.ssl or None)
+                try:
+                    writer.write(head + body)
+                    await writer.drain()
+                    status, headers, data = await asyncio.wait_for(read_response(reader), self.timeout)
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    writer.close()
+                    if reused:
+                        # The server closed the idle connection before this request reached it.
+                        continue
+                    raise
+                except BaseException:
+                    writer.close()
+                    raise
+                if headers.get("connection", "").lower() == "close":
+                    writer.close()
+                else:
+                    self.idle.append((reader, writer))
+                return status, json.loads(data) if data else {}
+
+    async def command(self, method, path, payload=None):
+        status, response = await self.request(method, path, payload)
+        value = response.get("value") if isinstance(response, dict) else None
+        if status >= 400 or isinstance(value, dict) and "error" in value:
+            value = value if isinstance(value, dict) else {}
+            raise WebDriverError(value.get("error", f"HTTP {status}"), value.get("message", ""), status)
+        return value
+
+    async def close(self):
+        idle, self.idle = self.idle, []
+        for _, writer in idle:
+            writer.close()
+
+
+class AsyncSession:
+    """
+    One WebDriver session, with the commands the engine uses.
+    """
+
+    def __init__(self, http, session_id, browser_type, capabilities=None):
+        self.http = http
+        self.id = session_id
+        self.browserType = browser_type
+        self.capabilities = capabilities or {}
+        self.cdpVendor = CDP_VENDORS.get(browser_type)
+
+    @classmethod
+    async def start(cls, http, browser_type, capabilities):
+        value = await http.command("POST", "/session", capabilities)
+        return cls(http, value["sessionId"], browser_type, value.get("capabilities"))
+
+    async def command(self, method, path, payload=None):
+        return await self.http.command(method, f"/session/{self.id}{path}", payload)
+
+    async def get(self, url):
+        await self.command("POST", "/url", {"url": url})
+
+    async def findElement(self, locator_type, value):
+        return await self.findElementBy(LOCATOR_STRATEGIES[locator_type], value)
+
+    async def findElements(self, locator_type, value):
+        return await self.findElementsBy(LOCATOR_STRATEGIES[locator_type], value)
+
+    async def findElementBy(self, using, value):
+        using, value = w3c_locator(using, value)
+        element = await self.command("POST", "/element", {"using": using, "value": value})
+        return element[ELEMENT_KEY]
+
+    async def findElementsBy(self, using, value):
+        using, value = w3c_locator(using, value)
+        elements = await self.command("POST", "/elements", {"using": using, "value": value})
+        return [element[ELEMENT_KEY] for element in elements]
+
+    async def click(self, element):
+        await self.command("POST", f"/element/{element}/click", {})
+
+    async def sendKeys(self, element, text):
+        await self.command("POST", f"/element/{element}/value", {"text": text})
+
+    async def executeScript(self, script, *args):
+        return await self.command("POST", "/execute/sync", {"script": script, "args": list(args)})
+
+    async def screenshot(self, element=None):
+        path = f"/element/{element}/screenshot" if element else "/screenshot"
+        return base64.b64decode(await self.command("GET", path))
+
+    async def maximize(self):
+        await self.command("POST", "/window/maximize", {})
+
+    async def setWindowSize(self, width, height):
+        await self.command("POST", "/window/rect", {"width": width, "height": height})
+
+    async def cdp(self, cmd, params):
+        if self.cdpVendor is None:
+            raise WebDriverError("unsupported operation", f"{self.browserType} has no DevTools endpoint")
+        return await self.command("POST", f"/{self.cdpVendor}/cdp/execute", {"cmd": cmd, "params": params})
+
+    async def log(self, log_type):
+        return await self.command("POST", "/se/log", {"type": log_type})
+
+    async def quit(self):
+        await self.command("DELETE", "")
+
+
+class ScriptDriver:
+    """
+    Blocking, Selenium-style view of an AsyncSession for In Process scripts. Scripts run on a worker thread, so each
+    call runs the session's coroutine on the engine's loop and waits for its result. Only the WebDriver calls listed
+    here exist; any other raises AttributeError instead of handing the script a coroutine.
+    """
+
+    def __init__(self, session, loop):
+        self.session = session
+        self.loop = loop
+
+    def call(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result()
+
+    def get(self, url):
+        self.call(self.session.get(url))
+
+    @property
+    def current_url(self):
+        return self.call(self.session.command("GET", "/url"))
+
+    @property
+    def title(self):
+        return self.call(self.session.command("GET", "/title"))
+
+    def find_element(self, by, value):
+        return ScriptElement(self, self.call(self.session.findElementBy(by, value)))
+
+    def find_elements(self, by, value):
+        return [ScriptElement(self, element) for element in self.call(self.session.findElementsBy(by, value))]
+
+    def execute_script(self, script, *args):
+        args = [{ELEMENT_KEY: arg.id} if isinstance(arg, ScriptElement) else arg for arg in args]
+        return self.call(self.session.executeScript(script, *args))
+
+    def get_screenshot_as_png(self):
+        return self.call(self.session.screenshot())
+
+    def maximize_window(self):
+        self.call(self.session.maximize())
+
+    def set_window_size(self, width, height):
+        self.call(self.session.setWindowSize(width, height))
+
+    def execute_cdp_cmd(self, cmd, params):
+        return self.call(self.session.cdp(cmd, params))
+
+    def get_log(self, log_type):
+        return self.call(self.session.log(log_type))
+
+
+class ScriptElement:
+    """
+    A web element found by a ScriptDriver, with the WebElement calls scripts use most.
+    """
+
+    def __init__(self, driver, element_id):
+        self.driver = driver
+        self.id = element_id
+
+    def command(self, method, path, payload=None):
+        return self.driver.call(self.driver.session.command(method, f"/element/{self.id}{path}", payload))
+
+    def click(self):
+        self.command("POST", "/click", {})
+
+    def send_keys(self, *text):
+        self.command("POST", "/value", {"text": "".join(map(str, text))})
+
+    def clear(self):
+        self.command("POST", "/clear", {})
+
+    @property
+    def text(self):
+        return self.command("GET", "/text")
+
+    def get_attribute(self, name):
+        return self.command("GET", f"/attribute/{name}")
+
+    @property
+    def screenshot_as_png(self):
+        return self.driver.call(self.driver.session.screenshot(self.id))
+
+
+class AsyncAutomationEngine(AutomationEngine):
+    """
+    AutomationEngine over an AsyncSession: run() is a coroutine and the I/O primitives the steps use go through the
+    session, sleep on the loop or run on a worker thread, so many engines share one loop.
+    """
+
+    def __init__(self, session, logger, **kwargs):
+        # Diff images are not opened: a load run has no one watching each session.
+        super().__init__(session, logger, **dict(kwargs, open_photo=False))
+        self.session = session
+
+    async def run(self, steps, on_step=None):
+        # In Process scripts call the driver from a worker thread, the way they would on a threaded run.
+        self.scriptNamespace["driver"] = ScriptDriver(self.session, asyncio.get_running_loop())
+        return await self.runSteps(steps, on_step)
+
+    def hasCdp(self):
+        return self.session.cdpVendor is not None
+
+    async def cdp(self, cmd, params):
+        return await self.session.cdp(cmd, params)
+
+    async def get(self, url):
+        await self.session.get(url)
+
+    async def executeScript(self, script, *args):
+        return await self.session.executeScript(script, *args)
+
+    async def findElement(self, locator_type, value):
+        return await self.session.findElement(locator_type, value)
+
+    async def findElements(self, locator_type, value):
+        return await self.session.findElements(locator_type, value)
+
+    async def click(self, element):
+        await self.session.click(element)
+
+    async def sendKeys(self, element, text):
+        await self.session.sendKeys(element, text)
+
+    async def screenshot(self, element=None):
+        return await self.session.screenshot(element)
+
+    async def maximizeWindow(self):
+        await self.session.maximize()
+
+    async def performanceLog(self):
+        return await self.session.log("performance")
+
+    async def sleep(self, seconds):
+        await asyncio.sleep(seconds)
+
+    async def offload(self, function, *args):
+        return await asyncio.to_thread(function, *args)
+
+    async def pollScript(self, pending):
+        await asyncio.sleep(0.1)
+
+
+def free_port():
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+class DriverService:
+    """
+    A local chromedriver or msedgedriver process on a free port, serving every session of an async run.
+    """
+
+    def __init__(self, path, logger):
+        self.path = path
+        self.logger = logger
+        self.process = None
+        self.url = None
+
+    async def start(self, timeout=30.0):
+        if not os.path.isfile(self.path):
+            raise ValueError(f"Invalid driver location: {self.path}")
+        port = free_port()
+        self.process = await asyncio.create_subprocess_exec(self.path, f"--port={port}",
+                                                            stdout=asyncio.subprocess.DEVNULL,
+                                                            stderr=asyncio.subprocess.DEVNULL)
+        self.url = f"http://127.0.0.1:{port}"
+        http = HttpConnectionPool(self.url, limit=1, timeout=5.0)
+        deadline = time.monotonic() + timeout
+        try:
+            while True:
+                try:
+                    if (await http.command("GET", "/status") or {}).get("ready"):
+                        break
+                except (OSError, WebDriverError, asyncio.TimeoutError):
+                    pass
+                if self.process.returncode is not None or time.monotonic() > deadline:
+                    raise RuntimeError(f"{self.path} did not start listening on port {port}")
+                await asyncio.sleep(0.1)
+        finally:
+            await http.close()
+        self.logger.info(f"Started {os.path.basename(self.path)} at {self.url}")
+        return self.url
+
+    async def stop(self):
+        if self.process is not None and self.process.returncode is None:
+            self.process.terminate()
+            await self.process.wait()
+
+
+class AsyncRunner:
+    """
+    Runs many step plans concurrently on one event loop, each in a session of its own.
+
+    Sessions start on the node pool when one is given, spread by capacity as with threaded runs, else on a
+    local driver started for the run. At most max_sessions run at once, by default the pool's capacity for the
+    browser. engine_options(header) returns the AsyncAutomationEngine keyword arguments of a plan, and a plan's
+    steps(variables) its steps, given the variables of the plan's engine.
+    """
+
+    def __init__(self, browser_type, options, settings, logger, engine_options, max_sessions=None, node_pool=None,
+                 window_size=None, connections_per_server=32):
+        self.browserType = browser_type
+        # Local sessions start as the launch profile says; remote ones take the remote capabilities instead.
+        self.profile = None if node_pool else launch_profile(settings, browser_type, options, window_size)
+        self.capabilities = w3c_capabilities(browser_type, self.profile.options if self.profile else options,
+                                             settings.get("pageLoadStrategy", "normal"),
+                                             settings.get("remoteCapabilities") if node_pool else None,
+                                             self.profile.binary if self.profile else "")
+        self.settings = settings
+        self.logger = logger
+        self.engineOptions = engine_options
+        self.maxSessions = max_sessions
+        self.nodePool = node_pool
+        self.windowSize = self.profile.windowSize if self.profile else window_size
+        self.connectionsPerServer = connections_per_server
+        self.connections = {}
+        self.planDurations = {}
+
+    def connection(self, url):
+        if url not in self.connections:
+            self.connections[url] = HttpConnectionPool(url, self.connectionsPerServer)
+        return self.connections[url]
+
+    async def runAll(self, plans):
+        """
+        Run (name, header, steps) plans; returns {name: results}. Names must be unique.
+        """
+        service = None
+        pool = self.nodePool
+        try:
+            if pool is None:
+                service = DriverService(resolve_driver(self.browserType, self.profile.driverPath), self.logger)
+                url = await service.start()
+                pool = NodePool([RemoteNode(url, {"*": self.maxSessions or len(plans)})], self.logger)
+            capacity = pool.capacity(self.browserType)
+            limit = max(1, min(self.maxSessions or capacity, capacity, len(plans) or 1))
+            self.logger.info(f"Running {len(plans)} sessions, at most {limit} at once.")
+            # The semaphore keeps this run within the pool's capacity; other runs sharing the pool may still fill it.
+            semaphore = asyncio.Semaphore(limit)
+            results = await asyncio.gather(*(self.runPlan(semaphore, pool, *plan) for plan in plans))
+        finally:
+            for connection in self.connections.values():
+                await connection.close()
+            if service is not None:
+                await service.stop()
+        return {plan[0]: result for plan, result in zip(plans, results)}
+
+    async def runPlan(self, semaphore, pool, name, header, steps):
+        async with semaphore:
+            lease = None
+            started = time.monotonic()
+            try:
+                # Waiting for a slot blocks, as the pool may be shared with threaded runs, so it happens off the loop.
+                lease = await asyncio.to_thread(pool.acquire, self.browserType)
+                session = await AsyncSession.start(self.connection(lease.url), self.browserType, self.capabilities)
+                try:
+                    if self.windowSize:
+                        await session.setWindowSize(*self.windowSize)
+                    engine = AsyncAutomationEngine(session, self.logger, test_name=name, **self.engineOptions(header))
+                    return await engine.run(steps(engine.variables))
+                finally:
+                    await session.quit()
+            except Exception as e:
+                self.logger.error(f"Session {name} failed: {e}")
+                return []
+            finally:
+                if lease is not None:
+                    lease.release()
+                self.planDurations[name] = time.monotonic() - started
+
+    def run(self, plans):
+        return asyncio.run(self.runAll(plans))
@@ -0,0 +1,479 @@
+import hashlib
+import io
+import json
+import os
+import tempfile
+import zlib
+from contextlib import contextmanager
+
+FORMAT_NAME = "atm8"
+FORMAT_VERSION = 2
+
+# Compact files start with this magic, followed by the format version byte and a zlib stream of
+# length-prefixed frames: the header object first, then one [action code, *values] array per step.
+COMPACT_MAGIC = b"ATM8\x00"
+
+# Named fields of each action, in the positional order steps use in memory. Later fields are optional,
+# so steps written before a field existed keep their shorter form.
+STEP_FIELDS = {
+    'Navigate to URL': ['url', 'description', 'loadStrategy', 'readyWhen', 'readyLocatorType', 'readyLocator'],
+    'Click Element': ['locatorType', 'locator', 'text', 'description'],
+    'Input Text': ['locatorType', 'locator', 'text', 'description'],
+    'Take Screenshot': ['fileName', 'scopeType', 'scope'],
+    'Execute JavaScript': ['script', 'description'],
+    'Sleep': ['seconds'],
+    'Execute Python Script': ['path', 'description', 'runIn', 'timeout', 'resultVariable'],
+    'Maximize Window': [],
+    'Compare Images': ['referencePath', 'testImage', 'outputPath', 'scopeType', 'scope'],
+    'Assert Page Load Under': ['milliseconds', 'description'],
+    'Assert Step Duration Under': ['milliseconds', 'description'],
+    'Assert Transfer Size Under': ['kilobytes', 'description'],
+}
+ACTION_CODES = {action: code for code, action in enumerate(STEP_FIELDS)}
+ACTIONS = list(STEP_FIELDS)
+
+READ_BLOCK_SIZE = 64 * 1024
+
+
+def step_to_record(step):
+    action = step[0]
+    fields = STEP_FIELDS.get(action, [])
+    record = {"action": action}
+    record.update(zip(fields, step[1:]))
+    if len(step) - 1 > len(fields):
+        record["extra"] = list(step[1 + len(fields):])
+    return record
+
+
+def record_to_step(record):
+    if not isinstance(record, dict) or "action" not in record:
+        raise ValueError(f"Invalid step record: {record}")
+    action = record["action"]
+    step = [action]
+    for field in STEP_FIELDS.get(action, []):
+        if field not in record:
+            break
+        step.append(record[field])
+    step.extend(record.get("extra", []))
+    return step
+
+
+def migrate_v1(document):
+    """
+    Convert a version 1 document ({"testName", "testDescription", "steps": [[action, ...], ...]}) into a
+    version 2 header and its steps.
+    """
+    if not isinstance(document, dict) or "steps" not in document:
+        raise ValueError("File content is not in the expected format")
+    header = {key: value for key, value in document.items() if key != "steps"}
+    header.update(format=FORMAT_NAME, version=FORMAT_VERSION)
+    return header, document["steps"]
+
+
+def _check_step(step, index):
+    if not isinstance(step, (list, tuple)) or not step:
+        raise ValueError(f"Invalid step format at index {index}: {step}")
+    return list(step)
+
+
+def _encode_varint(value):
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def _encode_frame(obj):
+    payload = json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    return _encode_varint(len(payload)) + payload
+
+
+def _encode_compact_step(step):
+    code = ACTION_CODES.get(step[0])
+    return [step[0] if code is None else code] + list(step[1:])
+
+
+def _decode_compact_step(values):
+    if not isinstance(values, list) or not values:
+        raise ValueError(f"Invalid compact step: {values}")
+    action = values[0]
+    return [ACTIONS[action] if isinstance(action, int) else action] + values[1:]
+
+
+class Atm8Reader:
+    """
+    Incremental reader for .atm8 files of any version and encoding.
+    The header is available as soon as the reader is constructed; steps are parsed while iterating.
+
+    An invalid step raises ValueError, unless skip_invalid is set: then it is left out, described in skipped, and
+    reading goes on with the next one. A truncated compact file always raises.
+    """
+
+    def __init__(self, path, skip_invalid=False):
+        self.path = path
+        self.skipInvalid = skip_invalid
+        self.skipped = []
+        self.file = open(path, "rb")
+        self.compact = self.file.read(len(COMPACT_MAGIC)) == COMPACT_MAGIC
+        self.index = 0
+        if self.compact:
+            self._openCompact()
+        else:
+            self.file.seek(0)
+            self._openText()
+
+    def _openText(self):
+        self.text = io.TextIOWrapper(self.file, encoding="utf-8")
+        first = self.text.readline()
+        try:
+            header = json.loads(first)
+        except json.JSONDecodeError:
+            # Version 1 documents may be pretty-printed over several lines.
+            header = json.loads(first + self.text.read())
+        if isinstance(header, dict) and "version" in header:
+            if header.get("format") != FORMAT_NAME or header["version"] > FORMAT_VERSION:
+                raise ValueError(f"Unsupported file version: {header.get('version')}")
+            self.header = header
+            self._steps = self._iterTextSteps()
+        else:
+            self.header, steps = migrate_v1(header)
+            self._steps = iter(steps)
+
+    def _iterTextSteps(self):
+        for number, line in enumerate(self.text, 2):
+            if line.strip():
+                try:
+                    yield record_to_step(json.loads(line))
+                except ValueError as e:
+                    self._skip(f"Invalid step on line {number}: {e}")
+
+    def _openCompact(self):
+        version = self.file.read(1)
+        if not version or version[0] > FORMAT_VERSION:
+            raise ValueError(f"Unsupported compact file version: {version[0] if version else None}")
+        self.decompressor = zlib.decompressobj()
+        self.buffer = bytearray()
+        frames = self._iterFrames()
+        self.header = next(frames, None)
+        if not isinstance(self.header, dict):
+            raise ValueError("Compact file has no header")
+        self._steps = self._iterCompactSteps(frames)
+
+    def _iterCompactSteps(self, frames):
+        for values in frames:
+            try:
+                yield _decode_compact_step(json.loads(values))
+            except ValueError as e:
+                self._skip(f"Invalid step {self.index + len(self.skipped) + 1}: {e}")
+
+    def _iterFrames(self):
+        # The header frame is decoded by the caller; step frames are decoded one at a time so a bad one is skipped.
+        first = True
+        while True:
+            frame = self._nextFrame()
+            if frame is None:
+                return
+            yield json.loads(frame) if first else frame
+            first = False
+
+    def _skip(self, problem):
+        if not self.skipInvalid:
+            raise ValueError(problem)
+        self.skipped.append(problem)
+
+    def _nextFrame(self):
+        while True:
+            frame = self._takeFrame()
+            if frame is not None:
+                return frame
+            block = self.file.read(READ_BLOCK_SIZE)
+            if block:
+                self.buffer += self.decompressor.decompress(block)
+                continue
+            tail = self.decompressor.flush()
+            if tail:
+                self.buffer += tail
+                continue
+            if self.buffer:
+                raise ValueError("Compact file is truncated")
+            return None
+
+    def _takeFrame(self):
+        length, shift = 0, 0
+        for offset, byte in enumerate(self.buffer):
+            length |= (byte & 0x7F) << shift
+            shift += 7
+            if not byte & 0x80:
+                start = offset + 1
+                if len(self.buffer) - start < length:
+                    return None
+                frame = bytes(self.buffer[start:start + length])
+                del self.buffer[:start + length]
+                return frame
+        return None
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        while True:
+            step = next(self._steps)
+            try:
+                step = _check_step(step, self.index)
+            except ValueError as e:
+                self._skip(str(e))
+                continue
+            self.index += 1
+            return step
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+def open_steps(path, skip_invalid=False):
+    return Atm8Reader(path, skip_invalid)
+
+
+def iter_steps(path):
+    with Atm8Reader(path) as reader:
+        yield from reader
+
+
+def load(path):
+    with Atm8Reader(path) as reader:
+        return reader.header, list(reader)
+
+
+@contextmanager
+def atomic_write(path, mode="w"):
+    """
+    Write to a temporary file next to path and move it over path only once it is complete and synced, so a crash
+    leaves either the old file or the new one, never a truncated mix.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix=".tmp", dir=directory)
+    try:
+        with open(fd, mode, **({} if "b" in mode else {"encoding": "utf-8"})) as file:
+            yield file
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    if hasattr(os, "O_DIRECTORY"):
+        # Persist the rename itself; Windows has no directory handles and commits it with the file.
+        dir_fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+
+def save(path, header, steps, compact=False):
+    header = dict(header, format=FORMAT_NAME, version=FORMAT_VERSION)
+    if compact:
+        compressor = zlib.compressobj(9)
+        with atomic_write(path, "wb") as file:
+            file.write(COMPACT_MAGIC + bytes([FORMAT_VERSION]))
+            file.write(compressor.compress(_encode_frame(header)))
+            for step in steps:
+                file.write(compressor.compress(_encode_frame(_encode_compact_step(step))))
+            file.write(compressor.flush())
+    else:
+        with atomic_write(path) as file:
+            file.write(json.dumps(header) + "\n")
+            for step in steps:
+                file.write(json.dumps(step_to_record(step)) + "\n")
+
+
+def _file_stamp(path):
+    stat = os.stat(path)
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def apply_edit(header, steps, edit):
+    """
+    Apply one journal edit to a header dict and a steps list in place.
+    """
+    op = edit["op"]
+    if op == "header":
+        header.update(edit["header"])
+    elif op == "insert":
+        steps[edit["index"]:edit["index"]] = [record_to_step(record) for record in edit["steps"]]
+    elif op == "set":
+        steps[edit["index"]] = record_to_step(edit["step"])
+    elif op == "remove":
+        del steps[edit["index"]]
+    elif op == "move":
+        steps.insert(edit["to"], steps.pop(edit["from"]))
+    elif op == "reset":
+        steps[:] = [record_to_step(record) for record in edit["steps"]]
+    else:
+        raise ValueError(f"Unknown journal edit: {op}")
+
+
+class Journal:
+    """
+    Append-only autosave log of the edits made to an open .atm8 file since it was last saved.
+
+    The first line names the base the edits apply to: the saved file (with its mtime and size, so a file changed
+    elsewhere is not patched with stale edits) or, after compaction, a snapshot kept next to the journal. Edits
+    are buffered by record() and appended and synced by flush(), so autosaving costs the size of the edits, not of
+    the file. Once more than compact_after edits pile up, flush() writes a fresh snapshot and starts the journal
+    over, which keeps replay after a crash short. Each compaction writes a snapshot of its own, so the base the
+    journal names is never overwritten, whenever a crash happens.
+    """
+
+    def __init__(self, directory, source=None, compact_after=500):
+        self.directory = directory
+        self.source = os.path.abspath(source) if source else None
+        self.key = hashlib.sha1((self.source or "untitled").encode("utf-8")).hexdigest()[:16]
+        self.path = os.path.join(directory, f"{self.key}.jsonl")
+        base = _journal_base(self.path)
+        # The snapshot the journal's base names, if any; a recovered journal keeps the one it was written against.
+        self.snapshot = base.get("snapshot")
+        # Edits folded into that snapshot. replay_journal counts them as unsaved, but they are not in the journal.
+        self.snapshotEdits = base.get("edits", 0)
+        self.compactAfter = compact_after
+        self.pending = []
+        # Edits appended since the base, which decide when to compact.
+        self.edits = 0
+
+    def start(self):
+        """
+        Forget previous edits; the saved file (or, for an untitled file, nothing) is the base again.
+        """
+        self.pending = []
+        self.edits = 0
+        self.snapshotEdits = 0
+        base = {"op": "base", "source": self.source}
+        if self.source and os.path.exists(self.source):
+            base["stamp"] = _file_stamp(self.source)
+        self._rewrite(base)
+        self._removeSnapshots()
+        return self
+
+    def record(self, edit):
+        self.pending.append(edit)
+
+    def flush(self, header=None, steps=None):
+        """
+        Append and sync the buffered edits. Given the current header and steps, also compact once the journal has
+        grown past compact_after edits.
+        """
+        if not self.pending:
+            return False
+        with open(self.path, "a", encoding="utf-8") as file:
+            for edit in self.pending:
+                file.write(json.dumps(edit) + "\n")
+            file.flush()
+            os.fsync(file.fileno())
+        self.edits += len(self.pending)
+        self.pending = []
+        if steps is not None and self.edits > self.compactAfter:
+            self.compact(header or {}, steps)
+        return True
+
+    def compact(self, header, steps):
+        parts = (self.snapshot or "").split(".")
+        generation = int(parts[1]) + 1 if len(parts) == 3 and parts[1].isdigit() else 1
+        snapshot = f"{self.key}.{generation}.atm8"
+        save(os.path.join(self.directory, snapshot), header, steps, compact=True)
+        # Until the new base is in place, a crash replays the old base and its edits; the old snapshot goes after.
+        self._rewrite({"op": "base", "source": self.source, "snapshot": snapshot,
+                       "edits": self.snapshotEdits + self.edits})
+        self.snapshot = snapshot
+        self.snapshotEdits += self.edits
+        self.edits = 0
+        self._removeSnapshots(keep=snapshot)
+
+    def discard(self):
+        self.pending = []
+        discard_journal(self.path)
+        self.snapshot = None
+        self.snapshotEdits = 0
+
+    def _removeSnapshots(self, keep=None):
+        for path in journal_snapshots(self.path):
+            if os.path.basename(path) != keep:
+                os.remove(path)
+
+    def _rewrite(self, base):
+        os.makedirs(self.directory, exist_ok=True)
+        with atomic_write(self.path) as file:
+            file.write(json.dumps(base) + "\n")
+
+
+def _journal_base(path):
+    try:
+        with open(path, "r", encoding="utf-8") as file:
+            base = json.loads(file.readline())
+    except (OSError, ValueError):
+        return {}
+    return base if isinstance(base, dict) else {}
+
+
+def journal_snapshots(path):
+    """
+    Snapshots written by compactions of the journal at path, current or left behind by a crash.
+    """
+    directory, name = os.path.split(path)
+    prefix = os.path.splitext(name)[0] + "."
+    if not os.path.isdir(directory):
+        return []
+    return [os.path.join(directory, entry) for entry in os.listdir(directory) if
+            entry.startswith(prefix) and entry.endswith(".atm8")]
+
+
+def discard_journal(path):
+    for journal_path in [path] + journal_snapshots(path):
+        if os.path.exists(journal_path):
+            os.remove(journal_path)
+
+
+def replay_journal(path):
+    """
+    Rebuild the file a journal describes. Returns (source, header, steps, edits), where edits counts the edits
+    made since the file was saved; a line cut short by a crash ends the replay.
+    """
+    with open(path, "r", encoding="utf-8") as file:
+        lines = file.read().splitlines()
+    base = json.loads(lines[0]) if lines else None
+    if not isinstance(base, dict) or base.get("op") != "base":
+        raise ValueError("Journal has no base")
+
+    source = base.get("source")
+    if base.get("snapshot"):
+        header, steps = load(os.path.join(os.path.dirname(path), base["snapshot"]))
+    elif source and "stamp" in base:
+        if not os.path.exists(source) or _file_stamp(source) != base["stamp"]:
+            raise ValueError(f"{source} has changed since these edits were made")
+        header, steps = load(source)
+    else:
+        header, steps = {}, []
+
+    edits = base.get("edits", 0)
+    for line in lines[1:]:
+        try:
+            edit = json.loads(line)
+        except json.JSONDecodeError:
+            break
+        apply_edit(header, steps, edit)
+        edits += 1
+    return source, header, steps, edits
+
+
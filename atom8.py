@@ -2,26 +2,35 @@ import json
 import sys
 import os
 import logging
+import multiprocessing
 import time
 from datetime import datetime
-from PyQt5.QtCore import Qt, QSize, QRect
+from PyQt5.QtCore import Qt, QSize, QRect, QAbstractTableModel, QAbstractListModel, QModelIndex, QTimer, QObject, \
+    QSortFilterProxyModel, pyqtSignal
 from PyQt5.QtGui import QColor, QTextFormat, QPainter, QPixmap, QIcon
 from PyQt5.QtWidgets import QApplication, QMainWindow, QPushButton, QVBoxLayout, QWidget, QLineEdit, QLabel, QComboBox, \
     QListWidget, QHBoxLayout, QAction, QMessageBox, QFileDialog, QStatusBar, QCheckBox, QTextEdit, QInputDialog, \
     QDialog, QTableWidgetItem, QTableWidget, QMenu, QHeaderView, QPlainTextEdit, QTabWidget, QGroupBox, QScrollArea, \
-    QSplashScreen, QMenuBar, QFrame
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.edge.options import Options as EdgeOptions
-import pandas as pd
-from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill
-from openpyxl.utils.dataframe import dataframe_to_rows
-from helper import extract_elements_to_json
+    QSplashScreen, QMenuBar, QFrame, QTableView, QAbstractItemView, QListWidgetItem, QListView
+from runlog import RunLog
+from artifacts import ENCODINGS, store_from_settings
+from history import FLAKY_THRESHOLD, RunHistory, load_flaky_files
+from launch import NO_PROFILE, LaunchProfile, parse_window_size, saved_profiles
+from matrix import BROWSERS, CURRENT_PROFILE, MatrixRun, matrix_cells
+import aql
+import atm8file
+from engine import AutomationEngine, BLOCKING_PRESETS, PAGE_LOAD_STRATEGIES, READY_CONDITIONS, engine_options, \
+    parse_clip, session_factory
+from remote import EXECUTORS, node_pool_from_settings
+from sequencer import FLAKY_POLICIES, load_sequence, save_sequence, checkpoint_path, Checkpoint, SequenceRun
+from scriptpool import RUN_MODES
+from settings import app_data_path
+from report import BUDGET_UNITS, format_step_text, matrix_rows, metrics_summary, navigation_text, performance_rows, \
+    result_rows, scope_text, script_text, status_text, write_matrix_report, write_report
 import platform
-import cv2
-import pywinauto
+
+# Selenium, pandas, openpyxl, cv2, pywinauto and helper (requests + bs4) are imported inside the functions that
+# need them, so launching the editor does not pay for a run, an export or an image comparison.
 
 __version__ = "0.0.3"
 __build__ = f"07032024-2"
@@ -29,6 +38,8 @@ __build__ = f"07032024-2"
 
 class Importer:
     def __init__(self, parent):
+        import pywinauto
+
         self.parent = parent
         pwa = pywinauto.application.Application()
 
@@ -66,15 +77,153 @@ class CustomComboBox(QComboBox):
             QMessageBox.warning(self, "Error", f"Error while copying to clipboard: {e}")
 
 
+class LogSignalBridge(QObject):
+    message = pyqtSignal(str)
+
+
 class QTextEditLogger(logging.Handler):
+    # Records may come from sequencer worker threads, so they reach the widget through a queued signal.
     def __init__(self, widget):
         super().__init__()
         self.widget = widget
         self.widget.setReadOnly(True)
+        self.bridge = LogSignalBridge()
+        self.bridge.message.connect(self.widget.append)
 
     def emit(self, record):
         msg = self.format(record)
-        self.widget.append(msg)
+        self.bridge.message.emit(msg)
+
+
+class ResultsTableModel(QAbstractTableModel):
+    headers = ["Step", "Status"]
+
+    def __init__(self, formatStep, parent=None):
+        super().__init__(parent)
+        self.formatStep = formatStep
+        self.results = []
+
+    def setResults(self, results):
+        self.beginResetModel()
+        self.results = results
+        hasMetrics = any(details.get("metrics") for _, _, details in results)
+        self.headers = ["Step", "Status", "Performance"] if hasMetrics else ["Step", "Status"]
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.results)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.headers)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        step, status, details = self.results[index.row()]
+        if role == Qt.DisplayRole:
+            if index.column() == 2:
+                return metrics_summary(details.get("metrics"))
+            return self.formatStep(step) if index.column() == 0 else status_text(status, details)
+        if role == Qt.BackgroundRole and index.column() == 1:
+            return QColor(203, 255, 171) if status == 'Passed' else QColor(255, 171, 171)
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.headers[section]
+        return None
+
+    def rows(self):
+        return result_rows(self.results)
+
+
+class StepsListModel(QAbstractListModel):
+    """
+    The steps of the open file. Display text is formatted only for the rows a view asks for, so loading a large
+    file costs one list of steps rather than one widget item and string per step.
+    """
+
+    def __init__(self, formatStep, parent=None):
+        super().__init__(parent)
+        self.formatStep = formatStep
+        self.steps = []
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.steps)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if role in (Qt.DisplayRole, Qt.ToolTipRole):
+            return self.formatStep(self.steps[index.row()])
+        return None
+
+    def setSteps(self, steps):
+        self.beginResetModel()
+        self.steps = steps
+        self.endResetModel()
+
+    def appendSteps(self, steps):
+        if steps:
+            self.beginInsertRows(QModelIndex(), len(self.steps), len(self.steps) + len(steps) - 1)
+            self.steps.extend(steps)
+            self.endInsertRows()
+
+    def setStep(self, row, step):
+        self.steps[row] = step
+        self.dataChanged.emit(self.index(row), self.index(row))
+
+    def removeStep(self, row):
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self.steps[row]
+        self.endRemoveRows()
+
+    def moveStep(self, row, to):
+        # beginMoveRows takes the destination as the row the step is inserted before.
+        self.beginMoveRows(QModelIndex(), row, row, QModelIndex(), to + 1 if to > row else to)
+        self.steps.insert(to, self.steps.pop(row))
+        self.endMoveRows()
+
+
+class RequestBlockingEditor(QWidget):
+    """
+    Edits a "blocking" settings object: preset categories to block plus custom URL patterns, one per line.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        layout = QVBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+
+        layout.addWidget(QLabel("Block Categories:"))
+        self.categoriesList = QListWidget()
+        for category in BLOCKING_PRESETS:
+            item = QListWidgetItem(category)
+            item.setFlags(item.flags() | Qt.ItemIsUserCheckable)
+            item.setCheckState(Qt.Unchecked)
+            item.setToolTip("\n".join(BLOCKING_PRESETS[category]))
+            self.categoriesList.addItem(item)
+        layout.addWidget(self.categoriesList)
+
+        layout.addWidget(QLabel("Blocked URL Patterns (one per line, * matches anything):"))
+        self.patternsEdit = QPlainTextEdit()
+        self.patternsEdit.setPlaceholderText("*.example-tracker.com*")
+        layout.addWidget(self.patternsEdit)
+
+        self.setLayout(layout)
+
+    def setConfig(self, config):
+        config = config or {}
+        for i in range(self.categoriesList.count()):
+            item = self.categoriesList.item(i)
+            item.setCheckState(Qt.Checked if item.text() in config.get("categories", []) else Qt.Unchecked)
+        self.patternsEdit.setPlainText("\n".join(config.get("patterns", [])))
+
+    def config(self):
+        categories = [self.categoriesList.item(i).text() for i in range(self.categoriesList.count()) if
+                      self.categoriesList.item(i).checkState() == Qt.Checked]
+        patterns = [line.strip() for line in self.patternsEdit.toPlainText().splitlines() if line.strip()]
+        return {"categories": categories, "patterns": patterns}
 
 
 class LineNumberArea(QWidget):
@@ -162,6 +311,8 @@ class ScriptEditor(QPlainTextEdit):
 
 
 class Atom8(QMainWindow):
+    stepChunkSize = 500
+
     def __init__(self):
         super().__init__()
         self.splash = QSplashScreen(QPixmap("_internal/assets/splash.png"))
@@ -169,13 +320,21 @@ class Atom8(QMainWindow):
         self.splash.showMessage(splash_message, Qt.AlignLeft | Qt.AlignBottom, Qt.white)
 
         self.splash.show()
-        time.sleep(3)
-        self.splash.finish(self)
+        QApplication.processEvents()
 
         self.setWindowIcon(QIcon("_internal/assets/atom-8-icon.png"))
 
         self.driver = None
-        self.steps = []
+        self.stepsModel = StepsListModel(self.constructStepDisplayText, self)
+        self.stepLoader = None
+        self.skippedSteps = 0
+        # Path of the open file when some of its steps could not be read; saving over it would lose them.
+        self.incompleteSource = None
+        self.journal = None
+        self.headerEdited = False
+        self.currentFileCompact = False
+        # Header keys of the open .atm8 file that the editor has no fields for, kept so saving preserves them.
+        self.currentFileHeader = {}
         self.recentFiles = []
         self.recentFilesMenu = None
         self.initUI()
@@ -183,11 +342,32 @@ class Atom8(QMainWindow):
         self.loadRecentFiles()
         self.currentFilePath = None
         self.resultsTable = None
-        self.setupScriptEditor()
+        self.scriptEditorWindow = None
+        self.scriptFilePath = None
+        self.prefsWindow = None
+        self.sequencerWindow = None
+        self.historyWindow = None
+        self.matrixWindow = None
+        self.matrixRun = None
+        self.sequenceOptions = {}
+        self.runResultsWindow = None
         self.results = []
         self.outputFileName = None
         self.logger.info("Atom8 initialized.")
         self.openPhotoState = False
+        self.autosaveTimer = QTimer(self)
+        self.autosaveTimer.timeout.connect(self.autosave)
+        self.autosaveTimer.start(int(float(self.loadSetting("autosaveInterval", 10)) * 1000))
+        QTimer.singleShot(0, self.recoverJournals)
+
+    @property
+    def steps(self):
+        return self.stepsModel.steps
+
+    @steps.setter
+    def steps(self, steps):
+        # Replacing the steps is a single model reset, however many there are.
+        self.stepsModel.setSteps(list(steps))
 
     def initUI(self):
 
@@ -266,19 +446,19 @@ class Atom8(QMainWindow):
             color: #555;
         }
 
-        QListWidget {
+        QListView {
             border: 1px solid #ddd;
             border-radius: 4px;
             color: #555;
             background-color: #f5f5f5;
         }
 
-        QListWidget::item {
+        QListView::item {
             padding: 4px;
             color: #555;
         }
 
-        QListWidget::item:selected {
+        QListView::item:selected {
             background-color: #007BFF;
             color: white;
         }
@@ -416,6 +596,9 @@ class Atom8(QMainWindow):
         self.testDescription = QLineEdit(self)
         self.testDescription.setPlaceholderText("Description")
 
+        self.testName.textEdited.connect(self.markHeaderEdited)
+        self.testDescription.textEdited.connect(self.markHeaderEdited)
+
         mainLayout = QVBoxLayout()
         mainLayout.addWidget(self.testName)
         mainLayout.addWidget(self.testDescription)
@@ -465,8 +648,11 @@ class Atom8(QMainWindow):
             ("Disable Extensions", "Disable extensions in the browser"),
         ]
 
+        # Browser option checkboxes by label; browserOptions follows them as they are toggled.
+        self.browserOptionBoxes = {}
+        self.browserOptions = []
         for option in basicOptions:
-            checkbox = self.createCheckbox(option[0], option[1])
+            checkbox = self.createBrowserOptionCheckbox(option[0], option[1])
             basicOptionsLayout.addWidget(checkbox)
 
         advancedOptionsScrollArea = QScrollArea()
@@ -499,7 +685,7 @@ class Atom8(QMainWindow):
         ]
 
         for option in advancedOptions:
-            checkbox = self.createCheckbox(option[0], option[1])
+            checkbox = self.createBrowserOptionCheckbox(option[0], option[1])
             advancedOptionsLayout.addWidget(checkbox)
 
         self.browserLabel = QLabel("Browser: " + self.loadSetting("defaultBrowser", "Chrome"))
@@ -570,11 +756,28 @@ class Atom8(QMainWindow):
             sequencerAction.setShortcut('Ctrl+Shift+S')
             toolsMenu.addAction(sequencerAction)
 
+            fileBlockingAction = QAction('Request Blocking for This File', self)
+            fileBlockingAction.triggered.connect(self.editFileRequestBlocking)
+            toolsMenu.addAction(fileBlockingAction)
+
+            cleanStoreAction = QAction('Clean Up Screenshot Store', self)
+            cleanStoreAction.triggered.connect(self.cleanArtifactStore)
+            toolsMenu.addAction(cleanStoreAction)
+
+            historyAction = QAction('Run History', self)
+            historyAction.triggered.connect(self.showHistory)
+            historyAction.setShortcut('Ctrl+H')
+            toolsMenu.addAction(historyAction)
+
+            matrixAction = QAction('Run Browser Matrix', self)
+            matrixAction.triggered.connect(self.showMatrix)
+            matrixAction.setShortcut('Ctrl+M')
+            toolsMenu.addAction(matrixAction)
+
             scriptEditorAction = QAction('Script Editor', self)
             scriptEditorAction.triggered.connect(self.showScriptEditor)
             toolsMenu.addAction(scriptEditorAction)
             scriptEditorAction.setShortcut('Ctrl+Shift+E')
-            scriptEditorAction.setDisabled(True)
 
             helpAction = QAction('Setup Drivers', self)
             helpAction.triggered.connect(self.showHelpDialog)
@@ -595,6 +798,7 @@ class Atom8(QMainWindow):
     def addStep(self):
         # STEPS
         try:
+            self.finishStepLoading()
             action = self.actionSelection.currentText()
             locator_type = self.locatorSelection.currentText()
             locator_value = self.locatorInput.text()
@@ -610,7 +814,19 @@ class Atom8(QMainWindow):
                 step = (action, locator_type, locator_value, text_value, description_value)
                 display_txt = f'{action}: (By: {locator_type if locator_type != "Select Locator" else "N/A"}, {locator_value}){", Text: " + text_value if text_value else ""}, Description: {description_value}'
                 self.logger.info(f"Added step: {display_txt}")
-            elif action in ['Navigate to URL', 'Execute JavaScript', 'Execute Python Script']:
+            elif action == 'Navigate to URL':
+                step = self.navigateStep(text_value, description_value)
+                if step is None:
+                    return
+                display_txt = self.constructStepDisplayText(step)
+                self.logger.info(f"Added step: {display_txt}")
+            elif action == 'Execute Python Script':
+                step = self.scriptStep(text_value, description_value)
+                if step is None:
+                    return
+                display_txt = self.constructStepDisplayText(step)
+                self.logger.info(f"Added step: {display_txt}")
+            elif action == 'Execute JavaScript':
                 step = (action, text_value, description_value)
                 display_txt = f'{action}: {text_value}{"." if not description_value else f", Description: {description_value}"}'
                 self.logger.info(f"Added step: {display_txt}")
@@ -622,34 +838,125 @@ class Atom8(QMainWindow):
                 screenshot_filename = self.inputText.text()
                 if not screenshot_filename.endswith('.png'):
                     screenshot_filename += '.png'
-                step = (action, screenshot_filename)
-                display_txt = f'Take screenshot and save as {screenshot_filename}'
+                scope = self.screenshotScope()
+                if scope is None:
+                    return
+                step = (action, screenshot_filename) + scope
+                display_txt = self.constructStepDisplayText(step)
                 self.logger.info(f"Added step: {display_txt}")
             elif action == 'Compare Images':
                 ref_img_path = self.refImgPath.text()
                 test_img_path = self.testImgPath.text()
                 output_path = self.outputPath.text()
-                step = (action, ref_img_path, test_img_path, output_path)
-                display_txt = f'Comparing images: {ref_img_path} and {test_img_path}.'
+                scope = self.screenshotScope()
+                if scope is None:
+                    return
+                step = (action, ref_img_path, test_img_path, output_path) + scope
+                display_txt = self.constructStepDisplayText(step)
                 self.logger.info(f"Added step: {display_txt}")
                 self.openPhotoState = self.openPhoto.isChecked()
+            elif action in BUDGET_UNITS:
+                step = self.budgetStep(action, description_value)
+                if step is None:
+                    return
+                display_txt = self.constructStepDisplayText(step)
+                self.logger.info(f"Added step: {display_txt}")
             else:
                 QMessageBox.warning(self, "Invalid Action", "The selected action is not supported.")
                 return
 
-            self.steps.append(step)
-            self.stepsList.addItem(display_txt)
+            self.recordEdit({"op": "insert", "index": len(self.steps), "steps": [atm8file.step_to_record(step)]})
+            self.stepsModel.appendSteps([step])
             self.locatorInput.clear()
             self.inputText.clear()
             self.sleepInput.clear()
+            self.budgetInput.clear()
             self.inputDescription.clear()
             self.refImgPath.clear()
             self.testImgPath.clear()
             self.outputPath.clear()
             self.openPhoto.setChecked(False)
+            self.loadStrategySelection.setCurrentIndex(0)
+            self.readySelection.setCurrentIndex(0)
+            self.scriptModeSelection.setCurrentIndex(0)
+            self.scriptTimeoutInput.clear()
+            self.scriptResultInput.clear()
+            self.scopeSelection.setCurrentIndex(0)
+            self.clipInput.clear()
         except Exception as e:
             QMessageBox.warning(self, "Error", f"Error while adding step: {e}")
 
+    def screenshotScope(self):
+        # Trailing (scopeType, scope) of a screenshot step: empty for the full viewport, None when incomplete.
+        scope = self.scopeSelection.currentText()
+        if scope == 'Element':
+            locatorType = self.locatorSelection.currentText()
+            locatorValue = self.locatorInput.text()
+            if locatorType == 'Select Locator' or not locatorValue:
+                QMessageBox.warning(self, "Missing Locator", "Choose the locator of the element to capture.")
+                return None
+            return (locatorType, locatorValue)
+        if scope == 'Clip Region':
+            try:
+                parse_clip(self.clipInput.text())
+            except ValueError as e:
+                QMessageBox.warning(self, "Invalid Clip Region", str(e))
+                return None
+            return ('Clip', self.clipInput.text().strip())
+        return ()
+
+    def setScreenshotScope(self, step, index):
+        if len(step) > index + 1 and step[index] == 'Clip':
+            self.scopeSelection.setCurrentText('Clip Region')
+            self.clipInput.setText(step[index + 1])
+        elif len(step) > index + 1 and step[index]:
+            self.scopeSelection.setCurrentText('Element')
+            self.locatorSelection.setCurrentText(step[index])
+            self.locatorInput.setText(step[index + 1])
+        else:
+            self.scopeSelection.setCurrentIndex(0)
+            self.clipInput.clear()
+
+    def scriptStep(self, path, description):
+        # The run mode, timeout and result variable are only stored when one of them is set.
+        mode = self.scriptModeSelection.currentText() if self.scriptModeSelection.currentIndex() else ""
+        timeout = self.scriptTimeoutInput.text().strip()
+        resultName = self.scriptResultInput.text().strip()
+        if timeout:
+            try:
+                timeout = f"{float(timeout):g}"
+            except ValueError:
+                QMessageBox.warning(self, "Invalid Timeout", "Enter the timeout as a number of seconds.")
+                return None
+        if resultName and not resultName.isidentifier():
+            QMessageBox.warning(self, "Invalid Variable", "The result variable must be a valid Python name.")
+            return None
+        if not (mode or timeout or resultName):
+            return ('Execute Python Script', path, description)
+        return ('Execute Python Script', path, description, mode, timeout, resultName)
+
+    def budgetStep(self, action, description):
+        try:
+            budget = float(self.budgetInput.text())
+        except ValueError:
+            QMessageBox.warning(self, "Invalid Budget", f"Enter the budget as a number of {BUDGET_UNITS[action]}.")
+            return None
+        return (action, f"{budget:g}", description)
+
+    def navigateStep(self, url, description):
+        # The page load strategy and ready condition are only stored when they differ from the run's.
+        strategy = self.loadStrategySelection.currentText() if self.loadStrategySelection.currentIndex() else ""
+        readyWhen = self.readySelection.currentText() if self.readySelection.currentIndex() else ""
+        if not strategy and not readyWhen:
+            return ('Navigate to URL', url, description)
+        locatorType, locatorValue = "", ""
+        if readyWhen == 'Element Present':
+            locatorType, locatorValue = self.locatorSelection.currentText(), self.locatorInput.text()
+            if locatorType == 'Select Locator' or not locatorValue:
+                QMessageBox.warning(self, "Missing Locator", "Choose the locator of the element to wait for.")
+                return None
+        return ('Navigate to URL', url, description, strategy, readyWhen, locatorType, locatorValue)
+
     def createCheckbox(self, label, tooltip):
         try:
             checkbox = QCheckBox(label, self)
@@ -659,11 +966,25 @@ class Atom8(QMainWindow):
         except Exception as e:
             QMessageBox.warning(self, "Error", f"Error while creating checkbox: {e}")
 
+    def createBrowserOptionCheckbox(self, label, tooltip):
+        checkbox = self.createCheckbox(label, tooltip)
+        checkbox.toggled.connect(self.updateBrowserOptions)
+        self.browserOptionBoxes[label] = checkbox
+        return checkbox
+
+    def updateBrowserOptions(self):
+        self.browserOptions = [label for label, checkbox in self.browserOptionBoxes.items() if checkbox.isChecked()]
+
+    def setBrowserOptions(self, options):
+        for label, checkbox in self.browserOptionBoxes.items():
+            checkbox.setChecked(label in options)
+
     def setupActionSelection(self, layout):
         try:
             self.actionSelection = QComboBox(self)
             actions = ['Select Action', 'Navigate to URL', 'Click Element', 'Input Text', 'Take Screenshot',
-                       'Execute JavaScript', 'Sleep', 'Execute Python Script', 'Maximize Window', 'Compare Images']
+                       'Execute JavaScript', 'Sleep', 'Execute Python Script', 'Maximize Window', 'Compare Images',
+                       'Assert Page Load Under', 'Assert Step Duration Under', 'Assert Transfer Size Under']
             self.actionSelection.addItems(actions)
             self.actionSelection.currentIndexChanged.connect(self.updateFields)
 
@@ -692,6 +1013,9 @@ class Atom8(QMainWindow):
             self.sleepInput = QLineEdit(self)
             self.sleepInput.setPlaceholderText("Enter Sleep Time (in seconds)")
 
+            self.budgetInput = QLineEdit(self)
+            self.budgetInput.setPlaceholderText("Enter Budget")
+
             self.inputDescription = QLineEdit(self)
             self.inputDescription.setPlaceholderText("Enter Description")
 
@@ -707,6 +1031,39 @@ class Atom8(QMainWindow):
             self.outputPath.setToolTip("Enter the path where the output image should be saved")
             self.outputPath.setPlaceholderText("Enter Output Path")
 
+            self.loadStrategySelection = QComboBox(self)
+            self.loadStrategySelection.addItems(['Run Page Load Strategy'] + PAGE_LOAD_STRATEGIES)
+            self.loadStrategySelection.setToolTip(
+                "normal waits for the load event, eager for DOMContentLoaded, none returns once navigation starts")
+
+            self.readySelection = QComboBox(self)
+            self.readySelection.addItems(['Run Ready Condition'] + READY_CONDITIONS)
+            self.readySelection.setToolTip("What else to wait for before the next step runs")
+            self.readySelection.currentIndexChanged.connect(self.updateFields)
+
+            self.scriptModeSelection = QComboBox(self)
+            self.scriptModeSelection.addItems(RUN_MODES)
+            self.scriptModeSelection.setToolTip(
+                "In Process shares the browser driver; Process Pool runs in a worker process with a timeout; "
+                "Background does too, without waiting, so the next steps run alongside it")
+
+            self.scriptTimeoutInput = QLineEdit(self)
+            self.scriptTimeoutInput.setPlaceholderText("Timeout (seconds)")
+
+            self.scriptResultInput = QLineEdit(self)
+            self.scriptResultInput.setPlaceholderText("Store result as variable")
+            self.scriptResultInput.setToolTip("Name of the variable that receives the script's 'result'")
+
+            self.scopeSelection = QComboBox(self)
+            self.scopeSelection.addItems(['Full Viewport', 'Element', 'Clip Region'])
+            self.scopeSelection.setToolTip(
+                "Capture the whole viewport, one element (choose its locator), or a region of the page in CSS pixels")
+            self.scopeSelection.currentIndexChanged.connect(self.updateFields)
+
+            self.clipInput = QLineEdit(self)
+            self.clipInput.setPlaceholderText("x, y, width, height")
+            self.clipInput.setToolTip("Region of the page to capture, in CSS pixels from its top left corner")
+
             self.openPhoto = QCheckBox("Open Photo When Done", self)
             self.openPhoto.setToolTip("Open the photo after comparing images")
             self.openPhoto.setChecked(False)
@@ -714,22 +1071,47 @@ class Atom8(QMainWindow):
             fieldsLayout = QVBoxLayout()
             fieldsLayout.addWidget(self.inputText)
             fieldsLayout.addWidget(self.sleepInput)
+            fieldsLayout.addWidget(self.budgetInput)
             fieldsLayout.addWidget(self.inputDescription)
+            navigationLayout = QHBoxLayout()
+            navigationLayout.addWidget(self.loadStrategySelection)
+            navigationLayout.addWidget(self.readySelection)
+            fieldsLayout.addLayout(navigationLayout)
+            scriptLayout = QHBoxLayout()
+            scriptLayout.addWidget(self.scriptModeSelection)
+            scriptLayout.addWidget(self.scriptTimeoutInput)
+            scriptLayout.addWidget(self.scriptResultInput)
+            fieldsLayout.addLayout(scriptLayout)
             fieldsLayout.addWidget(self.refImgPath)
             fieldsLayout.addWidget(self.testImgPath)
             fieldsLayout.addWidget(self.outputPath)
+            scopeLayout = QHBoxLayout()
+            scopeLayout.addWidget(self.scopeSelection)
+            scopeLayout.addWidget(self.clipInput)
+            fieldsLayout.addLayout(scopeLayout)
             fieldsLayout.addWidget(self.openPhoto)
 
             self.refImgPath.setVisible(False)
             self.testImgPath.setVisible(False)
             self.outputPath.setVisible(False)
             self.openPhoto.setVisible(False)
+            self.loadStrategySelection.setVisible(False)
+            self.readySelection.setVisible(False)
+            self.budgetInput.setVisible(False)
+            self.scopeSelection.setVisible(False)
+            self.clipInput.setVisible(False)
+            self.setScriptFieldsVisible(False)
 
             actionSelectionLayout.addLayout(fieldsLayout)
             layout.addLayout(actionSelectionLayout)
         except Exception as e:
             QMessageBox.warning(self, "Error", f"Error while setting up action selection: {e}")
 
+    def setScriptFieldsVisible(self, visible):
+        self.scriptModeSelection.setVisible(visible)
+        self.scriptTimeoutInput.setVisible(visible)
+        self.scriptResultInput.setVisible(visible)
+
     def setupButtonsAndStepsList(self, layout):
         try:
             self.editMode = False
@@ -756,7 +1138,20 @@ class Atom8(QMainWindow):
             self.saveButton.setEnabled(True)
             self.saveButton.setVisible(False)
 
-            self.stepsList = QListWidget(self)
+            self.stepsFilter = QSortFilterProxyModel(self)
+            self.stepsFilter.setSourceModel(self.stepsModel)
+            self.stepsFilter.setFilterCaseSensitivity(Qt.CaseInsensitive)
+
+            self.stepsSearch = QLineEdit(self)
+            self.stepsSearch.setPlaceholderText("Filter steps...")
+            self.stepsSearch.setClearButtonEnabled(True)
+            self.stepsSearch.textChanged.connect(self.stepsFilter.setFilterFixedString)
+
+            self.stepsList = QListView(self)
+            self.stepsList.setModel(self.stepsFilter)
+            self.stepsList.setUniformItemSizes(True)
+            self.stepsList.setSelectionMode(QAbstractItemView.SingleSelection)
+            self.stepsList.setEditTriggers(QAbstractItemView.NoEditTriggers)
 
             self.startButton = QPushButton('Run', self)
             self.startButton.clicked.connect(self.startAutomation)
@@ -833,10 +1228,21 @@ class Atom8(QMainWindow):
             # """)
 
             layout.addLayout(buttonsLayout)
+            layout.addWidget(self.stepsSearch)
             layout.addWidget(self.stepsList)
         except Exception as e:
             QMessageBox.warning(self, "Error", f"Error while setting up buttons and steps list: {e}")
 
+    def selectedStepRow(self):
+        # Row in self.steps of the selected step, or -1; the view shows the filtered steps.
+        index = self.stepsFilter.mapToSource(self.stepsList.currentIndex())
+        return index.row() if index.isValid() else -1
+
+    def selectStepRow(self, row):
+        index = self.stepsFilter.mapFromSource(self.stepsModel.index(row))
+        if index.isValid():
+            self.stepsList.setCurrentIndex(index)
+
     def updateLocatorFields(self):
         try:
             locator_type = self.locatorSelection.currentText()
@@ -846,10 +1252,11 @@ class Atom8(QMainWindow):
 
     def removeSelectedStep(self):
         try:
-            selected_item = self.stepsList.currentRow()
+            self.finishStepLoading()
+            selected_item = self.selectedStepRow()
             if selected_item >= 0:
-                del self.steps[selected_item]
-                self.stepsList.takeItem(selected_item)
+                self.recordEdit({"op": "remove", "index": selected_item})
+                self.stepsModel.removeStep(selected_item)
                 self.logger.info(f"Removed step at index {selected_item}.")
             else:
                 QMessageBox.warning(self, "No Selection", "Please select a step to remove.")
@@ -860,7 +1267,10 @@ class Atom8(QMainWindow):
         try:
             action = self.actionSelection.currentText()
 
-            if action in ['Click Element', 'Input Text']:
+            screenshot = action in ['Take Screenshot', 'Compare Images']
+            if action in ['Click Element', 'Input Text'] or (
+                    action == 'Navigate to URL' and self.readySelection.currentText() == 'Element Present') or (
+                    screenshot and self.scopeSelection.currentText() == 'Element'):
                 self.locatorSelection.setVisible(True)
                 self.locatorInput.setVisible(True)
             else:
@@ -871,13 +1281,21 @@ class Atom8(QMainWindow):
                 action in ['Input Text', 'Execute Python Script', 'Execute JavaScript', 'Navigate to URL',
                            'Take Screenshot'])
             self.sleepInput.setVisible(action == 'Sleep')
+            self.budgetInput.setVisible(action in BUDGET_UNITS)
+            if action in BUDGET_UNITS:
+                self.budgetInput.setPlaceholderText(f"Enter Budget (in {BUDGET_UNITS[action]})")
             self.inputDescription.setVisible(
                 action in ['Click Element', 'Input Text', 'Navigate to URL', 'Execute Python Script',
-                           'Execute JavaScript'])
+                           'Execute JavaScript'] or action in BUDGET_UNITS)
             self.refImgPath.setVisible(action == 'Compare Images')
             self.testImgPath.setVisible(action == 'Compare Images')
             self.outputPath.setVisible(action == 'Compare Images')
             self.openPhoto.setVisible(action == 'Compare Images')
+            self.loadStrategySelection.setVisible(action == 'Navigate to URL')
+            self.readySelection.setVisible(action == 'Navigate to URL')
+            self.setScriptFieldsVisible(action == 'Execute Python Script')
+            self.scopeSelection.setVisible(screenshot)
+            self.clipInput.setVisible(screenshot and self.scopeSelection.currentText() == 'Clip Region')
 
             if action == 'Navigate to URL':
                 self.inputText.setPlaceholderText("Enter URL")
@@ -900,58 +1318,42 @@ class Atom8(QMainWindow):
         def __init__(self, parent=None):
             try:
                 super().__init__(parent)
-                self.setWindowTitle(
-                    f"Results for {parent.testName.text() if parent.testName.text() else 'Unnamed Test'}")
                 self.setGeometry(100, 100, 600, 600)
 
-                self.testNameLabel = QLabel(parent.testName.text() if parent.testName.text() else "Unnamed Test", self)
+                self.testNameLabel = QLabel(self)
                 self.testNameLabel.setStyleSheet("font-size: 16px; font-weight: bold; margin-bottom: 10px;")
                 self.testNameLabel.setMaximumWidth(550)
 
-                self.testDescriptionLabel = QLabel(
-                    parent.testDescription.text() if parent.testDescription.text() else "No description provided.",
-                    self)
+                self.testDescriptionLabel = QLabel(self)
                 self.testDescriptionLabel.setStyleSheet("font-size: 12px; margin-bottom: 10px;")
                 self.testDescriptionLabel.setWordWrap(True)
                 self.testDescriptionLabel.setMaximumWidth(550)
 
-                if any(checkbox.isChecked() for checkbox in parent.findChildren(QCheckBox)):
-                    self.browserOptionsLabel = QLabel("Performed on Chrome, with the following options:", self)
-                    self.browserOptionsLabel.setWordWrap(True)
-                    self.browserOptionsLabel.setMaximumWidth(550)
-                    for checkbox in parent.findChildren(QCheckBox):
-                        if checkbox.isChecked():
-                            if checkbox.text() == "Generate Report":
-                                continue
-                            self.browserOptionsLabel.setText(f"{self.browserOptionsLabel.text()}\n - {checkbox.text()}")
-                        else:
-                            continue
-                else:
-                    self.browserOptionsLabel = QLabel("Performed on Chrome, with no options selected.", self)
-                    self.browserOptionsLabel.setWordWrap(True)
-                    self.browserOptionsLabel.setMaximumWidth(550)
+                self.browserOptionsLabel = QLabel(self)
+                self.browserOptionsLabel.setWordWrap(True)
+                self.browserOptionsLabel.setMaximumWidth(550)
 
-                self.resultsTable = QTableWidget(self)
-                self.resultsTable.setColumnCount(2)
-                self.resultsTable.setHorizontalHeaderLabels(["Step", "Status"])
+                self.resultsModel = ResultsTableModel(parent.formatStepText, self)
+                self.resultsTable = QTableView(self)
+                self.resultsTable.setModel(self.resultsModel)
                 self.resultsTable.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
                 self.resultsTable.verticalHeader().setVisible(False)
-                self.resultsTable.setEditTriggers(QTableWidget.NoEditTriggers)
+                self.resultsTable.setEditTriggers(QTableView.NoEditTriggers)
                 self.resultsTable.setAlternatingRowColors(True)
                 self.resultsTable.setShowGrid(False)
 
                 self.resultsTable.setStyleSheet("""
-                    QTableWidget {
+                    QTableView {
                         border: 1px solid #ddd;
                         border-radius: 4px;
                         color: #555;
                         background-color: #f5f5f5;
                     }
-                    QTableWidget::item {
+                    QTableView::item {
                         padding: 4px;
                         color: #555;
                     }
-                    QTableWidget::item:selected {
+                    QTableView::item:selected {
                         background-color: #007BFF;
                         color: white;
                     }
@@ -993,6 +1395,23 @@ class Atom8(QMainWindow):
             except Exception as e:
                 QMessageBox.warning(self, "Error", f"Error while initializing results window: {e}")
 
+        def showResults(self, results):
+            parent = self.parent()
+            testName = parent.testName.text() if parent.testName.text() else "Unnamed Test"
+            self.setWindowTitle(f"Results for {testName}")
+            self.testNameLabel.setText(testName)
+            self.testDescriptionLabel.setText(
+                parent.testDescription.text() if parent.testDescription.text() else "No description provided.")
+
+            options = parent.checkedBrowserOptions()
+            if options:
+                self.browserOptionsLabel.setText(
+                    "Performed on Chrome, with the following options:" + "".join(f"\n - {option}" for option in options))
+            else:
+                self.browserOptionsLabel.setText("Performed on Chrome, with no options selected.")
+
+            self.resultsModel.setResults(results)
+
         def copyJiraMarkdown(self):
             try:
                 jiraMarkdown = self.parent().generateBugForJira()
@@ -1004,47 +1423,10 @@ class Atom8(QMainWindow):
 
         def exportReport(self):
             try:
-                data = []
-
-                # Adding test details
-                data.append(["Test Name", self.parent().testName.text()])
-                data.append(["Description", self.parent().testDescription.text()])
-                data.append(["", ""])  # Spacer row
-
-                # Collecting steps and statuses
-                for row in range(self.resultsTable.rowCount()):
-                    data.append([self.resultsTable.item(row, 0).text(), self.resultsTable.item(row, 1).text()])
-                data.append(["", ""])  # Spacer row
-
-                df = pd.DataFrame(data, columns=["Step", "Status"])
-
-                # Collecting browser options
-                browser_options = [checkbox.text() for checkbox in self.parent().findChildren(QCheckBox) if
-                                   checkbox.isChecked() and checkbox.text() != "Generate Report"]
-                browser_options_row = ["Browser Options", ', '.join(browser_options)] if browser_options else [
-                    "Browser Options", 'None']
-                df.loc[df.index.max() + 1] = browser_options_row
-
-                # Create a new Excel workbook
-                wb = Workbook()
-                ws = wb.active
-
-                # Convert DataFrame to Excel rows
-                for r_idx, row in enumerate(dataframe_to_rows(df, index=False, header=True)):
-                    for c_idx, value in enumerate(row, 1):
-                        cell = ws.cell(row=r_idx + 1, column=c_idx, value=value)
-
-                        # Applying styles
-                        if r_idx == 0:  # Header row
-                            cell.font = Font(bold=True)
-                        if c_idx == 2:  # Status column
-                            if value == "Passed":
-                                cell.fill = PatternFill(start_color='C6EFCE', end_color='C6EFCE', fill_type='solid')
-                            elif value == "Failed":
-                                cell.fill = PatternFill(start_color='FFC7CE', end_color='FFC7CE', fill_type='solid')
-
-                # Save the workbook
-                wb.save(f"{self.parent().testName.text()}.xlsx")
+                browser_options = self.parent().checkedBrowserOptions()
+                write_report(f"{self.parent().testName.text()}.xlsx", self.parent().testName.text(),
+                             self.parent().testDescription.text(), self.resultsModel.rows(), browser_options,
+                             performance_rows(self.resultsModel.results))
                 QMessageBox.information(self, "Exported", "Report exported successfully.")
             except Exception as e:
                 QMessageBox.warning(self, "Error", f"Error while exporting report: {e}")
@@ -1056,196 +1438,19 @@ class Atom8(QMainWindow):
         # self.stopButton.setVisible(True)
         self.logger.info("Starting automation...")
         try:
-            chromeOptionsMapping = {
-                "Headless Mode": "--headless",
-                "Disable GPU": "--disable-gpu",
-                "Incognito Mode": "--incognito",
-                "Disable Popup Blocking": "--disable-popup-blocking",
-                "Disable Infobars": "--disable-infobars",
-                "Disable Extensions": "--disable-extensions",
-                "Disable Dev Shm Usage": "--disable-dev-shm-usage",
-                "Ignore Certificate Errors": "--ignore-certificate-errors",
-                "Custom User Agent": "--user-agent",
-                "Disable JavaScript": "--disable-javascript",
-                "Disable Images": "--blink-settings=imagesEnabled=false",
-                "Enable Network Throttling": "--enable-network-throttling",
-                "Enable Performance Logging": "--enable-performance-logging",
-                "Enable GPU Hardware Acceleration": "--enable-gpu-rasterization",
-                "Remote Debugging Port": "--remote-debugging-port",
-                "Proxy Settings": "--proxy-server",
-                "Enable Automation": "--enable-automation",
-                "No Sandbox": "--no-sandbox",
-                "Disable Web Security": "--disable-web-security",
-                "Enable Experimental Features": "--enable-experimental-web-platform-features",
-                "Disable Password Manager": "--disable-password-manager-reauthentication",
-                "Disable Autofill": "--disable-autofill-keyboard-accessory-view",
-                "Disable Filesystem API": "--disable-filesystem",
-                "Disable Geolocation": "--disable-geolocation",
-            }
-
-            edgeOptionsMapping = {
-                "Headless Mode": "headless",
-                "Disable GPU": "disable-gpu",
-                "InPrivate Mode": "InPrivate",
-                "Disable Popup Blocking": "disable-popup-blocking",
-                "Disable Extensions": "disable-extensions",
-                "Ignore Certificate Errors": "ignore-certificate-errors",
-                "Custom User Agent": "user-agent",
-                "Disable JavaScript": "disable-javascript",
-                "Disable Images": "disable-images",
-                "Enable Network Throttling": "enable-network-throttling",
-                "Enable Performance Logging": "enable-performance-logging",
-                "Enable GPU Hardware Acceleration": "enable-gpu-rasterization",
-                "Remote Debugging Port": "remote-debugging-port",
-                "Proxy Settings": "proxy-server",
-                "Enable Automation": "enable-automation",
-                "No Sandbox": "no-sandbox",
-                "Disable Web Security": "disable-web-security",
-                "Enable Experimental Features": "enable-experimental-web-platform-features",
-                "Disable Password Manager": "disable-password-manager",
-                "Disable Autofill": "disable-autofill",
-                "Disable Filesystem API": "disable-filesystem",
-                "Disable Geolocation": "disable-geolocation",
-            }
-
-            browser_type = self.loadSetting("defaultBrowser", "Chrome")
-
-            chrome_driver_location = self.loadSetting("driverLocation", "chromedriver.exe")
-            msedge_driver_location = self.loadSetting("msedgeLocation", "msedgedriver.exe")
+            runLog = self.startRunLog()
 
             try:
-                if browser_type == "Chrome":
-                    chrome_options = Options()
-                    for checkbox in self.findChildren(QCheckBox):
-                        selenium_option = chromeOptionsMapping.get(checkbox.text())
-                        if selenium_option and checkbox.isChecked():
-                            chrome_options.add_argument(selenium_option)
-
-                    if not os.path.isfile(chrome_driver_location):
-                        raise ValueError("Invalid Chrome driver location")
-                    self.logger.info("Starting Chrome browser with WebDriver at: " + chrome_driver_location)
-                    self.driver = webdriver.Chrome(chrome_options)
-                elif browser_type == "Edge":
-                    edge_options = EdgeOptions()
-                    for checkbox in self.findChildren(QCheckBox):
-                        selenium_option = edgeOptionsMapping.get(checkbox.text())
-                        if selenium_option and checkbox.isChecked():
-                            edge_options.add_argument(selenium_option)
-
-                    if not os.path.isfile(msedge_driver_location):
-                        raise ValueError("Invalid Edge driver location")
-                    self.logger.info("Starting Edge browser with WebDriver at: " + msedge_driver_location)
-                    self.driver = webdriver.Edge(edge_options)
-                # Add support for other browsers here
-                else:
-                    raise ValueError("Unsupported browser type")
-
-                locator_strategies = {
-                    'XPath': By.XPATH,
-                    'CSS Selector': By.CSS_SELECTOR,
-                    'ID': By.ID,
-                    'Name': By.NAME,
-                    'Class Name': By.CLASS_NAME,
-                    'Tag Name': By.TAG_NAME,
-                    'Link Text': By.LINK_TEXT,
-                    'Partial Link Text': By.PARTIAL_LINK_TEXT
-                }
-
-                if self.generateReport.isChecked():
-                    results_window = self.ResultsWindow(self)
-                    results_window.resultsTable.setRowCount(len(self.steps))
-
-                self.results = []
-
-                for step in self.steps:
-                    action = step[0]
-                    try:
-                        # STEP
-                        if action == 'Navigate to URL':
-                            try:
-                                self.driver.get(step[1])
-                                self.results.append((step, 'Passed'))
-                            except Exception as e:
-                                self.logger.error(f"Error while navigating to URL: {e}")
-                                self.results.append((step, 'Failed'))
-                        elif action in ['Click Element', 'Input Text']:
-                            try:
-                                locator_type = step[1]
-                                locator_value = step[2]
-                                element = self.driver.find_element(locator_strategies[locator_type], locator_value)
-                                if action == 'Click Element':
-                                    element.click()
-                                    self.results.append((step, 'Passed'))
-                                else:
-                                    element.send_keys(step[3])
-                                    self.results.append((step, 'Passed'))
-                                self.logger.info(f"{action} at {locator_type}: {locator_value}")
-                            except Exception as e:
-                                self.logger.error(f"Error while performing {action}: {e}")
-                                self.results.append((step, 'Failed'))
-                        elif action == 'Take Screenshot':
-                            try:
-                                with open(self.settingsFilePath(), "r") as settings_file:
-                                    settings = json.load(settings_file)
-                                    screenshot_folder = settings.get("savePath")
-                                    if not os.path.isdir(screenshot_folder):
-                                        os.makedirs(screenshot_folder)
-                                    screenshot_filename = os.path.join(screenshot_folder, step[1])
-                                    self.driver.save_screenshot(screenshot_filename)
-                                    self.logger.info(f"Screenshot saved as {screenshot_filename}")
-                                self.results.append((step, 'Passed'))
-                            except Exception as e:
-                                self.logger.error(f"Error while taking screenshot: {e}")
-                                self.results.append((step, 'Failed'))
-                        elif action == 'Execute JavaScript':
-                            try:
-                                self.driver.execute_script(step[1])
-                                self.logger.info(f"Executed JavaScript: {step[1]}")
-                                self.results.append((step, 'Passed'))
-                            except Exception as e:
-                                self.logger.error(f"Error in JavaScript: {e}")
-                                self.results.append((step, 'Failed'))
-                        elif action == 'Sleep':
-                            try:
-                                time.sleep(float(step[1]))
-                                self.logger.info(f"Slept for {step[1]} seconds.")
-                                self.results.append((step, 'Passed'))
-                            except Exception as e:
-                                self.logger.error(f"Error while sleeping: {e}")
-                                self.results.append((step, 'Failed'))
-                        elif action == 'Maximize Window':
-                            try:
-                                self.driver.maximize_window()
-                                self.logger.info("Maximized window.")
-                                self.results.append((step, 'Passed'))
-                            except Exception as e:
-                                self.logger.error(f"Error while maximizing window: {e}")
-                                self.results.append((step, 'Failed'))
-                        elif action == 'Execute Python Script':
-                            try:
-                                exec(open(step[1]).read())
-                                self.logger.info(f"Executed Python script: {step[1]}")
-                                self.results.append((step, 'Passed'))
-                            except Exception as e:
-                                self.logger.error(f"Error in Python script: {e}")
-                                self.results.append((step, 'Failed'))
-                        elif action == 'Compare Images':
-                            try:
-                                self.logger.info(f"Comparing images: {step[1]} and {step[2]}.")
-                                if self.compareImages(step[1], step[2], step[3]):
-                                    if self.openPhoto.isChecked():
-                                        self.logger.info(f"Opening photo: {step[3]}")
-                                        self.openPhotoState = True
-                                        os.startfile(self.outputFileName)
-                                self.results.append((step, 'Passed'))
-                            except Exception as e:
-                                self.logger.error(f"Error in {action}: {e}")
-                                self.results.append((step, 'Failed'))
-
-                    except Exception as e:
-                        self.logger.error(f"Error in {action}: {e}")
+                started = time.monotonic()
+                self.driver = self.createDriver()
+                engine = self.createEngine(self.driver)
+                self.results = engine.run(
+                    self.iterSteps(), on_step=lambda index, step: runLog.context.update(step=index + 1, action=step[0]))
+                self.outputFileName = engine.outputFileName
 
                 self.driver.quit()
+                self.recordHistory(runLog.run_id, [(self.currentFilePath or self.testName.text(), self.results, None,
+                                                    time.monotonic() - started)])
 
                 if self.generateReport.isChecked():
                     self.displayResults(self.results)
@@ -1255,9 +1460,64 @@ class Atom8(QMainWindow):
             except Exception as e:
                 self.logger.error(f"Error: {e}")
                 QMessageBox.critical(self, "Error", str(e))
+            finally:
+                runLog.stop()
         except Exception as e:
             QMessageBox.warning(self, "Error", f"Error while running the script: {e}")
 
+    def startRunLog(self):
+        logPath = self.loadSetting("logPath", "") or os.path.join(os.path.dirname(self.settingsFilePath()), 'logs')
+        runLog = RunLog(self.logger, logPath, file=self.currentFilePath or self.testName.text(),
+                        compress=self.loadSetting("compressLogs", "None") == "gzip").start()
+        self.logger.info(f"Run {runLog.run_id} logging to {runLog.path}")
+        return runLog
+
+    def checkedBrowserOptions(self):
+        return list(self.browserOptions)
+
+    def createDriver(self):
+        return self.driverFactory()()
+
+    def driverFactory(self, nodePool=None):
+        # Reads settings and widgets on the GUI thread; the returned callable may be used from worker threads.
+        settings = self.loadSettings()
+        if nodePool is None:
+            nodePool = node_pool_from_settings(settings, self.logger)
+        return session_factory(settings, settings.get("defaultBrowser", "Chrome"), self.checkedBrowserOptions(),
+                               self.logger, node_pool=nodePool)
+
+    def createEngine(self, driver, testName=None):
+        settings = self.loadSettings()
+        return AutomationEngine(driver, self.logger, save_path=settings.get("savePath"),
+                                test_name=self.testName.text() if testName is None else testName,
+                                open_photo=self.openPhoto.isChecked(),
+                                on_wait=QApplication.processEvents,
+                                **engine_options(settings, self.currentFileHeader, self.checkedBrowserOptions()))
+
+    def editFileRequestBlocking(self):
+        try:
+            dialog = QDialog(self)
+            dialog.setWindowTitle("Request Blocking for This File")
+            layout = QVBoxLayout()
+            layout.addWidget(QLabel("Saved in the .atm8 file and applied in addition to the rules in Preferences."))
+            editor = RequestBlockingEditor(dialog)
+            editor.setConfig(self.currentFileHeader.get("blocking"))
+            layout.addWidget(editor)
+            okButton = QPushButton("OK")
+            okButton.clicked.connect(dialog.accept)
+            layout.addWidget(okButton)
+            dialog.setLayout(layout)
+            dialog.resize(450, 450)
+            if dialog.exec_() == QDialog.Accepted:
+                config = editor.config()
+                if config["categories"] or config["patterns"]:
+                    self.currentFileHeader["blocking"] = config
+                else:
+                    self.currentFileHeader.pop("blocking", None)
+                self.statusBar.showMessage("Request blocking updated; save the file to keep it.", 5000)
+        except Exception as e:
+            QMessageBox.warning(self, "Error", f"Error while editing request blocking: {e}")
+
     # def stopAutomation(self):
     #     self.startButton.setEnabled(True)
     #     self.startButton.setVisible(True)
@@ -1271,45 +1531,332 @@ class Atom8(QMainWindow):
     #         QMessageBox.warning(self, "Error", f"Error while stopping the script: {e}")
 
     def formatStepText(self, step):
-        # STEP
         try:
-            action = step[0]
-            if action == 'Sleep':
-                return f'Sleep for {step[1]} seconds'
-            elif action in ['Click Element', 'Input Text']:
-                return f'{action} at {step[1]}: {step[2]}'
-            elif action in ['Navigate to URL', 'Execute JavaScript', 'Execute Python Script']:
-                return f'{action}: {step[1]}'
-            elif action == 'Take Screenshot':
-                return f'Take screenshot: {step[1]}'
-            elif action == 'Maximize Window':
-                return 'Maximize Window'
-            elif action == 'Compare Images':
-                return f'Comparing images: {step[1]} and {step[2]}.'
-            else:
-                return 'Unknown Action'
+            return format_step_text(step)
         except Exception as e:
             QMessageBox.warning(self, "Error", f"Error while formatting step text: {e}")
 
-    def displayResults(self, results):
+    def cleanArtifactStore(self):
+        try:
+            settings = self.loadSettings()
+            store = store_from_settings(settings, self.logger)
+            if store is None:
+                QMessageBox.information(self, "Screenshot Store", "Screenshots are saved as plain files; there is no "
+                                                                  "store to clean up.")
+                return
+            keepRuns, keepDays = settings.get("artifactKeepRuns"), settings.get("artifactKeepDays")
+            if keepRuns is None and keepDays is None:
+                QMessageBox.information(self, "Screenshot Store", "No retention is set in Preferences, so only images "
+                                                                  "no run or baseline refers to will be removed.")
+            runs, objects, freed = store.gc(keepRuns, keepDays)
+            message = f"Removed {runs} runs and {objects} images, freeing {freed / 1024 / 1024:,.1f} MB."
+            self.logger.info(message)
+            QMessageBox.information(self, "Screenshot Store", message)
+        except Exception as e:
+            QMessageBox.warning(self, "Error", f"Error while cleaning up the screenshot store: {e}")
+
+    def recordHistory(self, runId, files, browser=None, options=None):
+        # files holds (path, results, status, duration in seconds) for each file run.
         try:
-            results_window = self.ResultsWindow(self)
-            results_window.resultsTable.setRowCount(len(results))
+            history = RunHistory()
+            try:
+                browser = browser or self.loadSetting("defaultBrowser", "Chrome")
+                options = self.checkedBrowserOptions() if options is None else options
+                for path, results, status, duration in files:
+                    history.recordRun(path, results, status=status, browser=browser, options=options,
+                                      duration=duration, run_id=runId)
+            finally:
+                history.close()
+        except Exception as e:
+            self.logger.warning(f"Could not record the run history: {e}")
 
-            for index, (step, status) in enumerate(results):
-                step_text = self.formatStepText(step)
-                step_item = QTableWidgetItem(step_text)
-                status_item = QTableWidgetItem(status)
+    def showMatrix(self):
+        try:
+            if self.matrixWindow is None:
+                try:
+                    self.setupMatrix()
+                except Exception:
+                    # A half-built window is not kept; the next open builds it again.
+                    self.matrixWindow = None
+                    raise
+            self.refreshMatrixProfiles()
+            self.matrixWindow.show()
+            self.matrixWindow.raise_()
+        except Exception as e:
+            QMessageBox.warning(self, "Error", f"Error while showing the browser matrix: {e}")
+
+    def setupMatrix(self):
+        self.matrixWindow = QDialog(self, Qt.Window)
+        self.matrixWindow.setWindowTitle("Browser Matrix")
+        self.matrixWindow.setGeometry(100, 100, 900, 600)
+        matrixLayout = QVBoxLayout()
+
+        listsLayout = QHBoxLayout()
+        self.matrixBrowsers = QListWidget()
+        defaultBrowser = self.loadSetting("defaultBrowser", "Chrome")
+        for browser in BROWSERS:
+            item = QListWidgetItem(browser)
+            item.setFlags(item.flags() | Qt.ItemIsUserCheckable)
+            item.setCheckState(Qt.Checked if browser == defaultBrowser else Qt.Unchecked)
+            self.matrixBrowsers.addItem(item)
+        self.matrixProfiles = QListWidget()
+        self.matrixProfiles.setToolTip(f"'{CURRENT_PROFILE}' are the options checked in the Browser Options tab")
+        browsersLayout = QVBoxLayout()
+        browsersLayout.addWidget(QLabel("Browsers:"))
+        browsersLayout.addWidget(self.matrixBrowsers)
+        profilesLayout = QVBoxLayout()
+        profilesLayout.addWidget(QLabel("Option Profiles:"))
+        profilesLayout.addWidget(self.matrixProfiles)
+        saveProfileButton = QPushButton("Save Current Options as Profile")
+        saveProfileButton.clicked.connect(self.saveMatrixProfile)
+        profilesLayout.addWidget(saveProfileButton)
+        listsLayout.addLayout(browsersLayout)
+        listsLayout.addLayout(profilesLayout)
+        matrixLayout.addLayout(listsLayout)
+
+        self.matrixSizesInput = QLineEdit()
+        self.matrixSizesInput.setPlaceholderText("Window sizes, e.g. 1920x1080, 390x844 (empty keeps the default)")
+        self.matrixWorkersInput = QLineEdit()
+        self.matrixWorkersInput.setPlaceholderText("Cells at once (all)")
+        runButton = QPushButton("Run Matrix")
+        runButton.clicked.connect(self.runMatrix)
+        exportButton = QPushButton("Export Report")
+        exportButton.clicked.connect(self.exportMatrixReport)
+        controlsLayout = QHBoxLayout()
+        controlsLayout.addWidget(self.matrixSizesInput, 1)
+        controlsLayout.addWidget(self.matrixWorkersInput)
+        controlsLayout.addWidget(runButton)
+        controlsLayout.addWidget(exportButton)
+        matrixLayout.addLayout(controlsLayout)
+
+        self.matrixTable = QTableWidget(0, 0)
+        self.matrixTable.verticalHeader().setVisible(False)
+        self.matrixTable.setEditTriggers(QTableWidget.NoEditTriggers)
+        matrixLayout.addWidget(self.matrixTable)
+        self.matrixWindow.setLayout(matrixLayout)
+
+    def refreshMatrixProfiles(self):
+        checked = set(self.checkedListItems(self.matrixProfiles)) or {CURRENT_PROFILE}
+        self.matrixProfiles.clear()
+        for name in [CURRENT_PROFILE] + sorted(self.loadSetting("matrixProfiles", {})):
+            item = QListWidgetItem(name)
+            item.setFlags(item.flags() | Qt.ItemIsUserCheckable)
+            item.setCheckState(Qt.Checked if name in checked else Qt.Unchecked)
+            self.matrixProfiles.addItem(item)
+
+    def checkedListItems(self, listWidget):
+        return [listWidget.item(i).text() for i in range(listWidget.count()) if
+                listWidget.item(i).checkState() == Qt.Checked]
+
+    def saveMatrixProfile(self):
+        try:
+            name, ok = QInputDialog.getText(self.matrixWindow, "Save Option Profile",
+                                            "Profile name for the checked browser options:")
+            if not ok or not name.strip():
+                return
+            if name.strip() == CURRENT_PROFILE:
+                QMessageBox.warning(self.matrixWindow, "Invalid Name", f"'{CURRENT_PROFILE}' is reserved.")
+                return
+            profiles = self.loadSetting("matrixProfiles", {})
+            profiles[name.strip()] = self.checkedBrowserOptions()
+            self.saveSetting("matrixProfiles", profiles)
+            self.refreshMatrixProfiles()
+        except Exception as e:
+            QMessageBox.warning(self, "Error", f"Error while saving the option profile: {e}")
 
-                if status == 'Passed':
-                    status_item.setBackground(QColor(203, 255, 171))
-                else:
-                    status_item.setBackground(QColor(255, 171, 171))
+    def runMatrix(self):
+        try:
+            settings = self.loadSettings()
+            saved = settings.get("matrixProfiles", {})
+            profiles = [(name, self.checkedBrowserOptions() if name == CURRENT_PROFILE else saved.get(name, []))
+                        for name in self.checkedListItems(self.matrixProfiles)]
+            sizes = [parse_window_size(size) for size in self.matrixSizesInput.text().split(",") if size.strip()]
+            cells = matrix_cells(self.checkedListItems(self.matrixBrowsers), profiles, sizes)
+            workers = int(self.matrixWorkersInput.text()) if self.matrixWorkersInput.text().strip() else None
+
+            # Read everything the cells need here, on the GUI thread; the cells run on worker threads.
+            nodePool = node_pool_from_settings(settings, self.logger)
+            self.finishStepLoading()
+            steps = list(self.steps)
+            header = dict(self.currentFileHeader)
+            testName = self.testName.text()
 
-                results_window.resultsTable.setItem(index, 0, step_item)
-                results_window.resultsTable.setItem(index, 1, status_item)
+            def runCell(cell):
+                driver = session_factory(settings, cell.browser, cell.options, self.logger, cell.windowSize,
+                                         nodePool)()
+                try:
+                    engine = AutomationEngine(driver, self.logger, save_path=settings.get("savePath"),
+                                              test_name=testName, **engine_options(settings, header, cell.options))
+                    return engine.run(steps, on_step=lambda index, step: runLog.context.update(
+                        step=index + 1, action=step[0]))
+                finally:
+                    driver.quit()
+
+            self.logger.info(f"Running {len(cells)} matrix cells.")
+            runLog = self.startRunLog()
+            run = MatrixRun(cells, runCell, self.logger, runLog)
+            try:
+                status = run.run(workers, on_wait=QApplication.processEvents)
+            finally:
+                runLog.stop()
+            for cell in cells:
+                if run.cellResults.get(cell.label) is not None:
+                    self.recordHistory(runLog.run_id, [(self.currentFilePath or testName, run.cellResults[cell.label],
+                                                        None, run.cellDurations.get(cell.label))],
+                                       cell.browser, cell.options)
+            self.matrixRun = run
+            self.fillMatrixTable()
+            passed = sum(1 for value in status.values() if value == 'Passed')
+            self.logger.info(f"\n\nMatrix completed: {passed} of {len(cells)} cells passed.\n")
+        except Exception as e:
+            QMessageBox.warning(self, "Error", f"Error while running the browser matrix: {e}")
+
+    def matrixReportRows(self):
+        cells = self.matrixRun.cells
+        return matrix_rows([cell.label for cell in cells], self.matrixRun.results(),
+                           [self.matrixRun.cellDurations.get(cell.label) for cell in cells])
+
+    def fillMatrixTable(self):
+        header, *rows = self.matrixReportRows()
+        self.matrixTable.setColumnCount(len(header))
+        self.matrixTable.setHorizontalHeaderLabels(header)
+        self.matrixTable.setRowCount(len(rows))
+        for row, values in enumerate(rows):
+            for column, value in enumerate(values):
+                item = QTableWidgetItem(value)
+                if column and value.startswith('Passed'):
+                    item.setBackground(QColor('#C6EFCE'))
+                elif column and value.startswith('Failed'):
+                    item.setBackground(QColor('#FFC7CE'))
+                self.matrixTable.setItem(row, column, item)
+        self.matrixTable.resizeColumnsToContents()
+
+    def exportMatrixReport(self):
+        try:
+            if self.matrixRun is None:
+                QMessageBox.information(self.matrixWindow, "No Results", "Run the matrix first.")
+                return
+            path, _ = QFileDialog.getSaveFileName(self.matrixWindow, "Save Matrix Report", "",
+                                                  "Excel Files (*.xlsx)")
+            if not path:
+                return
+            cells = self.matrixRun.cells
+            write_matrix_report(path, self.testName.text(), self.testDescription.text(),
+                                self.matrixReportRows(), [cell.options for cell in cells])
+            self.logger.info(f"Matrix report saved to {path}")
+        except Exception as e:
+            QMessageBox.warning(self, "Error", f"Error while exporting the matrix report: {e}")
 
-            results_window.exec_()
+    def showHistory(self):
+        try:
+            if self.historyWindow is None:
+                try:
+                    self.setupHistory()
+                except Exception:
+                    # A half-built window is not kept; the next open builds it again.
+                    self.historyWindow = None
+                    raise
+            self.refreshHistory()
+            self.historyWindow.show()
+            self.historyWindow.raise_()
+        except Exception as e:
+            QMessageBox.warning(self, "Error", f"Error while showing run history: {e}")
+
+    def setupHistory(self):
+        self.historyWindow = QDialog(self, Qt.Window)
+        self.historyWindow.setWindowTitle("Run History")
+        self.historyWindow.setGeometry(100, 100, 900, 600)
+        historyLayout = QVBoxLayout()
+
+        filterLayout = QHBoxLayout()
+        self.historyFileSelection = QComboBox()
+        self.historyFileSelection.currentIndexChanged.connect(self.refreshHistory)
+        self.historyRunsInput = QLineEdit()
+        self.historyRunsInput.setPlaceholderText("Last 20 runs")
+        refreshButton = QPushButton("Refresh")
+        refreshButton.clicked.connect(self.refreshHistory)
+        filterLayout.addWidget(QLabel("File:"))
+        filterLayout.addWidget(self.historyFileSelection, 1)
+        filterLayout.addWidget(self.historyRunsInput)
+        filterLayout.addWidget(refreshButton)
+        historyLayout.addLayout(filterLayout)
+
+        self.historyTables = {}
+        historyTabs = QTabWidget()
+        for key, title, headers in [
+            ("runs", "Runs", ["Started", "File", "Status", "Duration", "Browser"]),
+            ("slowest", "Slowest Steps", ["Step", "File", "Mean", "Slowest", "Runs"]),
+            ("percentiles", "Step Trends", ["Step", "File", "p95", "Median", "Runs"]),
+            ("failures", "Failures", ["Step", "File", "Failing Since", "Failed Runs"]),
+            ("flaky", "Flaky", ["File or Step", "File", "Flip Score", "Failed Runs", "Runs"]),
+        ]:
+            table = QTableWidget(0, len(headers))
+            table.setHorizontalHeaderLabels(headers)
+            table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+            table.verticalHeader().setVisible(False)
+            table.setEditTriggers(QTableWidget.NoEditTriggers)
+            historyTabs.addTab(table, title)
+            self.historyTables[key] = table
+        historyLayout.addWidget(historyTabs)
+        self.historyWindow.setLayout(historyLayout)
+
+    def refreshHistory(self, checked=False):
+        try:
+            history = RunHistory()
+            try:
+                selectedFile = self.historyFileSelection.currentText()
+                self.historyFileSelection.blockSignals(True)
+                self.historyFileSelection.clear()
+                self.historyFileSelection.addItems(["All Files"] + history.files())
+                self.historyFileSelection.setCurrentText(selectedFile or "All Files")
+                self.historyFileSelection.blockSignals(False)
+                file = None if self.historyFileSelection.currentIndex() <= 0 else selectedFile
+                runs = int(self.historyRunsInput.text() or 20)
+
+                def ms(value):
+                    return "" if value is None else f"{value:,.0f} ms"
+
+                def stepText(row):
+                    return self.formatStepText(json.loads(row["step"]))
+
+                self.fillHistoryTable("runs", [
+                    [run["started"], run["file"], run["status"],
+                     "" if run["duration"] is None else f"{run['duration']:.1f} s", run["browser"] or ""]
+                    for run in history.runs(file, runs)])
+                self.fillHistoryTable("slowest", [
+                    [stepText(row), row["file"], ms(row["mean"]), ms(row["slowest"]), str(row["runs"])]
+                    for row in history.slowestSteps(file, runs, limit=50)])
+                self.fillHistoryTable("percentiles", [
+                    [stepText(row), row["file"], ms(row["percentile"]), ms(row["median"]), str(row["runs"])]
+                    for row in history.stepPercentiles(file, runs)])
+                self.fillHistoryTable("failures", [
+                    [stepText(row), row["file"], row["since"], str(row["failures"])]
+                    for row in history.firstFailures(file)])
+                # Flip scores of every file, or of the steps of the selected one.
+                flaky = history.stepFlakiness(file, runs) if file else history.fileFlakiness(runs=runs)
+                self.fillHistoryTable("flaky", [
+                    [stepText(row) if file else os.path.basename(row["file"]), row["file"], f"{row['score']:.2f}",
+                     str(row["failures"]), str(row["runs"])] for row in flaky])
+            finally:
+                history.close()
+        except Exception as e:
+            QMessageBox.warning(self, "Error", f"Error while loading run history: {e}")
+
+    def fillHistoryTable(self, key, rows):
+        table = self.historyTables[key]
+        table.setRowCount(len(rows))
+        for row, values in enumerate(rows):
+            for column, value in enumerate(values):
+                table.setItem(row, column, QTableWidgetItem(value))
+        table.resizeColumnsToContents()
+        table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+
+    def displayResults(self, results):
+        try:
+            if self.runResultsWindow is None:
+                self.runResultsWindow = self.ResultsWindow(self)
+            self.runResultsWindow.showResults(results)
+            self.runResultsWindow.exec_()
         except Exception as e:
             QMessageBox.warning(self, "Error", f"Error while displaying results: {e}")
 
@@ -1392,16 +1939,17 @@ class Atom8(QMainWindow):
             <p><strong>Build Script:</strong> You can build the script by adding steps to the steps list.</p>
             <p><strong>Run Script:</strong> Click the Run button to start the automation process.</p>
             <p><strong>Sequencer:</strong> You can execute multiple atm8 files in sequence by adding them to the sequencer.</p>
+            <p><strong>Requirements:</strong> In Dependency Graph mode, each file runs in its own browser as soon as the files it requires have passed; files whose requirements fail are skipped.</p>
             <h3>Steps</h3>
             <p><strong>Navigate to URL:</strong> Navigate to a specific URL.</p>
             <p><strong>Click Element:</strong> Click on an element on the page.</p>
             <p><strong>Input Text:</strong> Input text into an element on the page.</p>
-            <p><strong>Take Screenshot:</strong> Take a screenshot of the current page.</p>
+            <p><strong>Take Screenshot:</strong> Take a screenshot of the current page, one element or a clip region.</p>
             <p><strong>Execute JavaScript:</strong> Execute JavaScript code on the page.</p>
             <p><strong>Execute Python Script:</strong> Execute a Python script.</p>
             <p><strong>Sleep:</strong> Pause the script for a specified amount of time.</p>
             <p><strong>Maximize Window:</strong> Maximize the browser window.</p>
-            <p><strong>Compare Images:</strong> Compare two images.</p>
+            <p><strong>Compare Images:</strong> Compare a reference image with a capture of the page, one element or a clip region.</p>
             <hr>
             <p>For full documentation, information about available options and usage - visit the <a href="https://github.com/Dcohen52/Atom8" target="_blank">Atom8 GitHub Repository</a>.</p>
         </body>
@@ -1412,37 +1960,130 @@ class Atom8(QMainWindow):
 
     def saveFile(self):
         try:
-            fileName, _ = QFileDialog.getSaveFileName(self, "Save As", "", "Atom8 Files (*.atm8)")
+            fileName, selectedFilter = QFileDialog.getSaveFileName(
+                self, "Save As", "", "Atom8 Files (*.atm8);;Compact Atom8 Files (*.atm8)")
             if fileName:
                 self.currentFilePath = fileName
+                self.currentFileCompact = selectedFilter.startswith("Compact")
                 self.updateRecentFiles(fileName)
-                with open(fileName, "w+") as file:
-                    file_content = {
-                        "testName": self.testName.text(),
-                        "testDescription": self.testDescription.text(),
-                        "steps": self.steps
-                    }
-                    json.dump(file_content, file)
+                self.writeAtm8File(fileName)
                 self.statusBar.showMessage(f"File saved as {fileName} successfully.", 5000)
         except Exception as e:
             QMessageBox.warning(self, "Error", f"Error while saving file: {e}")
 
     def realSaveFile(self):
         try:
-            if self.currentFilePath:
-                with open(self.currentFilePath, "w") as file:
-                    file_content = {
-                        "testName": self.testName.text(),
-                        "testDescription": self.testDescription.text(),
-                        "steps": self.steps
-                    }
-                    json.dump(file_content, file)
+            if self.currentFilePath and self.isIncompleteSource(self.currentFilePath):
+                QMessageBox.warning(self, "Incomplete File",
+                                    f"Some steps of {self.currentFilePath} could not be read, so saving over it "
+                                    f"would lose them. Choose a new name.")
+                self.saveFile()
+            elif self.currentFilePath:
+                self.writeAtm8File(self.currentFilePath)
                 self.statusBar.showMessage(f"File {self.currentFilePath} saved successfully.", 5000)
             else:
                 self.saveFile()
         except Exception as e:
             QMessageBox.warning(self, "Error", f"Error while saving file: {e}")
 
+    def currentHeader(self):
+        header = dict(self.currentFileHeader)
+        header.update({
+            "testName": self.testName.text(),
+            "testDescription": self.testDescription.text(),
+        })
+        return header
+
+    def isIncompleteSource(self, fileName):
+        return self.incompleteSource is not None and os.path.abspath(fileName) == self.incompleteSource
+
+    def writeAtm8File(self, fileName):
+        self.finishStepLoading()
+        if self.isIncompleteSource(fileName):
+            raise ValueError(f"Some steps of {fileName} could not be read; save under a new name to keep the file")
+        atm8file.save(fileName, self.currentHeader(), self.steps, compact=self.currentFileCompact)
+        self.startJournal(fileName)
+
+    def journalDirectory(self):
+        return app_data_path('journals')
+
+    def startJournal(self, source):
+        # The journal holds the edits made since source was saved; opening or saving a file starts it over.
+        if self.journal is not None:
+            self.journal.discard()
+        self.headerEdited = False
+        self.journal = atm8file.Journal(self.journalDirectory(), source).start()
+
+    def recordEdit(self, edit):
+        if self.journal is None:
+            self.startJournal(self.currentFilePath)
+        self.journal.record(edit)
+
+    def recordReset(self):
+        self.recordEdit({"op": "reset", "steps": [atm8file.step_to_record(step) for step in self.steps]})
+
+    def markHeaderEdited(self, text=None):
+        self.headerEdited = True
+
+    def autosave(self):
+        try:
+            if self.headerEdited:
+                self.recordEdit({"op": "header", "header": {"testName": self.testName.text(),
+                                                            "testDescription": self.testDescription.text()}})
+                self.headerEdited = False
+            if self.journal is not None:
+                # A snapshot taken while a file is still streaming in would miss its unread steps.
+                loaded = self.stepLoader is None
+                self.journal.flush(self.currentHeader() if loaded else None, self.steps if loaded else None)
+        except Exception as e:
+            self.logger.warning(f"Autosave failed: {e}")
+
+    def recoverJournals(self):
+        directory = self.journalDirectory()
+        if not os.path.isdir(directory):
+            return
+        for name in sorted(os.listdir(directory)):
+            if not name.endswith(".jsonl"):
+                continue
+            path = os.path.join(directory, name)
+            try:
+                source, header, steps, edits = atm8file.replay_journal(path)
+            except Exception as e:
+                self.logger.warning(f"Discarded autosave journal {name}: {e}")
+                self.discardJournalFiles(path)
+                continue
+            if not edits:
+                self.discardJournalFiles(path)
+                continue
+            response = QMessageBox.question(
+                self, "Recover Unsaved Changes",
+                f"{edits} unsaved change{'s' if edits != 1 else ''} to {source or 'an untitled file'} were found. "
+                f"Restore them?", QMessageBox.Yes | QMessageBox.No, QMessageBox.Yes)
+            if response != QMessageBox.Yes:
+                self.discardJournalFiles(path)
+                continue
+            self.closeStepLoader()
+            self.currentFilePath = source
+            self.testName.setText(header.get("testName", ""))
+            self.testDescription.setText(header.get("testDescription", ""))
+            self.currentFileHeader = {key: value for key, value in header.items() if
+                                      key not in ("format", "version", "testName", "testDescription")}
+            self.steps = steps
+            # Keep appending to the recovered journal, so the edits survive another crash before saving.
+            self.journal = atm8file.Journal(directory, source)
+            self.journal.edits = edits - self.journal.snapshotEdits
+            self.statusBar.showMessage(f"Recovered unsaved changes to {source or 'an untitled file'}.", 5000)
+            return
+
+    def discardJournalFiles(self, path):
+        atm8file.discard_journal(path)
+
+    def closeEvent(self, event):
+        # Closing the window is a deliberate exit, so the autosave journal is only kept after a crash.
+        if self.journal is not None:
+            self.journal.discard()
+        super().closeEvent(event)
+
     def openFile(self):
         try:
             fileName, _ = QFileDialog.getOpenFileName(self, "Open File", "", "Atom8 Files (*.atm8)")
@@ -1450,26 +2091,88 @@ class Atom8(QMainWindow):
                 self.currentFilePath = fileName
                 self.updateRecentFiles(fileName)
                 try:
-                    with open(fileName, "r") as file:
-                        file_content = json.load(file)
-                        if not isinstance(file_content, dict) or "steps" not in file_content:
-                            raise ValueError("File content is not in the expected format")
-
-                        self.testName.setText(file_content.get("testName", ""))
-                        self.testDescription.setText(file_content.get("testDescription", ""))
-                        self.steps = file_content["steps"]
-                        self.stepsList.clear()
-                        for index, step in enumerate(self.steps):
-                            if not isinstance(step, (list, tuple)):
-                                QMessageBox.critical(self, "Error", f"Invalid step format at index {index}: {step}")
-                                continue
-                            display_text = self.constructStepDisplayText(step)
-                            self.stepsList.addItem(display_text)
+                    self.loadAtm8File(fileName)
                 except Exception as e:
                     QMessageBox.critical(self, "Error", f"Failed to open file: {e}")
         except Exception as e:
             QMessageBox.warning(self, "Error", f"Error while opening file: {e}")
 
+    def loadAtm8File(self, fileName):
+        # Only the header and the first chunk of steps are read here; the rest is streamed into the steps
+        # list from the event loop, or pulled on demand by a run that starts before loading has finished.
+        reader = atm8file.open_steps(fileName, skip_invalid=True)
+        self.closeStepLoader()
+        self.incompleteSource = None
+        self.testName.setText(reader.header.get("testName", ""))
+        self.testDescription.setText(reader.header.get("testDescription", ""))
+        self.currentFileCompact = reader.compact
+        self.currentFileHeader = {key: value for key, value in reader.header.items() if
+                                  key not in ("format", "version", "testName", "testDescription")}
+        self.steps = []
+        self.stepLoader = reader
+        self.startJournal(fileName)
+        self.continueStepLoading()
+
+    def continueStepLoading(self):
+        try:
+            if self.loadStepChunk():
+                QTimer.singleShot(0, self.continueStepLoading)
+        except Exception as e:
+            self.markIncompleteLoad()
+            QMessageBox.critical(self, "Error", f"Failed to load steps: {e}")
+
+    def loadStepChunk(self):
+        if self.stepLoader is None:
+            return False
+        loader, reported = self.stepLoader, self.skippedSteps
+        chunk = []
+        while len(chunk) < self.stepChunkSize:
+            try:
+                chunk.append(next(self.stepLoader))
+            except StopIteration:
+                self.closeStepLoader()
+                break
+            except ValueError as e:
+                # Only a truncated file ends up here, and nothing after the damage can be read.
+                self.logger.error(f"Stopped loading steps: {e}")
+                self.markIncompleteLoad()
+                break
+        for problem in loader.skipped[reported:]:
+            self.logger.error(f"Skipped step: {problem}")
+            self.incompleteSource = os.path.abspath(loader.path)
+            self.statusBar.showMessage("Some steps could not be read; save the file under a new name.", 10000)
+        if self.stepLoader is not None:
+            self.skippedSteps = len(loader.skipped)
+        self.stepsModel.appendSteps(chunk)
+        return self.stepLoader is not None
+
+    def finishStepLoading(self):
+        # Edits call this first: an edit made while steps are still streaming in would land among them, and the
+        # journal would record indices that shift as more chunks arrive.
+        while self.loadStepChunk():
+            pass
+
+    def closeStepLoader(self):
+        if self.stepLoader is not None:
+            self.stepLoader.close()
+            self.stepLoader = None
+        self.skippedSteps = 0
+
+    def markIncompleteLoad(self):
+        if self.stepLoader is not None:
+            self.incompleteSource = os.path.abspath(self.stepLoader.path)
+            self.closeStepLoader()
+        self.statusBar.showMessage("Some steps could not be read; save the file under a new name.", 10000)
+
+    def iterSteps(self):
+        index = 0
+        while True:
+            while index < len(self.steps):
+                yield self.steps[index]
+                index += 1
+            if not self.loadStepChunk() and index >= len(self.steps):
+                return
+
     def constructStepDisplayText(self, step):
         # STEP
         try:
@@ -1478,12 +2181,18 @@ class Atom8(QMainWindow):
                 display_text = f'Sleep for {step[1]} seconds.'
             elif action in ['Click Element', 'Input Text']:
                 display_text = f'{action}: (By: {step[1]}, {step[2]}){", Text: " + step[3] if step[3] else ""}, Description: {step[4]}'
-            elif action in ['Navigate to URL', 'Execute JavaScript', 'Execute Python Script']:
+            elif action == 'Navigate to URL':
+                display_text = f'{action}: {step[1]}{navigation_text(step)}{"." if not step[2] else f", Description: {step[2]}"}'
+            elif action == 'Execute Python Script':
+                display_text = f'{action}: {step[1]}{script_text(step)}{"." if not step[2] else f", Description: {step[2]}"}'
+            elif action == 'Execute JavaScript':
                 display_text = f'{action}: {step[1]}{"." if not step[2] else f", Description: {step[2]}"}'
             elif action == 'Take Screenshot':
-                display_text = f'Take screenshot and save as {step[1]}'
+                display_text = f'Take screenshot and save as {step[1]}{scope_text(step, 2)}'
             elif action == 'Compare Images':
-                display_text = f'Comparing images: {step[1]} and {step[2]}.'
+                display_text = f'Comparing images: {step[1]} and {step[2]}{scope_text(step, 4)}.'
+            elif action in BUDGET_UNITS:
+                display_text = f'{action} {step[1]} {BUDGET_UNITS[action]}{"." if not step[2] else f", Description: {step[2]}"}'
             else:
                 display_text = f'{action}'
         except Exception as e:
@@ -1491,8 +2200,9 @@ class Atom8(QMainWindow):
         return display_text
 
     def clearStepsList(self):
-        self.stepsList.clear()
-        self.steps.clear()
+        self.closeStepLoader()
+        self.steps = []
+        self.recordReset()
         self.clearInputFields()
         self.clearLogs()
 
@@ -1508,8 +2218,22 @@ class Atom8(QMainWindow):
 
         # clear the saved file path
         self.currentFilePath = None
+        self.incompleteSource = None
+        self.currentFileHeader = {}
 
     def prefs(self):
+        try:
+            if self.prefsWindow is None:
+                self.setupPrefs()
+                if self.prefsWindow is None:
+                    return
+            self.loadPrefs()
+            self.prefsWindow.show()
+            self.prefsWindow.raise_()
+        except Exception as e:
+            QMessageBox.warning(self, "Error", f"Error while opening preferences: {e}")
+
+    def setupPrefs(self):
         try:
             self.prefsWindow = QDialog(self, Qt.Window)
             self.prefsWindow.setWindowTitle("Preferences")
@@ -1526,7 +2250,6 @@ class Atom8(QMainWindow):
             browserLabel = QLabel("Default Browser:")
             self.browserComboBox = QComboBox()
             self.browserComboBox.addItems(["Chrome", "Firefox", "Safari", "Edge"])
-            self.browserComboBox.setCurrentText(self.loadSetting("defaultBrowser", "Chrome"))
             browserLayout = QHBoxLayout()
             browserLayout.addWidget(browserLabel)
             browserLayout.addWidget(self.browserComboBox)
@@ -1534,9 +2257,6 @@ class Atom8(QMainWindow):
 
             savePathLabel = QLabel("Default Screenshots Save Path:")
             self.savePathLineEdit = QLineEdit()
-            current_save_path = self.loadSetting("savePath", "")
-            if current_save_path:
-                self.savePathLineEdit.setText(current_save_path)
             savePathButton = QPushButton("Choose")
             savePathButton.clicked.connect(self.chooseSavePathLocation)
             savePathLayout = QHBoxLayout()
@@ -1547,7 +2267,6 @@ class Atom8(QMainWindow):
 
             driverLocationLabel = QLabel("Chrome Driver Location:")
             self.driverLocationLineEdit = QLineEdit()
-            self.driverLocationLineEdit.setText(self.loadSetting("driverLocation", ""))
             driverLocationButton = QPushButton("Choose")
             driverLocationButton.clicked.connect(self.chooseChromeDriverLocation)
             driverLocationLayout = QHBoxLayout()
@@ -1558,7 +2277,6 @@ class Atom8(QMainWindow):
 
             msedgeLocationLabel = QLabel("Edge Driver Location:")
             self.msedgeLocationLineEdit = QLineEdit()
-            self.msedgeLocationLineEdit.setText(self.loadSetting("msedgeLocation", ""))
             msedgeLocationButton = QPushButton("Choose")
             msedgeLocationButton.clicked.connect(self.chooseMsEdgeDriverLocation)
             msedgeLocationLayout = QHBoxLayout()
@@ -1567,16 +2285,228 @@ class Atom8(QMainWindow):
             msedgeLocationLayout.addWidget(msedgeLocationButton)
             generalLayout.addLayout(msedgeLocationLayout)
 
+            launchProfileLabel = QLabel("Launch Profile:")
+            self.launchProfileComboBox = QComboBox()
+            self.launchProfileComboBox.setToolTip(
+                "Saved driver, browser binary, options and window size, resolved once and reused by every run")
+            self.launchProfileComboBox.currentIndexChanged.connect(self.showLaunchProfile)
+            saveLaunchProfileButton = QPushButton("Save As...")
+            saveLaunchProfileButton.setToolTip("Save the default browser, the fields below and the checked browser "
+                                               "options as a launch profile")
+            saveLaunchProfileButton.clicked.connect(self.saveLaunchProfile)
+            deleteLaunchProfileButton = QPushButton("Delete")
+            deleteLaunchProfileButton.clicked.connect(self.deleteLaunchProfile)
+            launchProfileLayout = QHBoxLayout()
+            launchProfileLayout.addWidget(launchProfileLabel)
+            launchProfileLayout.addWidget(self.launchProfileComboBox)
+            launchProfileLayout.addWidget(saveLaunchProfileButton)
+            launchProfileLayout.addWidget(deleteLaunchProfileButton)
+            generalLayout.addLayout(launchProfileLayout)
+
+            self.profileDriverLineEdit = QLineEdit()
+            self.profileDriverLineEdit.setPlaceholderText("Profile driver, defaults to the driver location above")
+            self.profileBinaryLineEdit = QLineEdit()
+            self.profileBinaryLineEdit.setPlaceholderText("Browser binary, defaults to the installed browser")
+            self.profileWindowSizeLineEdit = QLineEdit()
+            self.profileWindowSizeLineEdit.setPlaceholderText("Window size, e.g. 1920x1080")
+            profileFieldsLayout = QHBoxLayout()
+            profileFieldsLayout.addWidget(self.profileDriverLineEdit)
+            profileFieldsLayout.addWidget(self.profileBinaryLineEdit)
+            profileFieldsLayout.addWidget(self.profileWindowSizeLineEdit)
+            generalLayout.addLayout(profileFieldsLayout)
+
+            executorLabel = QLabel("Run Browsers:")
+            self.executorComboBox = QComboBox()
+            self.executorComboBox.addItems(EXECUTORS)
+            self.executorComboBox.setToolTip("Local starts the browsers here; Remote starts them on the nodes below")
+            self.remoteNodesLineEdit = QLineEdit()
+            self.remoteNodesLineEdit.setPlaceholderText("Grid or node URLs, e.g. http://grid:4444, http://node2:4444=4")
+            self.remoteNodesLineEdit.setToolTip(
+                "Comma-separated remote WebDriver URLs. Sessions are spread over them by capacity, read from each "
+                "server's /status unless given after '='")
+            executorLayout = QHBoxLayout()
+            executorLayout.addWidget(executorLabel)
+            executorLayout.addWidget(self.executorComboBox)
+            executorLayout.addWidget(self.remoteNodesLineEdit)
+            generalLayout.addLayout(executorLayout)
+
+            remoteCapabilitiesLabel = QLabel("Remote Capabilities:")
+            self.remoteCapabilitiesLineEdit = QLineEdit()
+            self.remoteCapabilitiesLineEdit.setPlaceholderText('JSON, e.g. {"platformName": "linux"}')
+            remoteCapabilitiesLayout = QHBoxLayout()
+            remoteCapabilitiesLayout.addWidget(remoteCapabilitiesLabel)
+            remoteCapabilitiesLayout.addWidget(self.remoteCapabilitiesLineEdit)
+            generalLayout.addLayout(remoteCapabilitiesLayout)
+
+            logPathLabel = QLabel("Structured Logs Path:")
+            self.logPathLineEdit = QLineEdit()
+            self.logPathLineEdit.setPlaceholderText("Defaults to the Atom8 settings folder")
+            logPathButton = QPushButton("Choose")
+            logPathButton.clicked.connect(self.chooseLogPathLocation)
+            logPathLayout = QHBoxLayout()
+            logPathLayout.addWidget(logPathLabel)
+            logPathLayout.addWidget(self.logPathLineEdit)
+            logPathLayout.addWidget(logPathButton)
+            generalLayout.addLayout(logPathLayout)
+
+            compressLogsLabel = QLabel("Rotated Logs Compression:")
+            self.compressLogsComboBox = QComboBox()
+            self.compressLogsComboBox.addItems(["None", "gzip"])
+            compressLogsLayout = QHBoxLayout()
+            compressLogsLayout.addWidget(compressLogsLabel)
+            compressLogsLayout.addWidget(self.compressLogsComboBox)
+            generalLayout.addLayout(compressLogsLayout)
+
+            pageLoadStrategyLabel = QLabel("Page Load Strategy:")
+            self.pageLoadStrategyComboBox = QComboBox()
+            self.pageLoadStrategyComboBox.addItems(PAGE_LOAD_STRATEGIES)
+            self.pageLoadStrategyComboBox.setToolTip(
+                "normal waits for the load event, eager for DOMContentLoaded, none lets each step decide")
+            pageLoadStrategyLayout = QHBoxLayout()
+            pageLoadStrategyLayout.addWidget(pageLoadStrategyLabel)
+            pageLoadStrategyLayout.addWidget(self.pageLoadStrategyComboBox)
+            generalLayout.addLayout(pageLoadStrategyLayout)
+
+            readyWhenLabel = QLabel("Navigation Ready When:")
+            self.readyWhenComboBox = QComboBox()
+            self.readyWhenComboBox.addItems([condition for condition in READY_CONDITIONS if
+                                             condition != "Element Present"])
+            self.readyTimeoutLineEdit = QLineEdit()
+            self.readyTimeoutLineEdit.setPlaceholderText("Timeout (seconds), default 30")
+            readyWhenLayout = QHBoxLayout()
+            readyWhenLayout.addWidget(readyWhenLabel)
+            readyWhenLayout.addWidget(self.readyWhenComboBox)
+            readyWhenLayout.addWidget(self.readyTimeoutLineEdit)
+            generalLayout.addLayout(readyWhenLayout)
+
+            performanceLogLabel = QLabel("Attach Performance Log Entries:")
+            self.performanceLogComboBox = QComboBox()
+            self.performanceLogComboBox.addItems(["No", "Yes"])
+            self.performanceLogComboBox.setToolTip(
+                "With Enable Performance Logging checked, attach the browser's raw performance log to each navigation")
+            performanceLogLayout = QHBoxLayout()
+            performanceLogLayout.addWidget(performanceLogLabel)
+            performanceLogLayout.addWidget(self.performanceLogComboBox)
+            generalLayout.addLayout(performanceLogLayout)
+
+            scriptTimeoutLabel = QLabel("Python Script Timeout (seconds):")
+            self.scriptTimeoutLineEdit = QLineEdit()
+            self.scriptTimeoutLineEdit.setPlaceholderText("60")
+            self.scriptWorkersLineEdit = QLineEdit()
+            self.scriptWorkersLineEdit.setPlaceholderText("Worker processes, default one per CPU core but one")
+            scriptTimeoutLayout = QHBoxLayout()
+            scriptTimeoutLayout.addWidget(scriptTimeoutLabel)
+            scriptTimeoutLayout.addWidget(self.scriptTimeoutLineEdit)
+            scriptTimeoutLayout.addWidget(self.scriptWorkersLineEdit)
+            generalLayout.addLayout(scriptTimeoutLayout)
+
+            autosaveLabel = QLabel("Autosave Unsaved Edits Every (seconds):")
+            self.autosaveIntervalLineEdit = QLineEdit()
+            self.autosaveIntervalLineEdit.setPlaceholderText("10")
+            autosaveLayout = QHBoxLayout()
+            autosaveLayout.addWidget(autosaveLabel)
+            autosaveLayout.addWidget(self.autosaveIntervalLineEdit)
+            generalLayout.addLayout(autosaveLayout)
+
+            artifactStorageLabel = QLabel("Screenshot Storage:")
+            self.artifactStorageComboBox = QComboBox()
+            self.artifactStorageComboBox.addItems(["Content-Addressed", "Folders"])
+            self.artifactStorageComboBox.setToolTip(
+                "Content-Addressed keeps each distinct image once, with a manifest per run; Folders writes "
+                "timestamped files into the save path")
+            self.artifactEncodingComboBox = QComboBox()
+            self.artifactEncodingComboBox.addItems(ENCODINGS)
+            self.artifactEncodingComboBox.setToolTip("webp stores images losslessly in less space and needs OpenCV")
+            self.artifactPathLineEdit = QLineEdit()
+            self.artifactPathLineEdit.setPlaceholderText("Store folder, default <save path>/store")
+            artifactStorageLayout = QHBoxLayout()
+            artifactStorageLayout.addWidget(artifactStorageLabel)
+            artifactStorageLayout.addWidget(self.artifactStorageComboBox)
+            artifactStorageLayout.addWidget(self.artifactEncodingComboBox)
+            artifactStorageLayout.addWidget(self.artifactPathLineEdit)
+            generalLayout.addLayout(artifactStorageLayout)
+
+            artifactRetentionLabel = QLabel("Keep Screenshots Of:")
+            self.artifactKeepRunsLineEdit = QLineEdit()
+            self.artifactKeepRunsLineEdit.setPlaceholderText("Newest N runs, default all")
+            self.artifactKeepDaysLineEdit = QLineEdit()
+            self.artifactKeepDaysLineEdit.setPlaceholderText("Runs of the last N days, default all")
+            artifactRetentionLayout = QHBoxLayout()
+            artifactRetentionLayout.addWidget(artifactRetentionLabel)
+            artifactRetentionLayout.addWidget(self.artifactKeepRunsLineEdit)
+            artifactRetentionLayout.addWidget(self.artifactKeepDaysLineEdit)
+            generalLayout.addLayout(artifactRetentionLayout)
+
             generalTab.setLayout(generalLayout)
             tabWidget.addTab(generalTab, "General")
 
+            # Retries settings tab
+            retriesTab = QWidget()
+            retriesLayout = QVBoxLayout()
+
+            defaultRetriesLabel = QLabel("Retries per Failed Step:")
+            self.defaultRetriesLineEdit = QLineEdit()
+            self.defaultRetriesLineEdit.setPlaceholderText("0")
+            defaultRetriesLayout = QHBoxLayout()
+            defaultRetriesLayout.addWidget(defaultRetriesLabel)
+            defaultRetriesLayout.addWidget(self.defaultRetriesLineEdit)
+            retriesLayout.addLayout(defaultRetriesLayout)
+
+            retryBackoffLabel = QLabel("First Retry Delay (seconds):")
+            self.retryBackoffLineEdit = QLineEdit()
+            self.retryBackoffLineEdit.setPlaceholderText("1")
+            retryBackoffLayout = QHBoxLayout()
+            retryBackoffLayout.addWidget(retryBackoffLabel)
+            retryBackoffLayout.addWidget(self.retryBackoffLineEdit)
+            retriesLayout.addLayout(retryBackoffLayout)
+
+            retryFactorLabel = QLabel("Delay Multiplier:")
+            self.retryFactorLineEdit = QLineEdit()
+            self.retryFactorLineEdit.setPlaceholderText("2")
+            retryFactorLayout = QHBoxLayout()
+            retryFactorLayout.addWidget(retryFactorLabel)
+            retryFactorLayout.addWidget(self.retryFactorLineEdit)
+            retriesLayout.addLayout(retryFactorLayout)
+
+            retryMaxDelayLabel = QLabel("Longest Delay (seconds):")
+            self.retryMaxDelayLineEdit = QLineEdit()
+            self.retryMaxDelayLineEdit.setPlaceholderText("30")
+            retryMaxDelayLayout = QHBoxLayout()
+            retryMaxDelayLayout.addWidget(retryMaxDelayLabel)
+            retryMaxDelayLayout.addWidget(self.retryMaxDelayLineEdit)
+            retriesLayout.addLayout(retryMaxDelayLayout)
+
+            retriesLayout.addWidget(QLabel("Retries by Action (leave empty to use the value above):"))
+            self.actionRetriesTable = QTableWidget(len(atm8file.ACTIONS), 2)
+            self.actionRetriesTable.setHorizontalHeaderLabels(["Action", "Retries"])
+            self.actionRetriesTable.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+            self.actionRetriesTable.verticalHeader().setVisible(False)
+            for row, action in enumerate(atm8file.ACTIONS):
+                actionItem = QTableWidgetItem(action)
+                actionItem.setFlags(actionItem.flags() & ~Qt.ItemIsEditable)
+                self.actionRetriesTable.setItem(row, 0, actionItem)
+                self.actionRetriesTable.setItem(row, 1, QTableWidgetItem(""))
+            retriesLayout.addWidget(self.actionRetriesTable)
+
+            retriesTab.setLayout(retriesLayout)
+            tabWidget.addTab(retriesTab, "Retries")
+
+            # Request blocking settings tab
+            blockingTab = QWidget()
+            blockingLayout = QVBoxLayout()
+            blockingLayout.addWidget(QLabel("Applied to every run on Chrome and Edge, together with the rules saved "
+                                            "in the file (Tools > Request Blocking for This File)."))
+            self.blockingEditor = RequestBlockingEditor()
+            blockingLayout.addWidget(self.blockingEditor)
+            blockingTab.setLayout(blockingLayout)
+            tabWidget.addTab(blockingTab, "Request Blocking")
+
             # ProofHub settings tab
             proofhubTab = QWidget()
             proofhubLayout = QVBoxLayout()
 
             proofhubAPI = QLabel("ProofHub API Key:")
             self.proofhubAPIKey = QLineEdit()
-            self.proofhubAPIKey.setText(self.loadSetting("proofhubAPIKey", ""))
             proofhubAPILayout = QHBoxLayout()
             proofhubAPILayout.addWidget(proofhubAPI)
             proofhubAPILayout.addWidget(self.proofhubAPIKey)
@@ -1584,7 +2514,6 @@ class Atom8(QMainWindow):
 
             proofhubProject = QLabel("ProofHub Project ID:")
             self.proofhubProjectID = QLineEdit()
-            self.proofhubProjectID.setText(self.loadSetting("proofhubProjectID", ""))
             proofhubProjectLayout = QHBoxLayout()
             proofhubProjectLayout.addWidget(proofhubProject)
             proofhubProjectLayout.addWidget(self.proofhubProjectID)
@@ -1592,7 +2521,6 @@ class Atom8(QMainWindow):
 
             proofhubTaskList = QLabel("ProofHub Task List ID:")
             self.proofhubTaskListID = QLineEdit()
-            self.proofhubTaskListID.setText(self.loadSetting("proofhubTaskListID", ""))
             proofhubTaskListLayout = QHBoxLayout()
             proofhubTaskListLayout.addWidget(proofhubTaskList)
             proofhubTaskListLayout.addWidget(self.proofhubTaskListID)
@@ -1607,7 +2535,6 @@ class Atom8(QMainWindow):
 
             jiraURLLabel = QLabel("JIRA URL:")
             self.jiraURLLineEdit = QLineEdit()
-            self.jiraURLLineEdit.setText(self.loadSetting("jiraURL", ""))
             jiraURLLayout = QHBoxLayout()
             jiraURLLayout.addWidget(jiraURLLabel)
             jiraURLLayout.addWidget(self.jiraURLLineEdit)
@@ -1615,7 +2542,6 @@ class Atom8(QMainWindow):
 
             jiraUserLabel = QLabel("JIRA Username:")
             self.jiraUserLineEdit = QLineEdit()
-            self.jiraUserLineEdit.setText(self.loadSetting("jiraUsername", ""))
             jiraUserLayout = QHBoxLayout()
             jiraUserLayout.addWidget(jiraUserLabel)
             jiraUserLayout.addWidget(self.jiraUserLineEdit)
@@ -1623,7 +2549,6 @@ class Atom8(QMainWindow):
 
             jiraTokenLabel = QLabel("JIRA API Token:")
             self.jiraTokenLineEdit = QLineEdit()
-            self.jiraTokenLineEdit.setText(self.loadSetting("jiraAPIToken", ""))
             jiraTokenLayout = QHBoxLayout()
             jiraTokenLayout.addWidget(jiraTokenLabel)
             jiraTokenLayout.addWidget(self.jiraTokenLineEdit)
@@ -1638,7 +2563,6 @@ class Atom8(QMainWindow):
 
             mondayURLLabel = QLabel("Monday URL:")
             self.mondayURLLineEdit = QLineEdit()
-            self.mondayURLLineEdit.setText(self.loadSetting("mondayURL", ""))
             mondayURLLayout = QHBoxLayout()
             mondayURLLayout.addWidget(mondayURLLabel)
             mondayURLLayout.addWidget(self.mondayURLLineEdit)
@@ -1646,7 +2570,6 @@ class Atom8(QMainWindow):
 
             mondayTokenLabel = QLabel("Monday API Token:")
             self.mondayTokenLineEdit = QLineEdit()
-            self.mondayTokenLineEdit.setText(self.loadSetting("mondayAPIToken", ""))
             mondayTokenLayout = QHBoxLayout()
             mondayTokenLayout.addWidget(mondayTokenLabel)
             mondayTokenLayout.addWidget(self.mondayTokenLineEdit)
@@ -1661,7 +2584,6 @@ class Atom8(QMainWindow):
 
             clickupTokenLabel = QLabel("ClickUp API Token:")
             self.clickupTokenLineEdit = QLineEdit()
-            self.clickupTokenLineEdit.setText(self.loadSetting("clickupAPIToken", ""))
             clickupTokenLayout = QHBoxLayout()
             clickupTokenLayout.addWidget(clickupTokenLabel)
             clickupTokenLayout.addWidget(self.clickupTokenLineEdit)
@@ -1675,11 +2597,132 @@ class Atom8(QMainWindow):
             prefsLayout.addWidget(saveButton)
 
             self.prefsWindow.setLayout(prefsLayout)
-            self.prefsWindow.resize(600, 300)
-            self.prefsWindow.show()
+            self.prefsWindow.resize(600, 400)
+        except Exception as e:
+            # A half-built window is not kept; the next open builds it again.
+            self.prefsWindow = None
+            QMessageBox.warning(self, "Error", f"Error while setting up preferences: {e}")
+
 
+    def loadPrefs(self):
+        try:
+            settings = self.loadSettings()
+            self.browserComboBox.setCurrentText(settings.get("defaultBrowser", "Chrome"))
+            self.savePathLineEdit.setText(settings.get("savePath", ""))
+            self.driverLocationLineEdit.setText(settings.get("driverLocation", ""))
+            self.msedgeLocationLineEdit.setText(settings.get("msedgeLocation", ""))
+            self.refreshLaunchProfiles(settings.get("launchProfile") or NO_PROFILE)
+            self.logPathLineEdit.setText(settings.get("logPath", ""))
+            self.executorComboBox.setCurrentText(settings.get("executor", "Local"))
+            self.remoteNodesLineEdit.setText(", ".join(settings.get("remoteNodes", [])))
+            self.remoteCapabilitiesLineEdit.setText(
+                json.dumps(settings["remoteCapabilities"]) if settings.get("remoteCapabilities") else "")
+            self.compressLogsComboBox.setCurrentText(settings.get("compressLogs", "None"))
+            self.pageLoadStrategyComboBox.setCurrentText(settings.get("pageLoadStrategy", "normal"))
+            self.readyWhenComboBox.setCurrentText(settings.get("readyWhen", "Page Load Strategy"))
+            self.readyTimeoutLineEdit.setText(str(settings.get("readyTimeout", "")))
+            self.performanceLogComboBox.setCurrentText("Yes" if settings.get("capturePerformanceLog") else "No")
+            self.scriptTimeoutLineEdit.setText(str(settings.get("scriptTimeout", "")))
+            self.scriptWorkersLineEdit.setText(str(settings.get("scriptWorkers") or ""))
+            self.autosaveIntervalLineEdit.setText(str(settings.get("autosaveInterval", "")))
+            self.artifactStorageComboBox.setCurrentText(settings.get("artifactStorage", "Content-Addressed"))
+            self.artifactEncodingComboBox.setCurrentText(settings.get("artifactEncoding", "png"))
+            self.artifactPathLineEdit.setText(settings.get("artifactPath", ""))
+            self.artifactKeepRunsLineEdit.setText(str(settings.get("artifactKeepRuns") or ""))
+            self.artifactKeepDaysLineEdit.setText(str(settings.get("artifactKeepDays") or ""))
+            retries = settings.get("retries", {})
+            self.defaultRetriesLineEdit.setText(str(retries.get("default", "")))
+            self.retryBackoffLineEdit.setText(str(retries.get("backoff", "")))
+            self.retryFactorLineEdit.setText(str(retries.get("factor", "")))
+            self.retryMaxDelayLineEdit.setText(str(retries.get("maxDelay", "")))
+            for row, action in enumerate(atm8file.ACTIONS):
+                self.actionRetriesTable.item(row, 1).setText(str(retries.get("actions", {}).get(action, "")))
+            self.blockingEditor.setConfig(settings.get("blocking"))
+            self.proofhubAPIKey.setText(settings.get("proofhubAPIKey", ""))
+            self.proofhubProjectID.setText(settings.get("proofhubProjectID", ""))
+            self.proofhubTaskListID.setText(settings.get("proofhubTaskListID", ""))
+            self.jiraURLLineEdit.setText(settings.get("jiraURL", ""))
+            self.jiraUserLineEdit.setText(settings.get("jiraUsername", ""))
+            self.jiraTokenLineEdit.setText(settings.get("jiraAPIToken", ""))
+            self.mondayURLLineEdit.setText(settings.get("mondayURL", ""))
+            self.mondayTokenLineEdit.setText(settings.get("mondayAPIToken", ""))
+            self.clickupTokenLineEdit.setText(settings.get("clickupAPIToken", ""))
         except Exception as e:
-            QMessageBox.warning(self, "Error", f"Error while opening preferences: {e}")
+            QMessageBox.warning(self, "Error", f"Error while loading preferences: {e}")
+
+    def refreshLaunchProfiles(self, selected):
+        self.launchProfileComboBox.blockSignals(True)
+        self.launchProfileComboBox.clear()
+        self.launchProfileComboBox.addItems([NO_PROFILE] + sorted(self.loadSetting("launchProfiles", {})))
+        self.launchProfileComboBox.setCurrentText(selected)
+        self.launchProfileComboBox.blockSignals(False)
+        self.showLaunchProfile()
+
+    def showLaunchProfile(self):
+        try:
+            name = self.launchProfileComboBox.currentText()
+            profile = saved_profiles(self.loadSettings()).get(name)
+            for lineEdit in (self.profileDriverLineEdit, self.profileBinaryLineEdit, self.profileWindowSizeLineEdit):
+                lineEdit.setEnabled(profile is not None)
+            if profile is None:
+                for lineEdit in (self.profileDriverLineEdit, self.profileBinaryLineEdit,
+                                 self.profileWindowSizeLineEdit):
+                    lineEdit.clear()
+                return
+            data = profile.toDict()
+            self.browserComboBox.setCurrentText(profile.browser)
+            self.profileDriverLineEdit.setText(data["driverPath"])
+            self.profileBinaryLineEdit.setText(data["binary"])
+            self.profileWindowSizeLineEdit.setText(data["windowSize"])
+        except Exception as e:
+            QMessageBox.warning(self, "Error", f"Error while showing the launch profile: {e}")
+
+    def launchProfileFromFields(self, name, options):
+        return LaunchProfile(name, self.browserComboBox.currentText(), self.profileDriverLineEdit.text().strip(),
+                             self.profileBinaryLineEdit.text().strip(), options,
+                             parse_window_size(self.profileWindowSizeLineEdit.text()))
+
+    def saveLaunchProfile(self):
+        try:
+            name, ok = QInputDialog.getText(self.prefsWindow, "Save Launch Profile",
+                                            "Profile name for the default browser, profile fields and checked "
+                                            "browser options:")
+            if not ok or not name.strip():
+                return
+            if name.strip() == NO_PROFILE:
+                QMessageBox.warning(self.prefsWindow, "Invalid Name", f"'{NO_PROFILE}' is reserved.")
+                return
+            profile = self.launchProfileFromFields(name.strip(), self.checkedBrowserOptions())
+            profiles = self.loadSetting("launchProfiles", {})
+            profiles[profile.name] = profile.toDict()
+            self.saveSetting("launchProfiles", profiles)
+            self.refreshLaunchProfiles(profile.name)
+        except Exception as e:
+            QMessageBox.warning(self, "Error", f"Error while saving the launch profile: {e}")
+
+    def deleteLaunchProfile(self):
+        try:
+            name = self.launchProfileComboBox.currentText()
+            profiles = self.loadSetting("launchProfiles", {})
+            if name in profiles:
+                del profiles[name]
+                self.saveSetting("launchProfiles", profiles)
+                if self.loadSetting("launchProfile", NO_PROFILE) == name:
+                    self.saveSetting("launchProfile", NO_PROFILE)
+            self.refreshLaunchProfiles(NO_PROFILE)
+        except Exception as e:
+            QMessageBox.warning(self, "Error", f"Error while deleting the launch profile: {e}")
+
+    def saveSelectedLaunchProfile(self):
+        # The selected profile keeps its options; the fields shown for it may have been edited.
+        name = self.launchProfileComboBox.currentText()
+        profiles = self.loadSetting("launchProfiles", {})
+        self.saveSetting("launchProfile", name)
+        if name in profiles:
+            profile = self.launchProfileFromFields(name, profiles[name].get("options", []))
+            profiles[name] = profile.toDict()
+            self.saveSetting("launchProfiles", profiles)
+            self.setBrowserOptions(profile.options)
 
     def chooseChromeDriverLocation(self):
         try:
@@ -1705,12 +2748,45 @@ class Atom8(QMainWindow):
         except Exception as e:
             QMessageBox.warning(self, "Error", f"Error while choosing save path location: {e}")
 
+    def chooseLogPathLocation(self):
+        try:
+            directory = QFileDialog.getExistingDirectory(self, "Select Directory")
+            if directory:
+                self.logPathLineEdit.setText(directory)
+        except Exception as e:
+            QMessageBox.warning(self, "Error", f"Error while choosing logs path location: {e}")
+
     def savePrefs(self):
         try:
             self.saveSetting("defaultBrowser", self.browserComboBox.currentText())
             self.saveSetting("savePath", self.savePathLineEdit.text())
             self.saveSetting("driverLocation", self.driverLocationLineEdit.text())
             self.saveSetting("msedgeLocation", self.msedgeLocationLineEdit.text())
+            self.saveSelectedLaunchProfile()
+            self.saveSetting("logPath", self.logPathLineEdit.text())
+            self.saveSetting("executor", self.executorComboBox.currentText())
+            self.saveSetting("remoteNodes", [node.strip() for node in self.remoteNodesLineEdit.text().split(",") if
+                                             node.strip()])
+            self.saveSetting("remoteCapabilities", json.loads(self.remoteCapabilitiesLineEdit.text() or "{}"))
+            self.saveSetting("compressLogs", self.compressLogsComboBox.currentText())
+            self.saveSetting("pageLoadStrategy", self.pageLoadStrategyComboBox.currentText())
+            self.saveSetting("readyWhen", self.readyWhenComboBox.currentText())
+            self.saveSetting("readyTimeout", float(self.readyTimeoutLineEdit.text() or 30))
+            self.saveSetting("capturePerformanceLog", self.performanceLogComboBox.currentText() == "Yes")
+            self.saveSetting("scriptTimeout", float(self.scriptTimeoutLineEdit.text() or 60))
+            self.saveSetting("scriptWorkers",
+                             int(self.scriptWorkersLineEdit.text()) if self.scriptWorkersLineEdit.text() else None)
+            self.saveSetting("autosaveInterval", float(self.autosaveIntervalLineEdit.text() or 10))
+            self.autosaveTimer.setInterval(int(self.loadSetting("autosaveInterval", 10) * 1000))
+            self.saveSetting("artifactStorage", self.artifactStorageComboBox.currentText())
+            self.saveSetting("artifactEncoding", self.artifactEncodingComboBox.currentText())
+            self.saveSetting("artifactPath", self.artifactPathLineEdit.text())
+            self.saveSetting("artifactKeepRuns",
+                             int(self.artifactKeepRunsLineEdit.text()) if self.artifactKeepRunsLineEdit.text() else None)
+            self.saveSetting("artifactKeepDays",
+                             float(self.artifactKeepDaysLineEdit.text()) if self.artifactKeepDaysLineEdit.text() else None)
+            self.saveSetting("retries", self.retrySettings())
+            self.saveSetting("blocking", self.blockingEditor.config())
             self.saveSetting("proofhubAPIKey", self.proofhubAPIKey.text())
             self.saveSetting("proofhubProjectID", self.proofhubProjectID.text())
             self.saveSetting("proofhubTaskListID", self.proofhubTaskListID.text())
@@ -1727,11 +2803,24 @@ class Atom8(QMainWindow):
         except Exception as e:
             QMessageBox.warning(self, "Error", f"Error while saving preferences: {e}")
 
+    def retrySettings(self):
+        retries = {"actions": {}}
+        fields = [("default", self.defaultRetriesLineEdit, int), ("backoff", self.retryBackoffLineEdit, float),
+                  ("factor", self.retryFactorLineEdit, float), ("maxDelay", self.retryMaxDelayLineEdit, float)]
+        for key, lineEdit, convert in fields:
+            if lineEdit.text().strip():
+                retries[key] = convert(lineEdit.text())
+        for row, action in enumerate(atm8file.ACTIONS):
+            text = self.actionRetriesTable.item(row, 1).text().strip()
+            if text:
+                retries["actions"][action] = int(text)
+        return retries
+
     def settingsFilePath(self):
-        return os.path.join(os.getenv('APPDATA'), 'Atom8', 'settings.json')
+        return app_data_path('settings.json')
 
     def recentFilesFilePath(self):
-        return os.path.join(os.getenv('APPDATA'), 'Atom8', 'recent_files.json')
+        return app_data_path('recent_files.json')
 
     def saveSetting(self, key, value):
         try:
@@ -1813,28 +2902,33 @@ class Atom8(QMainWindow):
         self.scriptEditorFileMenu.addAction(self.scriptEditorClearAction)
         self.scriptEditorFileMenu.addAction(self.scriptEditorCloseAction)
 
-        self.scriptEditorStatusBar.showMessage("Ready", 5000)
+        self.scriptEditorRunMenu = self.scriptEditorMenuBar.addMenu('Run')
 
-        self.scriptEditorLogger = logging.getLogger('ScriptEditor')
-        self.scriptEditorLogger.setLevel(logging.INFO)
+        self.scriptEditorRunAction = QAction('Run', self)
+        self.scriptEditorRunAction.setShortcut('F5')
+        self.scriptEditorRunAction.triggered.connect(self.runAqlScript)
 
-        self.scriptEditorLoggerTextBox = QTextEditLogger(self.scriptEditor)
-        self.scriptEditorLoggerTextBox.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
-        self.scriptEditorLogger.addHandler(self.scriptEditorLoggerTextBox)
-        self.scriptEditorLogger.setLevel(logging.DEBUG)
+        self.scriptEditorLoadStepsAction = QAction('Load as Steps', self)
+        self.scriptEditorLoadStepsAction.triggered.connect(self.loadAqlSteps)
+
+        self.scriptEditorRunMenu.addAction(self.scriptEditorRunAction)
+        self.scriptEditorRunMenu.addAction(self.scriptEditorLoadStepsAction)
+
+        self.scriptEditorStatusBar.showMessage("Ready", 5000)
 
     def openScriptFile(self):
         fileName, _ = QFileDialog.getOpenFileName(self, "Open File", "", "All Files (*);;AQL Files (*.aql)")
         if fileName:
             try:
-                with open(fileName, "r") as file:
-                    self.scriptEditor.setText(file.read())
+                with open(fileName, "r", encoding="utf-8") as file:
+                    self.scriptEditor.setPlainText(file.read())
+                self.scriptFilePath = fileName
             except Exception as e:
                 QMessageBox.critical(self, "Error", f"Failed to open file: {e}")
 
     def saveScriptFile(self):
-        if self.currentFilePath:
-            with open(self.currentFilePath, "w") as file:
+        if self.scriptFilePath:
+            with open(self.scriptFilePath, "w", encoding="utf-8") as file:
                 file.write(self.scriptEditor.toPlainText())
             self.scriptEditorStatusBar.showMessage("File saved successfully.", 5000)
         else:
@@ -1843,11 +2937,86 @@ class Atom8(QMainWindow):
     def saveScriptFileAs(self):
         fileName, _ = QFileDialog.getSaveFileName(self, "Save As", "", "AQL Files (*.aql)")
         if fileName:
-            self.currentFilePath = fileName
-            with open(fileName, "w+") as file:
+            self.scriptFilePath = fileName
+            with open(fileName, "w", encoding="utf-8") as file:
                 file.write(self.scriptEditor.toPlainText())
             self.scriptEditorStatusBar.showMessage("File saved as new file.", 5000)
 
+    def compileAqlScript(self):
+        # Returns None after reporting the error, with the cursor moved to the offending line.
+        baseDir = os.path.dirname(os.path.abspath(self.scriptFilePath)) if self.scriptFilePath else os.getcwd()
+        try:
+            return aql.parse(self.scriptEditor.toPlainText(), baseDir)
+        except aql.AqlError as e:
+            if e.line:
+                block = self.scriptEditor.document().findBlockByLineNumber(e.line - 1)
+                cursor = self.scriptEditor.textCursor()
+                cursor.setPosition(block.position())
+                self.scriptEditor.setTextCursor(cursor)
+            self.scriptEditorStatusBar.showMessage(str(e), 10000)
+            QMessageBox.warning(self.scriptEditorWindow, "AQL Error", str(e))
+            return None
+
+    def runAqlScript(self):
+        program = self.compileAqlScript()
+        if program is None:
+            return
+        testName = os.path.splitext(os.path.basename(self.scriptFilePath))[0] if self.scriptFilePath else "AQL Script"
+        self.logger.info("Running AQL script...")
+        try:
+            runLog = self.startRunLog()
+            try:
+                started = time.monotonic()
+                self.driver = self.createDriver()
+                try:
+                    engine = self.createEngine(self.driver, testName=testName)
+                    self.results = engine.run(
+                        aql.steps(program, engine.variables),
+                        on_step=lambda index, step: runLog.context.update(step=index + 1, action=step[0]))
+                    self.outputFileName = engine.outputFileName
+                finally:
+                    self.driver.quit()
+                self.recordHistory(runLog.run_id, [(self.scriptFilePath or testName, self.results, None,
+                                                    time.monotonic() - started)])
+
+                # Results refer to the expanded steps, so show those in the steps list as a sequence run does.
+                self.closeStepLoader()
+                self.steps = [step for step, *_ in self.results]
+                self.recordReset()
+                self.scriptEditorStatusBar.showMessage(f"Ran {len(self.results)} steps.", 5000)
+
+                if self.generateReport.isChecked():
+                    self.displayResults(self.results)
+
+            except aql.AqlError as e:
+                self.logger.error(f"AQL error: {e}")
+                QMessageBox.warning(self.scriptEditorWindow, "AQL Error", str(e))
+            except Exception as e:
+                self.logger.error(f"Error: {e}")
+                QMessageBox.critical(self, "Error", str(e))
+            finally:
+                runLog.stop()
+        except Exception as e:
+            QMessageBox.warning(self, "Error", f"Error while running the AQL script: {e}")
+
+    def loadAqlSteps(self):
+        program = self.compileAqlScript()
+        if program is None:
+            return
+        try:
+            # Expanded against a scratch dict, so values Python steps would set at run time are not available.
+            steps = list(aql.steps(program, {}))
+        except aql.AqlError as e:
+            QMessageBox.warning(self.scriptEditorWindow, "AQL Error", str(e))
+            return
+        except Exception as e:
+            QMessageBox.warning(self, "Error", f"Error while loading AQL steps: {e}")
+            return
+        self.closeStepLoader()
+        self.steps = [list(step) for step in steps]
+        self.recordReset()
+        self.scriptEditorStatusBar.showMessage(f"Loaded {len(self.steps)} steps.", 5000)
+
     def clearScriptEditor(self):
         self.scriptEditor.clear()
 
@@ -1855,6 +3024,8 @@ class Atom8(QMainWindow):
         self.scriptEditorWindow.close()
 
     def showScriptEditor(self):
+        if self.scriptEditorWindow is None:
+            self.setupScriptEditor()
         self.scriptEditorWindow.show()
 
     def newFile(self):
@@ -1916,10 +3087,9 @@ class Atom8(QMainWindow):
 
             bugReport += "**Performed with the following options:**\n"
 
-            if any(checkbox.isChecked() for checkbox in self.findChildren(QCheckBox)):
+            if self.browserOptions:
                 bugReport += "- [x] "
-                bugReport += "\n- [x] ".join(
-                    [checkbox.text() for checkbox in self.findChildren(QCheckBox) if checkbox.isChecked()])
+                bugReport += "\n- [x] ".join(self.browserOptions)
                 bugReport += "\n"
             else:
                 bugReport += "- [x] None\n"
@@ -1952,6 +3122,9 @@ class Atom8(QMainWindow):
                 elif action == 'Compare Images':
                     value = f'Image 1: {step[1]}, Image 2: {step[2]}'
                     expected = f'Compare images: {step[1]} and {step[2]}'
+                elif action in BUDGET_UNITS:
+                    value = f'{step[1]} {BUDGET_UNITS[action]}'
+                    expected = f'{action} {step[1]} {BUDGET_UNITS[action]}'
                 else:
                     expected = 'Unknown Action'
 
@@ -1995,7 +3168,7 @@ class Atom8(QMainWindow):
     def editSelectedStep(self):
         # STEP
         try:
-            selected_item = self.stepsList.currentRow()
+            selected_item = self.selectedStepRow()
             if selected_item >= 0:
                 self.editMode = True
                 self.editIndex = selected_item
@@ -2022,15 +3195,32 @@ class Atom8(QMainWindow):
                     action in ['Click Element', 'Input Text', 'Navigate to URL', 'Execute Python Script',
                                'Execute JavaScript'])
 
+                self.loadStrategySelection.setVisible(action == 'Navigate to URL')
+                self.readySelection.setVisible(action == 'Navigate to URL')
+                self.budgetInput.setVisible(action in BUDGET_UNITS)
+                self.setScriptFieldsVisible(action == 'Execute Python Script')
+
                 if action == 'Navigate to URL':
                     self.inputText.setPlaceholderText("Enter URL")
                     self.inputText.setText(step[1])
+                    self.loadStrategySelection.setCurrentText(step[3] if len(step) > 3 and step[3] else
+                                                              'Run Page Load Strategy')
+                    self.readySelection.setCurrentText(step[4] if len(step) > 4 and step[4] else
+                                                       'Run Ready Condition')
+                    if len(step) > 6 and step[4] == 'Element Present':
+                        self.locatorSelection.setCurrentText(step[5])
+                        self.locatorInput.setText(step[6])
+                    self.locatorSelection.setVisible(self.readySelection.currentText() == 'Element Present')
+                    self.locatorInput.setVisible(self.readySelection.currentText() == 'Element Present')
                 elif action == 'Input Text':
                     self.inputText.setPlaceholderText("Enter Text")
                     self.inputText.setText(step[3])
                 elif action == 'Execute Python Script':
                     self.inputText.setPlaceholderText("Enter Script Path")
                     self.inputText.setText(step[1])
+                    self.scriptModeSelection.setCurrentText(step[3] if len(step) > 3 and step[3] else RUN_MODES[0])
+                    self.scriptTimeoutInput.setText(step[4] if len(step) > 4 else "")
+                    self.scriptResultInput.setText(step[5] if len(step) > 5 else "")
                 elif action == 'Execute JavaScript':
                     self.inputText.setPlaceholderText("Enter JavaScript Code")
                     self.inputText.setText(step[1])
@@ -2040,18 +3230,25 @@ class Atom8(QMainWindow):
                 elif action == 'Take Screenshot':
                     self.inputText.setPlaceholderText("Enter Screenshot Name")
                     self.inputText.setText(step[1])
+                    self.setScreenshotScope(step, 2)
                 elif action == 'Compare Images':
                     self.refImgPath.setText(step[1])
                     self.testImgPath.setText(step[2])
                     self.outputPath.setText(step[3])
+                    self.setScreenshotScope(step, 4)
                 elif action == 'Maximize Window':
                     self.inputText.setPlaceholderText("Maximize Window.")
                     self.inputText.setText("")
+                elif action in BUDGET_UNITS:
+                    self.inputDescription.setVisible(True)
+                    self.budgetInput.setText(step[1])
                 else:
                     self.inputText.setPlaceholderText("Enter Text")
                     self.inputText.setText(step[1])
 
-                self.inputDescription.setText(step[-1])
+                self.inputDescription.setText(step[2] if action in ['Navigate to URL', 'Execute Python Script'] or
+                                              action in BUDGET_UNITS else step[-1])
+                self.updateFields()
             else:
                 QMessageBox.warning(self, "No Selection", "Please select a step to edit.")
         except Exception as e:
@@ -2060,7 +3257,8 @@ class Atom8(QMainWindow):
     def updateStep(self):
         # STEP
         try:
-            selected_item = self.stepsList.currentRow()
+            self.finishStepLoading()
+            selected_item = self.selectedStepRow()
             if selected_item >= 0:
                 action = self.actionSelection.currentText()
                 locator_type = self.locatorSelection.currentText()
@@ -2071,31 +3269,43 @@ class Atom8(QMainWindow):
 
                 if action == 'Sleep':
                     step = (action, sleep_value)
-                    display_txt = f'Sleep for {sleep_value} seconds.'
                 elif action in ['Click Element']:
                     step = (action, locator_type, locator_value, text_value, description_value)
-                    display_txt = f'{action}: (By: {step[1]}, {step[2]}), Description: {description_value if description_value else "None"}'
                 elif action in ['Input Text']:
                     step = (action, locator_type, locator_value, text_value, description_value)
-                    display_txt = f'{action}: (By: {step[1]}, {step[2]}), Text: {text_value}, Description: {description_value if description_value else "None"}'
-                elif action in ['Navigate to URL', 'Execute JavaScript', 'Execute Python Script']:
+                elif action == 'Navigate to URL':
+                    step = self.navigateStep(text_value, description_value)
+                    if step is None:
+                        return
+                elif action == 'Execute Python Script':
+                    step = self.scriptStep(text_value, description_value)
+                    if step is None:
+                        return
+                elif action == 'Execute JavaScript':
                     step = (action, text_value, description_value)
-                    display_txt = f'{action}: {text_value}{"." if not description_value else f", Description: {description_value}"}'
                 elif action == 'Take Screenshot':
-                    step = (action, text_value)
-                    display_txt = f'Take screenshot and save as {text_value}.'
+                    scope = self.screenshotScope()
+                    if scope is None:
+                        return
+                    step = (action, text_value) + scope
                 elif action == 'Maximize Window':
                     step = (action,)
-                    display_txt = f'Maximize Window'
                 elif action == 'Compare Images':
-                    step = (action, self.refImgPath.text(), self.testImgPath.text(), self.outputPath.text())
-                    display_txt = f'Comparing images: {step[1]} and {step[2]}.'
+                    scope = self.screenshotScope()
+                    if scope is None:
+                        return
+                    step = (action, self.refImgPath.text(), self.testImgPath.text(), self.outputPath.text()) + scope
+                elif action in BUDGET_UNITS:
+                    step = self.budgetStep(action, description_value)
+                    if step is None:
+                        return
                 else:
                     QMessageBox.warning(self, "Invalid Action", "The selected action is not supported.")
                     return
 
-                self.steps[selected_item] = step
-                self.stepsList.item(selected_item).setText(display_txt)
+                self.recordEdit({"op": "set", "index": selected_item, "step": atm8file.step_to_record(step)})
+                self.stepsModel.setStep(selected_item, step)
+                self.logger.info(f"Updated step {selected_item + 1}: {self.constructStepDisplayText(step)}")
             else:
                 QMessageBox.warning(self, "No Selection", "Please select a step to update.")
         except Exception as e:
@@ -2103,11 +3313,12 @@ class Atom8(QMainWindow):
 
     def moveStepUp(self):
         try:
-            selected_item = self.stepsList.currentRow()
+            self.finishStepLoading()
+            selected_item = self.selectedStepRow()
             if selected_item >= 1:
-                self.stepsList.insertItem(selected_item - 1, self.stepsList.takeItem(selected_item))
-                self.steps.insert(selected_item - 1, self.steps.pop(selected_item))
-                self.stepsList.setCurrentRow(selected_item - 1)
+                self.recordEdit({"op": "move", "from": selected_item, "to": selected_item - 1})
+                self.stepsModel.moveStep(selected_item, selected_item - 1)
+                self.selectStepRow(selected_item - 1)
             else:
                 QMessageBox.warning(self, "No Selection", "Please select a step to move up.")
         except Exception as e:
@@ -2115,11 +3326,12 @@ class Atom8(QMainWindow):
 
     def moveStepDown(self):
         try:
-            selected_item = self.stepsList.currentRow()
-            if selected_item >= 0 and selected_item < self.stepsList.count() - 1:
-                self.stepsList.insertItem(selected_item + 1, self.stepsList.takeItem(selected_item))
-                self.steps.insert(selected_item + 1, self.steps.pop(selected_item))
-                self.stepsList.setCurrentRow(selected_item + 1)
+            self.finishStepLoading()
+            selected_item = self.selectedStepRow()
+            if selected_item >= 0 and selected_item < len(self.steps) - 1:
+                self.recordEdit({"op": "move", "from": selected_item, "to": selected_item + 1})
+                self.stepsModel.moveStep(selected_item, selected_item + 1)
+                self.selectStepRow(selected_item + 1)
             else:
                 QMessageBox.warning(self, "No Selection", "Please select a step to move down.")
         except Exception as e:
@@ -2158,8 +3370,16 @@ class Atom8(QMainWindow):
             self.locatorInput.setText('')
             self.inputText.setText('')
             self.sleepInput.setText('')
+            self.budgetInput.setText('')
             self.inputDescription.setText('')
             self.refImgPath.setText('')
+            self.loadStrategySelection.setCurrentIndex(0)
+            self.readySelection.setCurrentIndex(0)
+            self.scriptModeSelection.setCurrentIndex(0)
+            self.scriptTimeoutInput.setText('')
+            self.scriptResultInput.setText('')
+            self.scopeSelection.setCurrentIndex(0)
+            self.clipInput.setText('')
 
         except Exception as e:
             QMessageBox.warning(self, "Error", f"Error while clearing input fields: {e}")
@@ -2176,21 +3396,7 @@ class Atom8(QMainWindow):
 
     def openRecentFile(self, filePath):
         try:
-            with open(filePath, "r") as file:
-                file_content = json.load(file)
-                if not isinstance(file_content, dict) or "steps" not in file_content:
-                    raise ValueError("File content is not in the expected format")
-
-                self.testName.setText(file_content.get("testName", ""))
-                self.testDescription.setText(file_content.get("testDescription", ""))
-                self.steps = file_content["steps"]
-                self.stepsList.clear()
-                for index, step in enumerate(self.steps):
-                    if not isinstance(step, (list, tuple)):
-                        QMessageBox.critical(self, "Error", f"Invalid step format at index {index}: {step}")
-                        continue
-                    display_text = self.constructStepDisplayText(step)
-                    self.stepsList.addItem(display_text)
+            self.loadAtm8File(filePath)
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to open file: {e}")
 
@@ -2210,6 +3416,8 @@ class Atom8(QMainWindow):
             url, ok = QInputDialog.getText(self, 'Extract Web Elements', 'Enter the URL:')
             if ok and url:
                 try:
+                    from helper import extract_elements_to_json
+
                     elements_data = extract_elements_to_json(url)
                     self.showExtractionResult(elements_data)
                 except Exception as e:
@@ -2218,6 +3426,17 @@ class Atom8(QMainWindow):
             QMessageBox.warning(self, "Error", f"Error while extracting web elements: {e}")
 
     def showSequencer(self):
+        try:
+            if self.sequencerWindow is None:
+                self.setupSequencer()
+                if self.sequencerWindow is None:
+                    return
+            self.sequencerWindow.show()
+            self.sequencerWindow.raise_()
+        except Exception as e:
+            QMessageBox.warning(self, "Error", f"Error while showing sequencer: {e}")
+
+    def setupSequencer(self):
         try:
             self.sequencerWindow = QDialog(self, Qt.Window)
             self.sequencerWindow.setWindowTitle("Sequencer")
@@ -2244,6 +3463,14 @@ class Atom8(QMainWindow):
             runSequenceAction.triggered.connect(self.runSequencer)
             fileMenu.addAction(runSequenceAction)
 
+            resumeSequenceAction = QAction("Resume Sequence", self)
+            resumeSequenceAction.triggered.connect(lambda: self.runSequencer(mode="resume"))
+            fileMenu.addAction(resumeSequenceAction)
+
+            rerunFailedAction = QAction("Rerun Failed Only", self)
+            rerunFailedAction.triggered.connect(lambda: self.runSequencer(mode="failed"))
+            fileMenu.addAction(rerunFailedAction)
+
             sequencerLayout.setMenuBar(menuBar)
 
             buttonLayout = QHBoxLayout()
@@ -2257,6 +3484,11 @@ class Atom8(QMainWindow):
             self.removeFileButton.setProperty("class", "secondary-btn")
             buttonLayout.addWidget(self.removeFileButton)
 
+            self.requirementsButton = QPushButton("Set Requirements")
+            self.requirementsButton.clicked.connect(self.editRequirements)
+            self.requirementsButton.setProperty("class", "secondary-btn")
+            buttonLayout.addWidget(self.requirementsButton)
+
             self.loadToMainEditorButton = QPushButton("Load to Main Editor")
             self.loadToMainEditorButton.clicked.connect(self.loadToMainEditor)
             self.loadToMainEditorButton.setProperty("class", "secondary-btn")
@@ -2291,6 +3523,27 @@ class Atom8(QMainWindow):
             self.generateReport = QCheckBox("Generate Report")
             sequencerLayout.addWidget(self.generateReport)
 
+            self.sequenceMode = QComboBox()
+            self.sequenceMode.addItems(["Single Session (In Order)", "Dependency Graph (Parallel)"])
+            self.sequenceMode.setToolTip("Run all files in one browser session, or each file in its own session "
+                                         "as soon as the files it requires have passed")
+            sequenceModeLayout = QHBoxLayout()
+            sequenceModeLayout.addWidget(QLabel("Run Mode:"))
+            sequenceModeLayout.addWidget(self.sequenceMode)
+            sequencerLayout.addLayout(sequenceModeLayout)
+
+            self.flakyPolicySelection = QComboBox()
+            self.flakyPolicySelection.addItems(FLAKY_POLICIES)
+            self.flakyPolicySelection.setToolTip(
+                "Files whose results flip between passed and failed in the run history: run them as usual, run them "
+                "after the other files, leave them out (quarantine), or rerun them in their own session when they "
+                "fail (isolate)")
+            self.flakyPolicySelection.currentTextChanged.connect(self.setFlakyPolicy)
+            flakyPolicyLayout = QHBoxLayout()
+            flakyPolicyLayout.addWidget(QLabel("Flaky Files:"))
+            flakyPolicyLayout.addWidget(self.flakyPolicySelection)
+            sequencerLayout.addLayout(flakyPolicyLayout)
+
             sequencerLayout.addLayout(buttonLayout)
 
             self.atm8FilesList = QListWidget()
@@ -2298,11 +3551,15 @@ class Atom8(QMainWindow):
 
             self.sequencerWindow.setLayout(sequencerLayout)
             self.sequencerWindow.resize(600, 400)
-            self.sequencerWindow.show()
-
-
         except Exception as e:
-            QMessageBox.warning(self, "Error", f"Error while showing sequencer: {e}")
+            self.sequencerWindow = None
+            QMessageBox.warning(self, "Error", f"Error while setting up sequencer: {e}")
+
+    def setFlakyPolicy(self, policy):
+        if policy == "run":
+            self.sequenceOptions.pop("flaky", None)
+        else:
+            self.sequenceOptions["flaky"] = policy
 
     def chooseAtm8File(self):
         try:
@@ -2314,30 +3571,125 @@ class Atom8(QMainWindow):
         except Exception as e:
             QMessageBox.warning(self, "Error", f"Error while choosing atm8 file: {e}")
 
-    def runSequencer(self, fileNames):
+    def runSequencer(self, checked=False, mode="all"):
         try:
-            self.steps.clear()
-            for i in range(self.atm8FilesList.count()):
-                file_name = self.atm8FilesList.item(i).text()
-                with open(file_name, "r") as file:
-                    file_content = json.load(file)
-                    if not isinstance(file_content, dict) or "steps" not in file_content:
-                        raise ValueError("File content is not in the expected format")
-
-                    for step in file_content["steps"]:
-                        self.steps.append(step)
-                        display_text = self.constructStepDisplayText(step)
-                        self.stepsList.addItem(display_text)
+            sequence = dict(self.sequenceOptions, version=2 if self.sequenceMode.currentIndex() == 1 else 1,
+                            files=self.sequenceFiles())
+            checkpoint = Checkpoint(checkpoint_path([entry["path"] for entry in sequence["files"]]))
+            if mode == "all":
+                checkpoint.reset()
+            elif not checkpoint.entries:
+                QMessageBox.information(self, "No Checkpoint", "This sequence has no previous run to continue.")
+                return
+
+            self.closeStepLoader()
             self.logger.info("Running sequencer.")
-            self.startAutomation()
+
+            settings = self.loadSettings()
+            nodePool = node_pool_from_settings(settings, self.logger)
+            newDriver = self.driverFactory(nodePool)
+            # On a grid the default is as many files at once as it has slots for the browser.
+            maxWorkers = self.sequenceOptions.get("maxWorkers") or (
+                nodePool.capacity(settings.get("defaultBrowser", "Chrome")) if nodePool else 4)
+            savePath = settings.get("savePath")
+            openPhoto = self.openPhoto.isChecked()
+            browserOptions = self.checkedBrowserOptions()
+
+            def trackedDriver():
+                self.driver = newDriver()
+                return self.driver
+
+            def newEngine(driver, header):
+                return AutomationEngine(driver, self.logger, save_path=savePath, test_name=header.get("testName", ""),
+                                        open_photo=openPhoto, **engine_options(settings, header, browserOptions))
+
+            flaky = {}
+            if sequence.get("flaky", "run") != "run":
+                flaky = load_flaky_files([entry["path"] for entry in sequence["files"]],
+                                         sequence.get("flakyThreshold", FLAKY_THRESHOLD))
+
+            runLog = self.startRunLog()
+            run = SequenceRun(sequence, trackedDriver, newEngine, self.logger, checkpoint, runLog, flaky)
+            try:
+                status = run.run(mode, max_workers=maxWorkers,
+                                 on_wait=QApplication.processEvents)
+            finally:
+                runLog.stop()
+            historyFiles = []
+            for path, results in run.fileResults.items():
+                historyFiles.extend((path, attempt, 'Failed', None) for attempt in run.failedAttempts.get(path, []))
+                historyFiles.append((path, results, status.get(path), run.fileDurations.get(path)))
+            self.recordHistory(runLog.run_id, historyFiles)
+
+            self.results = run.results()
+            self.steps = [step for step, *_ in self.results]
+            self.recordReset()
+            for path in run.paths:
+                self.logger.info(f"{path}: {status.get(path, 'Not run')}")
+
+            if self.generateReport.isChecked():
+                self.displayResults(self.results)
+
+            self.logger.info("\n\nSequence completed.\n")
         except Exception as e:
             QMessageBox.warning(self, "Error", f"Error while running sequencer: {e}")
 
+    def sequenceFiles(self):
+        files = []
+        for i in range(self.atm8FilesList.count()):
+            item = self.atm8FilesList.item(i)
+            files.append({"path": item.text(), "requires": item.data(Qt.UserRole) or []})
+        return files
+
+    def setFileRequirements(self, item, requires):
+        item.setData(Qt.UserRole, requires)
+        item.setToolTip("Requires:\n" + "\n".join(requires) if requires else "")
+
+    def editRequirements(self):
+        try:
+            selected_item = self.atm8FilesList.currentRow()
+            if selected_item < 0:
+                QMessageBox.warning(self, "No Selection", "Please select a file to set its requirements.")
+                return
+            item = self.atm8FilesList.item(selected_item)
+            current = item.data(Qt.UserRole) or []
+
+            dialog = QDialog(self.sequencerWindow)
+            dialog.setWindowTitle(f"Requirements of {os.path.basename(item.text())}")
+            dialogLayout = QVBoxLayout(dialog)
+            dialogLayout.addWidget(QLabel("Run this file only after the selected files have passed:"))
+
+            candidates = QListWidget(dialog)
+            candidates.setSelectionMode(QAbstractItemView.MultiSelection)
+            for i in range(self.atm8FilesList.count()):
+                path = self.atm8FilesList.item(i).text()
+                if i != selected_item:
+                    candidates.addItem(path)
+                    candidates.item(candidates.count() - 1).setSelected(path in current)
+            dialogLayout.addWidget(candidates)
+
+            okButton = QPushButton("OK", dialog)
+            okButton.clicked.connect(dialog.accept)
+            dialogLayout.addWidget(okButton)
+
+            if dialog.exec_():
+                requires = [candidate.text() for candidate in candidates.selectedItems()]
+                self.setFileRequirements(item, requires)
+                if requires:
+                    self.sequenceMode.setCurrentIndex(1)
+        except Exception as e:
+            QMessageBox.warning(self, "Error", f"Error while setting requirements: {e}")
+
     def removeAtm8File(self):
         try:
             selected_item = self.atm8FilesList.currentRow()
             if selected_item >= 0:
-                self.atm8FilesList.takeItem(selected_item)
+                removed = self.atm8FilesList.takeItem(selected_item).text()
+                for i in range(self.atm8FilesList.count()):
+                    item = self.atm8FilesList.item(i)
+                    requires = item.data(Qt.UserRole) or []
+                    if removed in requires:
+                        self.setFileRequirements(item, [path for path in requires if path != removed])
         except Exception as e:
             QMessageBox.warning(self, "Error", f"Error while removing atm8 file: {e}")
 
@@ -2355,13 +3707,14 @@ class Atom8(QMainWindow):
             options = QFileDialog.Options()
             fileName, _ = QFileDialog.getOpenFileName(self, "Open File", "", "Sequence Files (*.seq)", options=options)
             if fileName:
-                with open(fileName, "r") as file:
-                    sequence_content = json.load(file)
-                    if not isinstance(sequence_content, list):
-                        raise ValueError("Sequence content is not in the expected format")
-
-                    for file_name in sequence_content:
-                        self.atm8FilesList.addItem(file_name)
+                sequence = load_sequence(fileName)
+                self.sequenceOptions = {key: value for key, value in sequence.items() if key not in ("version", "files")}
+                self.sequenceMode.setCurrentIndex(0 if sequence["version"] == 1 else 1)
+                self.flakyPolicySelection.setCurrentText(self.sequenceOptions.get("flaky", "run"))
+                for entry in sequence["files"]:
+                    self.atm8FilesList.addItem(entry["path"])
+                    self.setFileRequirements(self.atm8FilesList.item(self.atm8FilesList.count() - 1),
+                                             entry["requires"])
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to open file: {e}")
 
@@ -2371,51 +3724,15 @@ class Atom8(QMainWindow):
             fileName, _ = QFileDialog.getSaveFileName(self, "Save Sequence", "", "Sequence Files (*.seq)",
                                                       options=options)
             if fileName:
-                sequence_content = [self.atm8FilesList.item(i).text() for i in range(self.atm8FilesList.count())]
-                with open(fileName, "w") as file:
-                    json.dump(sequence_content, file)
+                if self.sequenceMode.currentIndex() == 1:
+                    save_sequence(fileName, self.sequenceFiles(), **self.sequenceOptions)
+                else:
+                    sequence_content = [self.atm8FilesList.item(i).text() for i in range(self.atm8FilesList.count())]
+                    with open(fileName, "w") as file:
+                        json.dump(sequence_content, file)
         except Exception as e:
             QMessageBox.warning(self, "Error", f"Error while saving sequence: {e}")
 
-    def compareImages(self, reference_path, test_path, output_path):
-        with open(self.settingsFilePath(), "r") as settings_file:
-            settings = json.load(settings_file)
-            screenshot_folder = f"{settings['savePath']}/{self.testName.text()}"
-            if not os.path.isdir(screenshot_folder):
-                os.makedirs(screenshot_folder)
-
-            test_filename = os.path.join(screenshot_folder,
-                                         f"{os.path.basename(test_path)}_{datetime.now().strftime('%Y.%m.%d %H-%M-%S')}.png" if not test_path.endswith(
-                                             ".png") else os.path.basename(test_path))
-            self.driver.save_screenshot(test_filename)
-            self.logger.info(f"[Compare Images] -> Test screenshot saved as {test_filename}")
-
-            reference = cv2.imread(reference_path)
-            test = cv2.imread(test_filename)
-
-            difference = cv2.absdiff(reference, test)
-            gray = cv2.cvtColor(difference, cv2.COLOR_BGR2GRAY)
-
-            _, thresh = cv2.threshold(gray, 1, 255, cv2.THRESH_BINARY)
-            contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-
-            overlay = test.copy()
-            overlay[:] = (0, 0, 0)
-            cv2.addWeighted(overlay, 0.5, test, 0.5, 0, test)
-
-            for contour in contours:
-                x, y, w, h = cv2.boundingRect(contour)
-                cv2.rectangle(test, (x, y), (x + w, y + h), (0, 255, 0), 1)
-
-            output_filename = os.path.join(screenshot_folder,
-                                           f"{os.path.basename(output_path)}_{datetime.now().strftime('%Y.%m.%d %H-%M-%S')}.png" if not output_path.endswith(
-                                               ".png") else os.path.basename(output_path))
-            cv2.imwrite(output_filename, test)
-            self.outputFileName = output_filename
-            self.logger.info(f"[Compare Images] -> Output image saved as {output_filename}")
-
-            return output_filename
-
     def showExtractionResult(self, elements_data):
         try:
             self.resultsWindow = QDialog(self, Qt.Window)
@@ -2492,6 +3809,8 @@ class Atom8(QMainWindow):
                 QApplication.processEvents()
 
                 try:
+                    from helper import extract_elements_to_json
+
                     elements_data = extract_elements_to_json(url)
                     self.updateResultsTable(elements_data)
                     self.statusBar.clearMessage()
@@ -2503,7 +3822,11 @@ class Atom8(QMainWindow):
 
 
 if __name__ == '__main__':
+    # Script steps can run in spawned worker processes, which re-enter here when Atom8 is frozen into an executable.
+    multiprocessing.freeze_support()
     app = QApplication(sys.argv)
     ex = Atom8()
     ex.show()
+    # Only once the window is shown; finish() waits up to a second for a window that is still hidden.
+    ex.splash.finish(ex)
     sys.exit(app.exec_())
@@ -0,0 +1,52 @@
+"""
+Cold start benchmark: time from interpreter start until the Atom8 main window has been built and shown.
+
+Usage: python benchmarks/startup.py [runs]
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ["selenium", "pandas", "openpyxl", "cv2", "pywinauto", "requests", "bs4"]
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+from PyQt5.QtWidgets import QApplication
+import atom8
+imported = time.perf_counter()
+app = QApplication(sys.argv)
+window = atom8.Atom8()
+window.show()
+window.splash.finish(window)
+built = time.perf_counter()
+print(json.dumps({
+    "import": imported - start,
+    "window": built - imported,
+    "total": built - start,
+    "heavy": [name for name in %r if name in sys.modules],
+}))
+""" % (HEAVY_MODULES,)
+
+
+def measure_once():
+    env = dict(os.environ, QT_QPA_PLATFORM=os.environ.get("QT_QPA_PLATFORM", "offscreen"))
+    output = subprocess.run([sys.executable, "-c", PROBE], cwd=ROOT, env=env, capture_output=True, text=True,
+                            check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main(runs=5):
+    samples = [measure_once() for _ in range(runs)]
+    for key in ("import", "window", "total"):
+        values = [sample[key] * 1000 for sample in samples]
+        print(f"{key:>7}: median {statistics.median(values):8.1f} ms   min {min(values):8.1f} ms")
+    heavy = sorted({name for sample in samples for name in sample["heavy"]})
+    print(f"  heavy modules loaded at startup: {', '.join(heavy) if heavy else 'none'}")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
@@ -0,0 +1,515 @@
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+
+import aql
+import asyncengine
+import atm8file
+from artifacts import store_from_settings
+from engine import PAGE_LOAD_STRATEGIES, AutomationEngine, engine_options, session_factory
+from history import FLAKY_THRESHOLD, RunHistory, load_flaky_files, percentile
+from launch import parse_window_size, selected_profile
+from matrix import BROWSERS, CURRENT_PROFILE, MatrixRun, matrix_cells, parse_profile
+from remote import node_pool_from_settings
+from report import format_step_text, matrix_rows, performance_rows, result_rows, write_matrix_report, write_report
+from runlog import RunLog
+from sequencer import (FLAKY_POLICIES, Checkpoint, SequenceRun, checkpoint_path, load_durations, load_sequence,
+                       merge_shard_results, parse_shard, save_shard_results, shard_files, update_durations)
+from settings import app_data_path, load_settings
+
+
+def add_browser_arguments(parser):
+    parser.add_argument("--browser", help="Browser to use; defaults to the Preferences setting")
+    parser.add_argument("--option", action="append", default=[], metavar="LABEL",
+                        help="Browser option as labelled in the Browser Options tab, e.g. 'Headless Mode'; repeatable")
+    parser.add_argument("--page-load-strategy", choices=PAGE_LOAD_STRATEGIES,
+                        help="Page load strategy of the browser session; defaults to the Preferences setting")
+    parser.add_argument("--launch-profile", metavar="NAME",
+                        help="Saved launch profile giving the driver, browser binary, browser, options and window "
+                             "size; --browser and --option override its browser and options")
+    add_remote_argument(parser)
+
+
+def add_remote_argument(parser):
+    parser.add_argument("--remote", action="append", default=[], metavar="URL[=SLOTS]",
+                        help="Run the browsers on this Selenium Grid or remote WebDriver instead of the Preferences "
+                             "executor; repeatable. Without SLOTS the capacity is read from the server's /status")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="atom8", description="Run Atom8 sequences without the GUI.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    sequence = subparsers.add_parser("sequence", help="Run a .seq file")
+    sequence.add_argument("path")
+    mode = sequence.add_mutually_exclusive_group()
+    mode.add_argument("--resume", action="store_true", help="Skip files that passed in the last run and continue")
+    mode.add_argument("--failed-only", action="store_true", help="Rerun only the files that failed in the last run")
+    sequence.add_argument("--workers", type=int, help="Files run at once in dependency graph sequences")
+    sequence.add_argument("--shard", metavar="I/N", help="Run only shard I of N, e.g. 2/4")
+    sequence.add_argument("--durations", metavar="FILE",
+                          help="File duration history used to balance shards; updated after the run")
+    sequence.add_argument("--results", metavar="FILE", help="Write the shard results to FILE for 'atom8 merge'")
+    sequence.add_argument("--flaky", choices=FLAKY_POLICIES,
+                          help="What to do with files the run history marks as flaky; defaults to the sequence's "
+                               "'flaky' option, else run them as usual")
+    add_browser_arguments(sequence)
+
+    run = subparsers.add_parser("run", help="Run an AQL script")
+    run.add_argument("path")
+    run.add_argument("--report", metavar="FILE", help="Write an Excel report of the run to FILE")
+    add_browser_arguments(run)
+
+    matrix = subparsers.add_parser("matrix", help="Run a .atm8 file, AQL script or sequence across a browser matrix")
+    matrix.add_argument("path")
+    matrix.add_argument("--browsers", default=None,
+                        help=f"Comma-separated browsers, e.g. {','.join(BROWSERS)}; defaults to the sequence's "
+                             "matrix, else the Preferences browser")
+    matrix.add_argument("--profile", action="append", default=[], metavar="NAME[=OPTION,...]",
+                        help="Browser option profile, saved in Preferences or defined inline; repeatable. "
+                             f"Defaults to '{CURRENT_PROFILE}', the options given with --option")
+    matrix.add_argument("--window-size", action="append", default=[], metavar="WxH",
+                        help="Window size such as 1920x1080, or 'default'; repeatable")
+    matrix.add_argument("--workers", type=int, help="Cells run at once; defaults to all of them")
+    matrix.add_argument("--report", metavar="FILE", help="Write an Excel report with one column per cell to FILE")
+    matrix.add_argument("--option", action="append", default=[], metavar="LABEL",
+                        help=f"Browser option of the '{CURRENT_PROFILE}' profile; repeatable")
+    matrix.add_argument("--page-load-strategy", choices=PAGE_LOAD_STRATEGIES,
+                        help="Page load strategy of the browser sessions; defaults to the Preferences setting")
+    add_remote_argument(matrix)
+
+    load = subparsers.add_parser("load", help="Run many concurrent sessions of a .atm8 file or AQL script")
+    load.add_argument("path")
+    load.add_argument("--sessions", type=int, default=10, help="Sessions to run in total (default 10)")
+    load.add_argument("--concurrency", type=int,
+                      help="Sessions open at once; defaults to all of them, or the remote capacity for the browser")
+    load.add_argument("--connections", type=int, default=32,
+                      help="Keep-alive connections to each WebDriver server (default 32)")
+    load.add_argument("--report", metavar="FILE", help="Write an Excel report of the first session to FILE")
+    add_browser_arguments(load)
+
+    history = subparsers.add_parser("history", help="Query the run history")
+    history.add_argument("query", choices=["runs", "slowest", "p95", "failures", "flaky"],
+                         help="runs: latest runs; slowest: slowest steps by mean duration; "
+                              "p95: median and 95th percentile step durations; failures: when failing steps "
+                              "started failing; flaky: pass/fail flip scores of files, or of the steps of --file")
+    history.add_argument("--file", help="Only runs of this .atm8 file or script")
+    history.add_argument("--runs", type=int, default=20, help="Look at the last RUNS runs (default 20)")
+    history.add_argument("--limit", type=int, default=20, help="Rows to print (default 20)")
+
+    artifacts = subparsers.add_parser("artifacts", help="Manage the screenshot store")
+    actions = artifacts.add_subparsers(dest="action", required=True)
+    actions.add_parser("runs", help="List the runs with stored images")
+    show = actions.add_parser("show", help="List the images of a run")
+    show.add_argument("run")
+    actions.add_parser("baselines", help="List the baselines")
+    promote = actions.add_parser("promote", help="Make an image of a run a baseline, by reference")
+    promote.add_argument("run")
+    promote.add_argument("name", help="Name the image was taken with, e.g. home.png")
+    promote.add_argument("--as", dest="baseline", help="Baseline name; defaults to <test name>/<name>")
+    export = actions.add_parser("export", help="Copy the images of a run out under their names")
+    export.add_argument("run")
+    export.add_argument("directory")
+    gc = actions.add_parser("gc", help="Apply the retention policy and delete unreferenced images")
+    gc.add_argument("--keep-runs", type=int, help="Keep the newest N runs; defaults to the Preferences setting")
+    gc.add_argument("--keep-days", type=float,
+                    help="Keep runs younger than D days; defaults to the Preferences setting")
+    gc.add_argument("--dry-run", action="store_true", help="Only report what would be deleted")
+
+    merge = subparsers.add_parser("merge", help="Combine shard result files into one report")
+    merge.add_argument("results", nargs="+", help="Result files written by 'atom8 sequence --results'")
+    merge.add_argument("-o", "--output", required=True, help="Excel report to write")
+    merge.add_argument("--durations", metavar="FILE", help="Fold the measured file durations into this history")
+    return parser
+
+
+def browser(args, settings):
+    return args.browser or settings.get("defaultBrowser", "Chrome")
+
+
+def driver_factory(args, settings, logger, node_pool=None):
+    return session_factory(settings, browser(args, settings), args.option, logger, node_pool=node_pool)
+
+
+def start_run_log(settings, logger, file):
+    log_path = settings.get("logPath") or app_data_path('logs')
+    return RunLog(logger, log_path, file=file, compress=settings.get("compressLogs", "None") == "gzip").start()
+
+
+def run_sequence(args, settings, logger):
+    sequence = load_sequence(args.path)
+    shard = parse_shard(args.shard) if args.shard else (0, 1)
+    if args.shard:
+        sequence = dict(sequence, files=shard_files(sequence["files"], *shard, load_durations(args.durations)))
+        logger.info(f"Shard {args.shard}: {len(sequence['files'])} files.")
+    if args.flaky:
+        sequence = dict(sequence, flaky=args.flaky)
+    flaky = {}
+    if sequence.get("flaky", "run") != "run":
+        flaky = load_flaky_files([entry["path"] for entry in sequence["files"]],
+                                 sequence.get("flakyThreshold", FLAKY_THRESHOLD))
+    mode = "resume" if args.resume else "failed" if args.failed_only else "all"
+    try:
+        node_pool = node_pool_from_settings(settings, logger)
+    except ValueError as e:
+        print(str(e), file=sys.stderr)
+        return 2
+    checkpoint = Checkpoint(checkpoint_path([entry["path"] for entry in sequence["files"]]))
+    if mode == "all":
+        checkpoint.reset()
+    elif not checkpoint.entries:
+        logger.warning("This sequence has no previous run to continue; running every file.")
+
+    def new_engine(driver, header):
+        return AutomationEngine(driver, logger, save_path=settings.get("savePath"),
+                                test_name=header.get("testName", ""), **engine_options(settings, header, args.option))
+
+    run_log = start_run_log(settings, logger, args.path)
+    try:
+        run = SequenceRun(sequence, driver_factory(args, settings, logger, node_pool), new_engine, logger, checkpoint,
+                          run_log, flaky)
+        # On a grid the default is as many files at once as it has slots for the browser.
+        workers = args.workers or sequence.get("maxWorkers") or (
+            node_pool.capacity(browser(args, settings)) if node_pool else 4)
+        status = run.run(mode, max_workers=workers)
+    finally:
+        run_log.stop()
+    record_history(settings, logger, run_log.run_id, args.option, sequence_history(run, status))
+
+    if args.durations:
+        update_durations(args.durations, run.fileDurations)
+    if args.results:
+        save_shard_results(args.results, args.path, shard, run, status, args.option)
+
+    for path in run.paths:
+        print(f"{status.get(path, 'Not run'):>11}  {path}")
+    return 0 if all(status.get(path) in ('Passed', 'Quarantined') for path in run.paths) else 1
+
+
+def run_script(args, settings, logger):
+    try:
+        program = aql.parse_file(args.path)
+    except aql.AqlError as e:
+        print(f"{args.path}: {e}", file=sys.stderr)
+        return 2
+
+    test_name = os.path.splitext(os.path.basename(args.path))[0]
+    try:
+        node_pool = node_pool_from_settings(settings, logger)
+    except ValueError as e:
+        print(str(e), file=sys.stderr)
+        return 2
+    run_log = start_run_log(settings, logger, args.path)
+    started = time.monotonic()
+    try:
+        driver = driver_factory(args, settings, logger, node_pool)()
+        try:
+            engine = AutomationEngine(driver, logger, save_path=settings.get("savePath"), test_name=test_name,
+                                      **engine_options(settings, {}, args.option))
+            results = engine.run(aql.steps(program, engine.variables),
+                                 on_step=lambda index, step: run_log.context.update(step=index + 1, action=step[0]))
+        finally:
+            driver.quit()
+    except aql.AqlError as e:
+        print(f"{args.path}: {e}", file=sys.stderr)
+        return 2
+    finally:
+        run_log.stop()
+    record_history(settings, logger, run_log.run_id, args.option,
+                   [(os.path.abspath(args.path), results, None, time.monotonic() - started)])
+
+    if args.report:
+        write_report(args.report, test_name, f"AQL script {args.path}", result_rows(results), args.option,
+                     performance_rows(results))
+    for row in result_rows(results):
+        print(f"{row[1]:>8}  {row[0]}")
+    return 0 if all(status == 'Passed' for _, status, _ in results) else 1
+
+
+def run_matrix(args, settings, logger):
+    sequence = load_sequence(args.path) if args.path.endswith(".seq") else None
+    defaults = (sequence or {}).get("matrix", {})
+    try:
+        browsers = args.browsers.split(",") if args.browsers else defaults.get("browsers") or [
+            settings.get("defaultBrowser", "Chrome")]
+        saved = dict(settings.get("matrixProfiles", {}), **defaults.get("profiles", {}))
+        profiles = [parse_profile(profile, saved) for profile in args.profile] or [
+            (name, saved[name]) for name in defaults.get("profiles", {})] or [(CURRENT_PROFILE, args.option)]
+        sizes = [parse_window_size(size) for size in args.window_size or defaults.get("windowSizes", [])]
+        cells = matrix_cells([browser.strip() for browser in browsers], profiles, sizes)
+        program = aql.parse_file(args.path) if args.path.endswith(".aql") else None
+        node_pool = node_pool_from_settings(settings, logger)
+    except (ValueError, aql.AqlError) as e:
+        print(f"{args.path}: {e}", file=sys.stderr)
+        return 2
+    history = {}
+
+    def run_cell(cell):
+        new_driver = session_factory(settings, cell.browser, cell.options, logger, cell.windowSize, node_pool)
+
+        def new_engine(driver, header, test_name=None):
+            # Sequence files of the cell may run on threads of their own; their log records still name the cell.
+            run_log.context.update(cell=cell.label)
+            return AutomationEngine(driver, logger, save_path=settings.get("savePath"),
+                                    test_name=header.get("testName", "") if test_name is None else test_name,
+                                    **engine_options(settings, header, cell.options))
+
+        started = time.monotonic()
+        if sequence is not None:
+            run = SequenceRun(sequence, new_driver, new_engine, logger, run_log=run_log)
+            status = run.run(max_workers=sequence.get("maxWorkers", 4))
+            history[cell.label] = sequence_history(run, status)
+            return run.results()
+        driver = new_driver()
+        try:
+            if program is not None:
+                engine = new_engine(driver, {}, os.path.splitext(os.path.basename(args.path))[0])
+                results = engine.run(aql.steps(program, engine.variables), on_step=on_step)
+            else:
+                with atm8file.open_steps(args.path) as reader:
+                    results = new_engine(driver, reader.header).run(reader, on_step=on_step)
+        finally:
+            driver.quit()
+        history[cell.label] = [(os.path.abspath(args.path), results, None, time.monotonic() - started)]
+        return results
+
+    def on_step(index, step):
+        run_log.context.update(step=index + 1, action=step[0])
+
+    run_log = start_run_log(settings, logger, args.path)
+    try:
+        run = MatrixRun(cells, run_cell, logger, run_log)
+        status = run.run(max_workers=args.workers)
+    finally:
+        run_log.stop()
+    for cell in cells:
+        record_history(settings, logger, run_log.run_id, cell.options, history.get(cell.label, []), cell.browser)
+
+    if args.report:
+        test_name = os.path.splitext(os.path.basename(args.path))[0]
+        rows = matrix_rows([cell.label for cell in cells], run.results(),
+                           [run.cellDurations.get(cell.label) for cell in cells])
+        write_matrix_report(args.report, test_name, f"{len(cells)} matrix cells of {args.path}", rows,
+                            [cell.options for cell in cells])
+    for cell in cells:
+        duration = run.cellDurations.get(cell.label)
+        print(f"{status.get(cell.label, 'Not run'):>8}  {'-' if duration is None else f'{duration:.1f} s':>9}  "
+              f"{cell.label}")
+    return 0 if all(status.get(cell.label) == 'Passed' for cell in cells) else 1
+
+
+def run_load(args, settings, logger):
+    test_name = os.path.splitext(os.path.basename(args.path))[0]
+    try:
+        if args.path.endswith(".aql"):
+            program = aql.parse_file(args.path)
+            header = {}
+
+            def steps(variables):
+                return aql.steps(program, variables)
+        else:
+            header, file_steps = atm8file.load(args.path)
+
+            def steps(variables):
+                return file_steps
+        node_pool = node_pool_from_settings(settings, logger)
+    except (ValueError, aql.AqlError) as e:
+        print(f"{args.path}: {e}", file=sys.stderr)
+        return 2
+    if args.sessions < 1:
+        print("--sessions must be at least 1", file=sys.stderr)
+        return 2
+
+    runner = asyncengine.AsyncRunner(
+        browser(args, settings), args.option, settings, logger,
+        lambda plan_header: dict(engine_options(settings, plan_header, args.option),
+                                 save_path=settings.get("savePath")),
+        max_sessions=args.concurrency, node_pool=node_pool, connections_per_server=args.connections)
+    plans = [(f"{test_name} #{number}", header, steps) for number in range(1, args.sessions + 1)]
+    run_log = start_run_log(settings, logger, args.path)
+    started = time.monotonic()
+    try:
+        results = runner.run(plans)
+    except aql.AqlError as e:
+        print(f"{args.path}: {e}", file=sys.stderr)
+        return 2
+    finally:
+        run_log.stop()
+    elapsed = time.monotonic() - started
+    record_history(settings, logger, run_log.run_id, args.option,
+                   [(os.path.abspath(args.path), results[name], None, runner.planDurations.get(name))
+                    for name, _, _ in plans], browser(args, settings))
+
+    if args.report:
+        first = results[plans[0][0]]
+        write_report(args.report, test_name, f"First of {args.sessions} sessions of {args.path}",
+                     result_rows(first), args.option, performance_rows(first))
+    passed = sum(1 for session in results.values() if session and
+                 all(status == 'Passed' for _, status, _ in session))
+    sessions = [duration * 1000 for duration in runner.planDurations.values()]
+    step_durations = [details["duration"] for session in results.values() for _, _, details in session]
+    print(f"{passed} of {args.sessions} sessions passed in {elapsed:.1f} s")
+    print(f"Sessions: p50 {format_ms(percentile(sessions, 0.5))}, p95 {format_ms(percentile(sessions, 0.95))}")
+    print(f"Steps:    p50 {format_ms(percentile(step_durations, 0.5))}, "
+          f"p95 {format_ms(percentile(step_durations, 0.95))}")
+    return 0 if passed == args.sessions else 1
+
+
+def record_history(settings, logger, run_id, options, files, browser=None):
+    # files holds (path, results, status, duration in seconds) for each file run.
+    try:
+        history = RunHistory()
+        try:
+            for path, results, status, duration in files:
+                history.recordRun(path, results, status=status,
+                                  browser=browser or settings.get("defaultBrowser", "Chrome"),
+                                  options=options, duration=duration, run_id=run_id)
+        finally:
+            history.close()
+    except Exception as e:
+        logger.warning(f"Could not record the run history: {e}")
+
+
+def sequence_history(run, status):
+    files = []
+    for path, results in run.fileResults.items():
+        files.extend((path, attempt, 'Failed', None) for attempt in run.failedAttempts.get(path, []))
+        files.append((path, results, status.get(path), run.fileDurations.get(path)))
+    return files
+
+
+def format_ms(value):
+    return "-" if value is None else f"{value:,.0f} ms"
+
+
+def query_history(args):
+    history = RunHistory()
+    try:
+        if args.query == "runs":
+            for run in history.runs(args.file, args.limit):
+                duration = "-" if run["duration"] is None else f"{run['duration']:.1f} s"
+                print(f"{run['started']}  {run['status']:>8}  {duration:>9}  {run['browser'] or '-':<8}  "
+                      f"{run['file']}")
+        elif args.query == "slowest":
+            for row in history.slowestSteps(args.file, args.runs, args.limit):
+                print(f"{format_ms(row['mean']):>12} mean  {format_ms(row['slowest']):>12} max  {row['runs']:>4} runs  "
+                      f"{format_step_text(json.loads(row['step']))}  ({row['file']})")
+        elif args.query == "p95":
+            for row in history.stepPercentiles(args.file, args.runs)[:args.limit]:
+                print(f"{format_ms(row['percentile']):>12} p95  {format_ms(row['median']):>12} p50  "
+                      f"{row['runs']:>4} runs  {format_step_text(json.loads(row['step']))}  ({row['file']})")
+        elif args.query == "flaky":
+            if args.file:
+                for row in history.stepFlakiness(args.file, args.runs)[:args.limit]:
+                    print(f"{row['score']:>5.2f}  {row['failures']:>4}/{row['runs']:<4} failed  "
+                          f"{format_step_text(json.loads(row['step']))}")
+            else:
+                for row in history.fileFlakiness(runs=args.runs)[:args.limit]:
+                    print(f"{row['score']:>5.2f}  {row['failures']:>4}/{row['runs']:<4} failed  {row['file']}")
+        else:
+            for row in history.firstFailures(args.file)[:args.limit]:
+                print(f"{row['since']}  {row['failures']:>4} failed runs  "
+                      f"{format_step_text(json.loads(row['step']))}  ({row['file']})")
+    finally:
+        history.close()
+    return 0
+
+
+def manage_artifacts(args, settings):
+    store = store_from_settings(settings)
+    if store is None:
+        print("The screenshot store is turned off in Preferences.", file=sys.stderr)
+        return 2
+    if args.action == "runs":
+        for manifest in store.manifests():
+            print(f"{manifest['created']}  {manifest['run']}  {len(manifest['artifacts']):>4} images  "
+                  f"{manifest['test']}")
+    elif args.action == "show":
+        for artifact in store.manifest(args.run)["artifacts"]:
+            print(f"{artifact['key'][:12]}  {artifact['kind']:<14}  {artifact['name']}")
+    elif args.action == "baselines":
+        for name, key in sorted(store.baselines().items()):
+            print(f"{key[:12]}  {name}")
+    elif args.action == "promote":
+        manifest = store.manifest(args.run)
+        matches = [artifact for artifact in manifest["artifacts"] if artifact["name"] == args.name]
+        if not matches:
+            print(f"Run {args.run} has no image named {args.name}", file=sys.stderr)
+            return 2
+        baseline = args.baseline or f"{manifest['test']}/{args.name}"
+        store.promote(baseline, matches[-1]["key"])
+        print(f"baseline:{baseline} -> {matches[-1]['key'][:12]}")
+    elif args.action == "export":
+        for path in store.export(args.run, args.directory):
+            print(path)
+    else:
+        keep_runs = args.keep_runs if args.keep_runs is not None else settings.get("artifactKeepRuns")
+        keep_days = args.keep_days if args.keep_days is not None else settings.get("artifactKeepDays")
+        runs, objects, freed = store.gc(keep_runs, keep_days, dry_run=args.dry_run)
+        verb = "Would remove" if args.dry_run else "Removed"
+        print(f"{verb} {runs} runs and {objects} images, {freed / 1024 / 1024:,.1f} MB.")
+    return 0
+
+
+def merge_results(args, logger):
+    merged = merge_shard_results(args.results)
+    if os.path.exists(merged["sequence"]):
+        merged = merge_shard_results(args.results, load_sequence(merged["sequence"]))
+
+    results = [result for entry in merged["files"] for result in entry["results"]]
+    rows = result_rows(results)
+    test_name = os.path.splitext(os.path.basename(merged["sequence"]))[0]
+    write_report(args.output, test_name, f"{len(merged['files'])} files from {merged['shards']} shards", rows,
+                 merged["browserOptions"], performance_rows(results))
+    logger.info(f"Merged report written to {args.output}")
+
+    if args.durations:
+        update_durations(args.durations, {entry["path"]: entry["duration"] for entry in merged["files"] if
+                                          entry.get("duration") is not None})
+    for entry in merged["files"]:
+        print(f"{entry['status']:>11}  {entry['path']}")
+    return 0 if all(entry["status"] in ('Passed', 'Quarantined') for entry in merged["files"]) else 1
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    logger = logging.getLogger('Atom8')
+    settings = load_settings()
+    if getattr(args, "page_load_strategy", None):
+        settings["pageLoadStrategy"] = args.page_load_strategy
+    if getattr(args, "remote", None):
+        settings.update(executor="Remote", remoteNodes=args.remote)
+    if getattr(args, "launch_profile", None):
+        settings["launchProfile"] = args.launch_profile
+    if hasattr(args, "launch_profile"):
+        try:
+            profile = selected_profile(settings)
+        except ValueError as e:
+            print(str(e), file=sys.stderr)
+            return 2
+        if profile is not None:
+            args.browser = args.browser or profile.browser
+            args.option = args.option or profile.options
+    if args.command == "sequence":
+        return run_sequence(args, settings, logger)
+    if args.command == "run":
+        return run_script(args, settings, logger)
+    if args.command == "matrix":
+        return run_matrix(args, settings, logger)
+    if args.command == "load":
+        return run_load(args, settings, logger)
+    if args.command == "merge":
+        return merge_results(args, logger)
+    if args.command == "history":
+        return query_history(args)
+    if args.command == "artifacts":
+        return manage_artifacts(args, settings)
+    return 2
+
+
+if __name__ == '__main__':
+    sys.exit(main())
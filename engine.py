@@ -0,0 +1,894 @@
+import base64
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from functools import partial
+
+from artifacts import store_from_settings
+from launch import launch_profile, resolve_driver, selected_profile
+from runlog import new_run_id
+from scriptpool import compile_script, shared_pool
+
+CHROME_OPTIONS = {
+    "Headless Mode": "--headless",
+    "Disable GPU": "--disable-gpu",
+    "Incognito Mode": "--incognito",
+    "Disable Popup Blocking": "--disable-popup-blocking",
+    "Disable Infobars": "--disable-infobars",
+    "Disable Extensions": "--disable-extensions",
+    "Disable Dev Shm Usage": "--disable-dev-shm-usage",
+    "Ignore Certificate Errors": "--ignore-certificate-errors",
+    "Custom User Agent": "--user-agent",
+    "Disable JavaScript": "--disable-javascript",
+    "Disable Images": "--blink-settings=imagesEnabled=false",
+    "Enable Network Throttling": "--enable-network-throttling",
+    "Enable Performance Logging": "--enable-performance-logging",
+    "Enable GPU Hardware Acceleration": "--enable-gpu-rasterization",
+    "Remote Debugging Port": "--remote-debugging-port",
+    "Proxy Settings": "--proxy-server",
+    "Enable Automation": "--enable-automation",
+    "No Sandbox": "--no-sandbox",
+    "Disable Web Security": "--disable-web-security",
+    "Enable Experimental Features": "--enable-experimental-web-platform-features",
+    "Disable Password Manager": "--disable-password-manager-reauthentication",
+    "Disable Autofill": "--disable-autofill-keyboard-accessory-view",
+    "Disable Filesystem API": "--disable-filesystem",
+    "Disable Geolocation": "--disable-geolocation",
+}
+
+EDGE_OPTIONS = {
+    "Headless Mode": "headless",
+    "Disable GPU": "disable-gpu",
+    "InPrivate Mode": "InPrivate",
+    "Disable Popup Blocking": "disable-popup-blocking",
+    "Disable Extensions": "disable-extensions",
+    "Ignore Certificate Errors": "ignore-certificate-errors",
+    "Custom User Agent": "user-agent",
+    "Disable JavaScript": "disable-javascript",
+    "Disable Images": "disable-images",
+    "Enable Network Throttling": "enable-network-throttling",
+    "Enable Performance Logging": "enable-performance-logging",
+    "Enable GPU Hardware Acceleration": "enable-gpu-rasterization",
+    "Remote Debugging Port": "remote-debugging-port",
+    "Proxy Settings": "proxy-server",
+    "Enable Automation": "enable-automation",
+    "No Sandbox": "no-sandbox",
+    "Disable Web Security": "disable-web-security",
+    "Enable Experimental Features": "enable-experimental-web-platform-features",
+    "Disable Password Manager": "disable-password-manager",
+    "Disable Autofill": "disable-autofill",
+    "Disable Filesystem API": "disable-filesystem",
+    "Disable Geolocation": "disable-geolocation",
+}
+
+PAGE_LOAD_STRATEGIES = ["normal", "eager", "none"]
+
+# What a navigation waits for once the driver returns, beyond what the page load strategy already waited for.
+READY_CONDITIONS = ["Page Load Strategy", "DOMContentLoaded", "Network Idle", "Element Present"]
+
+# Counts finished resource requests; the network is idle once the count stops changing.
+NETWORK_ACTIVITY_SCRIPT = "return [document.readyState, performance.getEntriesByType('resource').length];"
+
+# Navigation Timing and Paint Timing of the current document, in milliseconds from navigation start.
+NAVIGATION_TIMING_SCRIPT = """
+const navigation = performance.getEntriesByType('navigation')[0];
+if (!navigation) { return null; }
+const paint = {};
+performance.getEntriesByType('paint').forEach(entry => { paint[entry.name] = entry.startTime; });
+const resources = performance.getEntriesByType('resource');
+const positive = value => value > 0 ? value : null;
+return {
+    timeToFirstByte: positive(navigation.responseStart - navigation.startTime),
+    firstPaint: paint['first-paint'] || null,
+    firstContentfulPaint: paint['first-contentful-paint'] || null,
+    domContentLoaded: positive(navigation.domContentLoadedEventEnd - navigation.startTime),
+    load: positive(navigation.loadEventEnd - navigation.startTime),
+    transferSize: resources.reduce((total, entry) => total + (entry.transferSize || 0), navigation.transferSize || 0),
+    requests: resources.length + 1
+};
+"""
+
+PERFORMANCE_LOGGING_OPTION = "Enable Performance Logging"
+
+# Values of selenium's By constants, so the mapping does not need selenium at import time.
+LOCATOR_STRATEGIES = {
+    'XPath': "xpath",
+    'CSS Selector': "css selector",
+    'ID': "id",
+    'Name': "name",
+    'Class Name': "class name",
+    'Tag Name': "tag name",
+    'Link Text': "link text",
+    'Partial Link Text': "partial link text",
+}
+
+
+# URL patterns for Network.setBlockedURLs, grouped by what they block. "*" matches any run of characters.
+# Resource types are matched by file extension, as the blocking list only sees URLs.
+BLOCKING_PRESETS = {
+    "Analytics": ["*google-analytics.com*", "*googletagmanager.com*", "*analytics.google.com*", "*segment.io*",
+                  "*segment.com/analytics*", "*hotjar.com*", "*mixpanel.com*", "*amplitude.com*", "*clarity.ms*",
+                  "*newrelic.com*", "*nr-data.net*", "*fullstory.com*"],
+    "Ads": ["*doubleclick.net*", "*googlesyndication.com*", "*googleadservices.com*", "*adservice.google.*",
+            "*amazon-adsystem.com*", "*adnxs.com*", "*criteo.com*", "*taboola.com*", "*outbrain.com*"],
+    "Third-Party Widgets": ["*connect.facebook.net*", "*platform.twitter.com*", "*intercom.io*", "*intercomcdn.com*",
+                            "*zdassets.com*", "*drift.com*", "*hubspot.com*", "*livechatinc.com*", "*tawk.to*",
+                            "*disqus.com*"],
+    "Fonts": ["*fonts.googleapis.com*", "*fonts.gstatic.com*", "*use.typekit.net*", "*.woff", "*.woff2", "*.ttf",
+              "*.otf", "*.eot"],
+    "Images": ["*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.avif", "*.svg", "*.ico", "*.bmp"],
+    "Media": ["*.mp4", "*.webm", "*.ogg", "*.mp3", "*.wav", "*.m4a", "*.m3u8", "*.mpd", "*youtube.com/embed*",
+              "*player.vimeo.com*"],
+    "Stylesheets": ["*.css"],
+}
+
+
+def blocked_url_patterns(*configs):
+    """
+    URL patterns to block from "blocking" settings objects ({"categories": [...], "patterns": [...]}), such as
+    the one in Preferences and the one in an .atm8 header. The rules of every config apply together.
+    """
+    patterns = []
+    for config in configs:
+        if not config:
+            continue
+        for category in config.get("categories", []):
+            patterns.extend(BLOCKING_PRESETS.get(category, []))
+        patterns.extend(pattern.strip() for pattern in config.get("patterns", []) if pattern.strip())
+    return list(dict.fromkeys(patterns))
+
+
+def engine_options(settings, header, options=()):
+    """
+    AutomationEngine keyword arguments for a file with the given .atm8 header, combined with the settings and the
+    checked browser options, or those of the selected launch profile when none are checked.
+    """
+    if not options:
+        profile = selected_profile(settings)
+        options = profile.options if profile is not None else ()
+    return {
+        "retry_policy": RetryPolicy.from_settings(settings.get("retries"), header.get("retries")),
+        "blocked_urls": blocked_url_patterns(settings.get("blocking"), header.get("blocking")),
+        "page_load_strategy": settings.get("pageLoadStrategy", "normal"),
+        "ready_when": settings.get("readyWhen", "Page Load Strategy"),
+        "ready_timeout": float(settings.get("readyTimeout", 30)),
+        "collect_metrics": PERFORMANCE_LOGGING_OPTION in options,
+        "capture_performance_log": PERFORMANCE_LOGGING_OPTION in options and settings.get("capturePerformanceLog",
+                                                                                          False),
+        "script_timeout": float(settings.get("scriptTimeout", 60)),
+        "script_workers": settings.get("scriptWorkers") or None,
+        "artifact_store": store_from_settings(settings),
+    }
+
+
+def parse_clip(text):
+    """
+    Parse a clip region "x, y, width, height" in CSS pixels of the page into four numbers.
+    """
+    try:
+        values = [float(value) for value in text.replace(" ", "").split(",")]
+    except ValueError:
+        values = []
+    if len(values) != 4 or min(values) < 0 or values[2] == 0 or values[3] == 0:
+        raise ValueError(f"Clip region must be 'x, y, width, height' with a positive size, not '{text}'")
+    return values
+
+
+def crop_png(png, left, top, width, height):
+    """
+    Crop PNG bytes to a rectangle in image pixels.
+    """
+    import cv2
+    import numpy
+
+    image = cv2.imdecode(numpy.frombuffer(png, numpy.uint8), cv2.IMREAD_COLOR)
+    left, top = int(left), int(top)
+    crop = image[top:top + int(height), left:left + int(width)]
+    if crop.size == 0:
+        raise ValueError("The clip region is outside the page")
+    ok, data = cv2.imencode(".png", crop)
+    if not ok:
+        raise ValueError("Could not encode the clipped screenshot")
+    return data.tobytes()
+
+
+def highlight_differences(reference, test):
+    """
+    Darken the test image and outline every region where it differs from the reference, in place.
+    """
+    import cv2
+
+    if reference.shape[:2] != test.shape[:2]:
+        raise ValueError(f"The reference image is {reference.shape[1]}x{reference.shape[0]} but the capture is "
+                         f"{test.shape[1]}x{test.shape[0]}")
+
+    difference = cv2.absdiff(reference, test)
+    gray = cv2.cvtColor(difference, cv2.COLOR_BGR2GRAY)
+
+    _, thresh = cv2.threshold(gray, 1, 255, cv2.THRESH_BINARY)
+    contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+    overlay = test.copy()
+    overlay[:] = (0, 0, 0)
+    cv2.addWeighted(overlay, 0.5, test, 0.5, 0, test)
+
+    for contour in contours:
+        x, y, w, h = cv2.boundingRect(contour)
+        cv2.rectangle(test, (x, y), (x + w, y + h), (0, 255, 0), 1)
+    return test
+
+
+class RetryPolicy:
+    """
+    How often a failed step is tried again, by action, and how long to wait between attempts.
+    The wait starts at backoff seconds and is multiplied by factor after each attempt, up to max_delay.
+    """
+
+    def __init__(self, retries=0, backoff=1.0, factor=2.0, max_delay=30.0, actions=None):
+        self.retries = int(retries)
+        self.backoff = float(backoff)
+        self.factor = float(factor)
+        self.maxDelay = float(max_delay)
+        self.actions = {action: int(count) for action, count in (actions or {}).items()}
+
+    @classmethod
+    def from_settings(cls, *configs):
+        """
+        Build a policy from "retries" settings objects ({"default", "backoff", "factor", "maxDelay", "actions"}).
+        Later configs, such as the one in an .atm8 header, override earlier ones key by key.
+        """
+        policy = {"actions": {}}
+        for config in configs:
+            if not config:
+                continue
+            for key in ("default", "backoff", "factor", "maxDelay"):
+                if key in config:
+                    policy[key] = config[key]
+            policy["actions"].update(config.get("actions", {}))
+        return cls(retries=policy.get("default", 0), backoff=policy.get("backoff", 1.0),
+                   factor=policy.get("factor", 2.0), max_delay=policy.get("maxDelay", 30.0),
+                   actions=policy["actions"])
+
+    def retriesFor(self, action):
+        return self.actions.get(action, self.retries)
+
+    def delay(self, attempt):
+        return min(self.maxDelay, self.backoff * self.factor ** (attempt - 1))
+
+
+def browser_options(browser_type, options, page_load_strategy="normal"):
+    """
+    Selenium options object for a browser with the checked browser options, for a local or a remote session.
+    """
+    from selenium.webdriver.chrome.options import Options
+    from selenium.webdriver.edge.options import Options as EdgeOptions
+
+    if browser_type == "Chrome":
+        chrome_options = Options()
+        for option in options:
+            selenium_option = CHROME_OPTIONS.get(option)
+            if selenium_option:
+                chrome_options.add_argument(selenium_option)
+        chrome_options.page_load_strategy = page_load_strategy
+        if PERFORMANCE_LOGGING_OPTION in options:
+            chrome_options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+        return chrome_options
+    elif browser_type == "Edge":
+        edge_options = EdgeOptions()
+        for option in options:
+            selenium_option = EDGE_OPTIONS.get(option)
+            if selenium_option:
+                edge_options.add_argument(selenium_option)
+        edge_options.page_load_strategy = page_load_strategy
+        if PERFORMANCE_LOGGING_OPTION in options:
+            edge_options.set_capability("ms:loggingPrefs", {"performance": "ALL"})
+        return edge_options
+    # Add support for other browsers here
+    else:
+        raise ValueError("Unsupported browser type")
+
+
+# (browser, driver, binary, options, page load strategy) -> (driver path, Selenium options), resolved on the first
+# launch and reused by every later one in the process.
+_launch_cache = {}
+_launch_lock = threading.Lock()
+
+
+def launch_objects(profile, page_load_strategy="normal"):
+    """
+    The resolved driver path and the Selenium options object of a launch profile, built once per process.
+    """
+    key = profile.key + (page_load_strategy,)
+    with _launch_lock:
+        if key not in _launch_cache:
+            selenium_options = browser_options(profile.browser, profile.options, page_load_strategy)
+            if profile.binary:
+                if not os.path.isfile(profile.binary):
+                    raise ValueError(f"Invalid {profile.browser} binary location: {profile.binary}")
+                selenium_options.binary_location = profile.binary
+            _launch_cache[key] = (resolve_driver(profile.browser, profile.driverPath), selenium_options)
+        return _launch_cache[key]
+
+
+def create_driver(profile, logger, page_load_strategy="normal"):
+    from selenium import webdriver
+    from selenium.webdriver.chrome.service import Service
+    from selenium.webdriver.edge.service import Service as EdgeService
+
+    driver_path, selenium_options = launch_objects(profile, page_load_strategy)
+    # A Service owns the driver process of one session, so each launch gets a new one. Given the driver path,
+    # Selenium starts that driver and never asks Selenium Manager to find or download one.
+    if profile.browser == "Chrome":
+        logger.info("Starting Chrome browser with WebDriver at: " + driver_path)
+        driver = webdriver.Chrome(options=selenium_options, service=Service(driver_path))
+    else:
+        logger.info("Starting Edge browser with WebDriver at: " + driver_path)
+        driver = webdriver.Edge(options=selenium_options, service=EdgeService(driver_path))
+    if profile.windowSize:
+        driver.set_window_size(*profile.windowSize)
+    return driver
+
+
+def create_remote_driver(node_pool, browser_type, options, logger, page_load_strategy="normal", window_size=None,
+                         capabilities=None):
+    """
+    Start a session on the node of the pool with the most free capacity, waiting for a slot if all are busy.
+    The slot is given back when the session quits.
+    """
+    from selenium import webdriver
+
+    selenium_options = browser_options(browser_type, options, page_load_strategy)
+    for name, value in (capabilities or {}).items():
+        selenium_options.set_capability(name, value)
+    lease = node_pool.acquire(browser_type)
+    try:
+        logger.info(f"Starting {browser_type} browser on remote WebDriver at: {lease.url}")
+        driver = webdriver.Remote(command_executor=lease.url, options=selenium_options)
+    except Exception:
+        lease.release()
+        raise
+    quit_session = driver.quit
+
+    def quit_and_release():
+        try:
+            quit_session()
+        finally:
+            lease.release()
+
+    # Every runner ends its sessions with quit(), so that is where the slot goes back to the pool.
+    driver.quit = quit_and_release
+    try:
+        if window_size:
+            driver.set_window_size(*window_size)
+    except Exception:
+        driver.quit()
+        raise
+    return driver
+
+
+def session_factory(settings, browser_type, options, logger, window_size=None, node_pool=None):
+    """
+    Callable starting a browser session as configured in settings: on the node pool when one is given, else a
+    local browser through the driver of its launch profile. The callable may be used from worker threads.
+    """
+    if node_pool is not None:
+        return partial(create_remote_driver, node_pool, browser_type, list(options), logger,
+                       settings.get("pageLoadStrategy", "normal"), window_size, settings.get("remoteCapabilities"))
+    return partial(create_driver, launch_profile(settings, browser_type, options, window_size), logger,
+                   settings.get("pageLoadStrategy", "normal"))
+
+
+def run_sync(coroutine):
+    """
+    Result of a coroutine that never suspends, as the steps of AutomationEngine are, without an event loop.
+    """
+    try:
+        coroutine.send(None)
+    except StopIteration as stop:
+        return stop.value
+    coroutine.close()
+    raise RuntimeError("A step of the threaded engine tried to suspend")
+
+
+class AutomationEngine:
+    """
+    Executes steps against one WebDriver session without touching the GUI, so several engines can run at once.
+    """
+
+    def __init__(self, driver, logger, save_path=None, test_name="", open_photo=False, retry_policy=None,
+                 blocked_urls=None, page_load_strategy="normal", ready_when="Page Load Strategy", ready_timeout=30.0,
+                 collect_metrics=False, capture_performance_log=False, script_timeout=60.0, script_workers=None,
+                 artifact_store=None, on_wait=None):
+        self.driver = driver
+        self.logger = logger
+        self.savePath = save_path
+        self.testName = test_name
+        self.openPhoto = open_photo
+        self.retryPolicy = retry_policy or RetryPolicy()
+        self.blockedUrls = blocked_urls or []
+        # The strategy the session was started with; a navigate step can only wait longer than it does.
+        self.pageLoadStrategy = page_load_strategy
+        self.readyWhen = ready_when
+        self.readyTimeout = ready_timeout
+        self.networkIdleTime = 0.5
+        self.collectMetrics = collect_metrics
+        self.capturePerformanceLog = capture_performance_log
+        # Extra values the current step attaches to its result, such as performance metrics.
+        self.stepDetails = {}
+        self.previousStepDuration = None
+        # Shared by every Execute Python Script step of the run, so scripts can keep state between steps.
+        self.variables = {}
+        self.scriptNamespace = {"__name__": "__atom8_script__", "__builtins__": __builtins__, "driver": driver,
+                                "logger": logger, "variables": self.variables}
+        self.scriptTimeout = script_timeout
+        self.scriptWorkers = script_workers
+        # Called while waiting for a script in a worker process, e.g. to keep a GUI responsive.
+        self.onWait = on_wait
+        self.backgroundScripts = []
+        # With a store, screenshots are kept once per distinct image and listed in a manifest for the run.
+        self.artifactStore = artifact_store
+        self.artifacts = []
+        self.stepIndex = None
+        self.runResults = []
+        self.outputFileName = None
+
+    def run(self, steps, on_step=None):
+        """
+        Run every step and return (step, status, details) for each, where details holds the number of attempts and
+        anything else the step recorded, such as the metrics of a navigation.
+        """
+        return run_sync(self.runSteps(steps, on_step))
+
+    async def runSteps(self, steps, on_step=None):
+        await self.applyRequestBlocking()
+        if self.collectMetrics and self.hasCdp():
+            await self.cdp("Performance.enable", {})
+        results = self.runResults = []
+        self.artifacts = []
+        for index, step in enumerate(steps):
+            action = step[0]
+            self.stepIndex = index
+            if on_step:
+                on_step(index, step)
+            try:
+                self.stepDetails = {}
+                started = time.monotonic()
+                status, attempts = await self.runWithRetries(step)
+                duration = (time.monotonic() - started) * 1000
+                results.append((step, status, dict(self.stepDetails, attempts=attempts, duration=duration)))
+                self.previousStepDuration = duration
+            except Exception as e:
+                self.logger.error(f"Error in {action}: {e}")
+        await self.joinBackgroundScripts()
+        await self.offload(self.writeManifest)
+        return results
+
+    # I/O primitives. Steps only reach the browser, sleep or block through these, so AsyncAutomationEngine runs the
+    # same steps by overriding them. Here they never suspend, which is what lets run() drive the steps directly.
+
+    def hasCdp(self):
+        return hasattr(self.driver, "execute_cdp_cmd")
+
+    async def cdp(self, cmd, params):
+        return self.driver.execute_cdp_cmd(cmd, params)
+
+    async def get(self, url):
+        self.driver.get(url)
+
+    async def executeScript(self, script, *args):
+        return self.driver.execute_script(script, *args)
+
+    async def findElement(self, locator_type, value):
+        return self.driver.find_element(LOCATOR_STRATEGIES[locator_type], value)
+
+    async def findElements(self, locator_type, value):
+        return self.driver.find_elements(LOCATOR_STRATEGIES[locator_type], value)
+
+    async def click(self, element):
+        element.click()
+
+    async def sendKeys(self, element, text):
+        element.send_keys(text)
+
+    async def screenshot(self, element=None):
+        return element.screenshot_as_png if element is not None else self.driver.get_screenshot_as_png()
+
+    async def maximizeWindow(self):
+        self.driver.maximize_window()
+
+    async def performanceLog(self):
+        return self.driver.get_log("performance")
+
+    async def sleep(self, seconds):
+        time.sleep(seconds)
+
+    async def offload(self, function, *args):
+        # Runs file and image work that does not touch the browser.
+        return function(*args)
+
+    async def pollScript(self, pending):
+        if self.onWait:
+            self.onWait()
+        pending.wait(0.1)
+
+    def writeManifest(self):
+        if self.artifactStore is not None and self.artifacts:
+            run_id = f"{datetime.now().strftime('%Y%m%d-%H%M%S')}_{new_run_id()}"
+            manifest = self.artifactStore.writeManifest(run_id, self.testName, self.artifacts)
+            self.logger.info(f"{len(self.artifacts)} images of this run are listed in {manifest}")
+
+    def storeImage(self, png, name, kind):
+        key = self.artifactStore.put(png)
+        self.artifacts.append({"name": name, "key": key, "kind": kind, "step": self.stepIndex})
+        self.stepDetails.setdefault("artifacts", []).append(key)
+        return key
+
+    async def applyRequestBlocking(self):
+        # Chrome and Edge only. The list is set even when empty, so a session shared by several files does not
+        # keep the rules of the previous file.
+        if not self.hasCdp():
+            if self.blockedUrls:
+                self.logger.warning("Request blocking needs Chrome or Edge; no requests will be blocked.")
+            return
+        await self.cdp("Network.enable", {})
+        await self.cdp("Network.setBlockedURLs", {"urls": self.blockedUrls})
+        if self.blockedUrls:
+            self.logger.info(f"Blocking requests matching {len(self.blockedUrls)} URL patterns.")
+
+    async def runWithRetries(self, step):
+        action = step[0]
+        retries = self.retryPolicy.retriesFor(action)
+        attempts = 1
+        status = await self.runStep(step)
+        while status == 'Failed' and attempts <= retries:
+            delay = self.retryPolicy.delay(attempts)
+            self.logger.warning(f"{action} failed; retry {attempts} of {retries} in {delay:g} seconds.")
+            await self.sleep(delay)
+            attempts += 1
+            status = await self.runStep(step)
+        if attempts > 1:
+            self.logger.info(f"{action} {status.lower()} after {attempts - 1} retries.")
+        return status, attempts
+
+    async def runStep(self, step):
+        # STEP
+        action = step[0]
+        if action not in STEP_HANDLERS:
+            raise ValueError(f"Unsupported action: {action}")
+        handler, failure = STEP_HANDLERS[action]
+        try:
+            return await handler(self, step)
+        except Exception as e:
+            self.logger.error(f"{failure.format(action=action)}: {e}")
+            return 'Failed'
+
+    async def stepNavigate(self, step):
+        await self.navigate(step)
+        return 'Passed'
+
+    async def stepElement(self, step):
+        action, locator_type, locator_value = step[:3]
+        element = await self.findElement(locator_type, locator_value)
+        if action == 'Click Element':
+            await self.click(element)
+        else:
+            await self.sendKeys(element, step[3])
+        self.logger.info(f"{action} at {locator_type}: {locator_value}")
+        return 'Passed'
+
+    async def stepScreenshot(self, step):
+        png = await self.captureImage(*step[2:4])
+        if self.artifactStore is not None:
+            key = await self.offload(self.storeImage, png, step[1], "screenshot")
+            self.logger.info(f"Screenshot {step[1]} stored as {key[:12]}")
+            return 'Passed'
+        screenshot_filename = await self.offload(self.saveScreenshot, png, step[1])
+        self.logger.info(f"Screenshot saved as {screenshot_filename}")
+        return 'Passed'
+
+    def saveScreenshot(self, png, name):
+        if not os.path.isdir(self.savePath):
+            os.makedirs(self.savePath)
+        screenshot_filename = os.path.join(self.savePath, name)
+        with open(screenshot_filename, "wb") as file:
+            file.write(png)
+        return screenshot_filename
+
+    async def stepJavaScript(self, step):
+        await self.executeScript(step[1])
+        self.logger.info(f"Executed JavaScript: {step[1]}")
+        return 'Passed'
+
+    async def stepSleep(self, step):
+        await self.sleep(float(step[1]))
+        self.logger.info(f"Slept for {step[1]} seconds.")
+        return 'Passed'
+
+    async def stepMaximize(self, step):
+        await self.maximizeWindow()
+        self.logger.info("Maximized window.")
+        return 'Passed'
+
+    async def stepPythonScript(self, step):
+        await self.runScript(step)
+        self.logger.info(f"Executed Python script: {step[1]}")
+        return 'Passed'
+
+    async def stepCompareImages(self, step):
+        self.logger.info(f"Comparing images: {step[1]} and {step[2]}.")
+        if await self.compareImages(step[1], step[2], step[3], *step[4:6]):
+            if self.openPhoto:
+                self.logger.info(f"Opening photo: {step[3]}")
+                os.startfile(self.outputFileName)
+        return 'Passed'
+
+    async def stepBudget(self, step):
+        return await self.assertBudget(step[0], float(step[1]))
+
+    async def runScript(self, step):
+        # Optional fields: where to run, the timeout in seconds and the variable that receives the result.
+        mode = step[3] if len(step) > 3 and step[3] else "In Process"
+        timeout = float(step[4]) if len(step) > 4 and step[4] else self.scriptTimeout
+        resultName = step[5] if len(step) > 5 else ""
+
+        # Scripts see the variables left by every script before them, including ones still running in background.
+        await self.joinBackgroundScripts()
+        if mode == "In Process":
+            self.scriptNamespace.update(__file__=step[1], step=step, result=None)
+            await self.offload(exec, compile_script(step[1]), self.scriptNamespace)
+            if resultName:
+                self.variables[resultName] = self.scriptNamespace["result"]
+            return
+
+        generation, pending = shared_pool(self.scriptWorkers).submit(step[1], step, self.variables)
+        script = {"step": step, "pending": pending, "generation": generation, "resultName": resultName,
+                  "deadline": time.monotonic() + timeout, "timeout": timeout}
+        if mode == "Background":
+            # The step's result is filled in once the script finishes; runResults gets it at this index next.
+            script["index"] = len(self.runResults)
+            self.backgroundScripts.append(script)
+            self.stepDetails["background"] = True
+            self.logger.info(f"Started {step[1]} in the background.")
+        else:
+            await self.finishScript(script)
+
+    async def finishScript(self, script):
+        """
+        Wait for a script running in a worker process and apply its outcome. Raises when it failed or timed out.
+        """
+        pool = shared_pool(self.scriptWorkers)
+        path = script["step"][1]
+        while not script["pending"].ready():
+            if pool.generation != script["generation"]:
+                raise RuntimeError(f"{path} was stopped because another script timed out")
+            if time.monotonic() > script["deadline"]:
+                pool.restart()
+                raise TimeoutError(f"{path} did not finish within {script['timeout']:g} seconds")
+            await self.pollScript(script["pending"])
+        self.applyScriptOutcome(script, script["pending"].get())
+
+    def applyScriptOutcome(self, script, outcome):
+        path = script["step"][1]
+        for stream in ("stdout", "stderr"):
+            if outcome[stream]:
+                self.stepDetails[stream] = outcome[stream]
+                log = self.logger.info if stream == "stdout" else self.logger.warning
+                for line in outcome[stream].rstrip().splitlines():
+                    log(f"[{os.path.basename(path)}] {line}")
+        if outcome["error"]:
+            raise RuntimeError(outcome["error"].rstrip().splitlines()[-1])
+        self.variables.update(outcome["variables"])
+        if script["resultName"]:
+            self.variables[script["resultName"]] = outcome["result"]
+
+    async def joinBackgroundScripts(self):
+        scripts, self.backgroundScripts = self.backgroundScripts, []
+        for script in scripts:
+            step, _, details = self.runResults[script["index"]]
+            stepDetails, self.stepDetails = self.stepDetails, {}
+            try:
+                await self.finishScript(script)
+                status = 'Passed'
+                self.logger.info(f"Background script {step[1]} finished.")
+            except Exception as e:
+                status = 'Failed'
+                self.logger.error(f"Error in background script {step[1]}: {e}")
+            finally:
+                details = dict(details, **self.stepDetails)
+                self.stepDetails = stepDetails
+            self.runResults[script["index"]] = (step, status, details)
+
+    async def assertBudget(self, action, budget):
+        if action == 'Assert Page Load Under':
+            measured, unit = await self.navigationTiming("load"), "ms"
+        elif action == 'Assert Step Duration Under':
+            if self.previousStepDuration is None:
+                raise ValueError("There is no previous step to measure")
+            measured, unit = self.previousStepDuration, "ms"
+        else:
+            measured, unit = await self.navigationTiming("transferSize") / 1024, "KB"
+        return self.checkBudget(action, budget, measured, unit)
+
+    def checkBudget(self, action, budget, measured, unit):
+        passed = measured <= budget
+        self.stepDetails["budget"] = {"measured": measured, "budget": budget, "unit": unit}
+        log = self.logger.info if passed else self.logger.error
+        log(f"{action}: measured {measured:.0f} {unit} against a budget of {budget:g} {unit}.")
+        return 'Passed' if passed else 'Failed'
+
+    async def navigationTiming(self, key):
+        # The load time is only known once the load event has finished, which may be later than the navigation
+        # returned under the eager or none page load strategies.
+        timing = {}
+
+        async def measured():
+            timing.update(await self.executeScript(NAVIGATION_TIMING_SCRIPT) or {})
+            return timing.get(key) is not None
+
+        await self.waitFor(measured, f"the page's {key} timing")
+        return timing[key]
+
+    async def stateIs(self, *states):
+        return await self.executeScript("return document.readyState;") in states
+
+    async def navigate(self, step):
+        # Optional fields: page load strategy, ready condition and, for 'Element Present', its locator.
+        strategy = step[3] if len(step) > 3 and step[3] else self.pageLoadStrategy
+        readyWhen = step[4] if len(step) > 4 and step[4] else self.readyWhen
+        started = time.monotonic()
+        await self.get(step[1])
+
+        if PAGE_LOAD_STRATEGIES.index(strategy) > PAGE_LOAD_STRATEGIES.index(self.pageLoadStrategy):
+            self.logger.warning(f"The session waits for '{self.pageLoadStrategy}' page loads, so the step's "
+                                f"'{strategy}' strategy cannot return sooner; set the run's strategy to 'none' "
+                                f"to let steps choose.")
+        elif strategy == "normal":
+            await self.waitFor(lambda: self.stateIs("complete"), "the page to load")
+        elif strategy == "eager":
+            await self.waitFor(lambda: self.stateIs("interactive", "complete"), "DOMContentLoaded")
+
+        if readyWhen == "DOMContentLoaded":
+            await self.waitFor(lambda: self.stateIs("interactive", "complete"), "DOMContentLoaded")
+        elif readyWhen == "Network Idle":
+            await self.waitForNetworkIdle()
+        elif readyWhen == "Element Present":
+            await self.waitFor(lambda: self.findElements(step[5], step[6]), f"{step[5]}: {step[6]}")
+        elif readyWhen != "Page Load Strategy":
+            raise ValueError(f"Unknown ready condition: {readyWhen}")
+        self.logger.info(f"Navigated to {step[1]} ({strategy}, ready on {readyWhen}) in "
+                         f"{time.monotonic() - started:.2f} seconds.")
+        if self.collectMetrics:
+            try:
+                self.stepDetails["metrics"] = await self.performanceMetrics()
+            except Exception as e:
+                self.logger.warning(f"Could not collect performance metrics: {e}")
+
+    async def captureImage(self, scope_type="", scope=""):
+        """
+        PNG of the viewport, of one element (scope_type is its locator type) or of a clip region of the page
+        (scope_type 'Clip', scope "x, y, width, height").
+        """
+        if not scope_type:
+            return await self.screenshot()
+        if scope_type != 'Clip':
+            return await self.screenshot(await self.findElement(scope_type, scope))
+        x, y, width, height = parse_clip(scope)
+        if self.hasCdp():
+            # Chrome and Edge encode only the clipped pixels, wherever they are on the page.
+            capture = await self.cdp("Page.captureScreenshot", {
+                "format": "png", "captureBeyondViewport": True,
+                "clip": {"x": x, "y": y, "width": width, "height": height, "scale": 1}})
+            return base64.b64decode(capture["data"])
+        return await self.cropViewport(x, y, width, height)
+
+    async def cropViewport(self, x, y, width, height):
+        # Other browsers only capture the viewport; the clip is moved into it and cropped out.
+        await self.executeScript("window.scrollTo(arguments[0], arguments[1]);", x, y)
+        offset_x, offset_y, ratio = await self.executeScript(
+            "return [window.scrollX, window.scrollY, window.devicePixelRatio || 1];")
+        return await self.offload(crop_png, await self.screenshot(), (x - offset_x) * ratio, (y - offset_y) * ratio,
+                                  width * ratio, height * ratio)
+
+    async def performanceMetrics(self):
+        metrics = await self.executeScript(NAVIGATION_TIMING_SCRIPT) or {}
+        if self.hasCdp():
+            result = await self.cdp("Performance.getMetrics", {})
+            metrics["cdp"] = {metric["name"]: metric["value"] for metric in result.get("metrics", [])}
+        if self.capturePerformanceLog:
+            metrics["log"] = [json.loads(entry["message"])["message"] for entry in await self.performanceLog()]
+        return metrics
+
+    async def waitFor(self, condition, description):
+        # condition is a coroutine function, so it can use the primitives.
+        deadline = time.monotonic() + self.readyTimeout
+        while not await condition():
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Timed out after {self.readyTimeout:g} seconds waiting for {description}")
+            await self.sleep(0.1)
+
+    async def waitForNetworkIdle(self):
+        deadline = time.monotonic() + self.readyTimeout
+        last, quietSince = None, time.monotonic()
+        while True:
+            readyState, finished = await self.executeScript(NETWORK_ACTIVITY_SCRIPT)
+            now = time.monotonic()
+            if finished != last or readyState == "loading":
+                last, quietSince = finished, now
+            elif now - quietSince >= self.networkIdleTime:
+                return
+            if now > deadline:
+                raise TimeoutError(f"Timed out after {self.readyTimeout:g} seconds waiting for the network to idle")
+            await self.sleep(0.1)
+
+    async def compareImages(self, reference_path, test_path, output_path, scope_type="", scope=""):
+        png = await self.captureImage(scope_type, scope)
+        return await self.offload(self.compareCapturedImages, reference_path, test_path, output_path, png)
+
+    def compareCapturedImages(self, reference_path, test_path, output_path, png):
+        # Only reads and writes images, so it is offloaded.
+        import cv2
+
+        if self.artifactStore is not None:
+            return self.compareStoredImages(reference_path, test_path, output_path, png)
+
+        screenshot_folder = f"{self.savePath}/{self.testName}"
+        if not os.path.isdir(screenshot_folder):
+            os.makedirs(screenshot_folder)
+
+        test_filename = os.path.join(screenshot_folder,
+                                     f"{os.path.basename(test_path)}_{datetime.now().strftime('%Y.%m.%d %H-%M-%S')}.png" if not test_path.endswith(
+                                         ".png") else os.path.basename(test_path))
+        with open(test_filename, "wb") as file:
+            file.write(png)
+        self.logger.info(f"[Compare Images] -> Test screenshot saved as {test_filename}")
+
+        reference = cv2.imread(reference_path)
+        test = highlight_differences(reference, cv2.imread(test_filename))
+
+        output_filename = os.path.join(screenshot_folder,
+                                       f"{os.path.basename(output_path)}_{datetime.now().strftime('%Y.%m.%d %H-%M-%S')}.png" if not output_path.endswith(
+                                           ".png") else os.path.basename(output_path))
+        cv2.imwrite(output_filename, test)
+        self.outputFileName = output_filename
+        self.logger.info(f"[Compare Images] -> Output image saved as {output_filename}")
+
+        return output_filename
+
+    def compareStoredImages(self, reference_path, test_path, output_path, png):
+        # The reference may be a file, a stored image key or 'baseline:<name>'; both results go into the store.
+        import cv2
+        import numpy
+
+        test_key = self.storeImage(png, test_path, "compare-test")
+        self.logger.info(f"[Compare Images] -> Test screenshot stored as {test_key[:12]}")
+
+        reference = cv2.imread(self.artifactStore.resolve(reference_path))
+        if reference is None:
+            raise FileNotFoundError(f"Cannot read reference image {reference_path}")
+        test = cv2.imdecode(numpy.frombuffer(png, numpy.uint8), cv2.IMREAD_COLOR)
+        ok, output = cv2.imencode(".png", highlight_differences(reference, test))
+        if not ok:
+            raise ValueError("Could not encode the comparison image")
+        output_key = self.storeImage(output.tobytes(), output_path, "compare-output")
+        self.outputFileName = self.artifactStore.find(output_key)
+        self.logger.info(f"[Compare Images] -> Output image stored as {output_key[:12]}")
+        return self.outputFileName
+
+
+# Handler of each action and the message logged when it fails, shared by both engines.
+STEP_HANDLERS = {
+    'Navigate to URL': (AutomationEngine.stepNavigate, "Error while navigating to URL"),
+    'Click Element': (AutomationEngine.stepElement, "Error while performing {action}"),
+    'Input Text': (AutomationEngine.stepElement, "Error while performing {action}"),
+    'Take Screenshot': (AutomationEngine.stepScreenshot, "Error while taking screenshot"),
+    'Execute JavaScript': (AutomationEngine.stepJavaScript, "Error in JavaScript"),
+    'Sleep': (AutomationEngine.stepSleep, "Error while sleeping"),
+    'Maximize Window': (AutomationEngine.stepMaximize, "Error while maximizing window"),
+    'Execute Python Script': (AutomationEngine.stepPythonScript, "Error in Python script"),
+    'Compare Images': (AutomationEngine.stepCompareImages, "Error in {action}"),
+    'Assert Page Load Under': (AutomationEngine.stepBudget, "Error in {action}"),
+    'Assert Step Duration Under': (AutomationEngine.stepBudget, "Error in {action}"),
+    'Assert Transfer Size Under': (AutomationEngine.stepBudget, "Error in {action}"),
+}
@@ -0,0 +1,265 @@
+import hashlib
+import json
+import math
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+from settings import app_data_path
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    run_id TEXT,
+    started TEXT NOT NULL,
+    file TEXT NOT NULL,
+    browser TEXT,
+    options TEXT,
+    status TEXT NOT NULL,
+    duration REAL,
+    fingerprint TEXT
+);
+CREATE TABLE IF NOT EXISTS steps (
+    run INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    action TEXT NOT NULL,
+    step TEXT NOT NULL,
+    status TEXT NOT NULL,
+    duration REAL,
+    attempts INTEGER,
+    PRIMARY KEY (run, position)
+);
+CREATE INDEX IF NOT EXISTS runs_file ON runs(file, id);
+CREATE INDEX IF NOT EXISTS runs_started ON runs(started);
+CREATE INDEX IF NOT EXISTS runs_fingerprint ON runs(file, fingerprint, id);
+CREATE INDEX IF NOT EXISTS steps_step ON steps(step, status, run);
+CREATE INDEX IF NOT EXISTS steps_duration ON steps(duration);
+"""
+
+
+# A file is flaky when its result flips between Passed and Failed in at least this share of consecutive runs
+# of the same content, over at least FLAKY_MIN_RUNS runs.
+FLAKY_THRESHOLD = 0.2
+FLAKY_MIN_RUNS = 5
+
+
+def history_path():
+    return app_data_path('history.db')
+
+
+def history_key(file):
+    """
+    The key runs of a file are stored under: its absolute path, however the GUI, a sequence or the command line
+    named it. None (no file filter) stays None.
+    """
+    return None if file is None else os.path.abspath(os.path.expanduser(file))
+
+
+def file_fingerprint(path):
+    """
+    Content hash of a test file, so runs of an edited file are not compared with runs of its earlier versions.
+    """
+    digest = hashlib.sha1()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(64 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def flip_score(statuses):
+    """
+    Share of consecutive results that flip between Passed and Failed, from 0 (stable) to 1 (alternating).
+    """
+    outcomes = [status for status in statuses if status in ('Passed', 'Failed')]
+    if len(outcomes) < 2:
+        return 0.0
+    flips = sum(1 for previous, current in zip(outcomes, outcomes[1:]) if previous != current)
+    return flips / (len(outcomes) - 1)
+
+
+def percentile(values, fraction):
+    """
+    Nearest-rank percentile of a list of numbers, e.g. percentile(durations, 0.95).
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+class RunHistory:
+    """
+    SQLite store of every run: one row per file run in runs, one row per step result in steps.
+    Steps are identified across runs by their JSON form, so an edited step starts a new history.
+    Durations are in seconds for runs and milliseconds for steps, as the engine reports them.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or history_path()
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        # Sequencer runs are recorded from the thread that finished them, so the connection is shared under a lock.
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(self.path, check_same_thread=False)
+        self.connection.row_factory = sqlite3.Row
+        with self.connection:
+            self.connection.execute("PRAGMA foreign_keys = ON")
+            if self.path != ":memory:":
+                self.connection.execute("PRAGMA journal_mode = WAL")
+            columns = [row[1] for row in self.connection.execute("PRAGMA table_info(runs)")]
+            if columns and "fingerprint" not in columns:
+                self.connection.execute("ALTER TABLE runs ADD COLUMN fingerprint TEXT")
+            self.connection.executescript(SCHEMA)
+
+    def recordRun(self, file, results, status=None, browser=None, options=(), duration=None, run_id=None,
+                  fingerprint=None):
+        """
+        Store the (step, status, details) results of one file run; returns the new run's row id.
+        The fingerprint defaults to the hash of the file when file is a path that exists.
+        """
+        file = history_key(file)
+        if status is None:
+            status = 'Passed' if all(result[1] == 'Passed' for result in results) else 'Failed'
+        if fingerprint is None and os.path.isfile(file):
+            fingerprint = file_fingerprint(file)
+        with self.lock, self.connection:
+            cursor = self.connection.execute(
+                "INSERT INTO runs (run_id, started, file, browser, options, status, duration, fingerprint) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (run_id, datetime.now().isoformat(timespec="seconds"), file, browser, json.dumps(list(options)),
+                 status, duration, fingerprint))
+            run = cursor.lastrowid
+            self.connection.executemany(
+                "INSERT INTO steps (run, position, action, step, status, duration, attempts) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                ((run, position, step[0], json.dumps(list(step)), step_status,
+                  (rest[0] if rest else {}).get("duration"), (rest[0] if rest else {}).get("attempts"))
+                 for position, (step, step_status, *rest) in enumerate(results)))
+        return run
+
+    def _query(self, sql, parameters=()):
+        with self.lock:
+            return [dict(row) for row in self.connection.execute(sql, parameters)]
+
+    def runs(self, file=None, limit=50):
+        if file:
+            return self._query("SELECT * FROM runs WHERE file = ? ORDER BY id DESC LIMIT ?",
+                               (history_key(file), limit))
+        return self._query("SELECT * FROM runs ORDER BY id DESC LIMIT ?", (limit,))
+
+    def files(self):
+        return [row["file"] for row in self._query("SELECT DISTINCT file FROM runs ORDER BY file")]
+
+    def _recentRuns(self, file, runs):
+        # Row id bounds of the last `runs` runs, optionally of one file.
+        file = history_key(file)
+        rows = self._query("SELECT id FROM runs WHERE (? IS NULL OR file = ?) ORDER BY id DESC LIMIT ?",
+                           (file, file, runs))
+        return (rows[-1]["id"], rows[0]["id"]) if rows else (0, -1)
+
+    def slowestSteps(self, file=None, runs=20, limit=10):
+        """
+        Steps with the highest mean duration over the last `runs` runs.
+        """
+        file = history_key(file)
+        first, last = self._recentRuns(file, runs)
+        return self._query(
+            "SELECT runs.file, steps.step, COUNT(*) AS runs, AVG(steps.duration) AS mean, "
+            "MAX(steps.duration) AS slowest, SUM(steps.duration) AS total "
+            "FROM steps JOIN runs ON runs.id = steps.run "
+            "WHERE steps.run BETWEEN ? AND ? AND (? IS NULL OR runs.file = ?) AND steps.duration IS NOT NULL "
+            "GROUP BY runs.file, steps.step ORDER BY mean DESC LIMIT ?",
+            (first, last, file, file, limit))
+
+    def stepPercentiles(self, file=None, runs=20, fraction=0.95):
+        """
+        Median and `fraction` percentile duration of each step over the last `runs` runs, slowest first.
+        """
+        file = history_key(file)
+        first, last = self._recentRuns(file, runs)
+        durations = {}
+        for row in self._query(
+                "SELECT runs.file, steps.step, steps.duration FROM steps JOIN runs ON runs.id = steps.run "
+                "WHERE steps.run BETWEEN ? AND ? AND (? IS NULL OR runs.file = ?) AND steps.duration IS NOT NULL",
+                (first, last, file, file)):
+            durations.setdefault((row["file"], row["step"]), []).append(row["duration"])
+        rows = [{"file": key[0], "step": key[1], "runs": len(values), "median": percentile(values, 0.5),
+                 "percentile": percentile(values, fraction)} for key, values in durations.items()]
+        return sorted(rows, key=lambda row: row["percentile"], reverse=True)
+
+    def firstFailures(self, file=None):
+        """
+        Steps failing in their most recent run, each with the run where the current streak of failures began.
+        """
+        file = history_key(file)
+        return self._query(
+            "WITH scoped AS (SELECT runs.file, steps.step, steps.run, steps.status, runs.started "
+            "                FROM steps JOIN runs ON runs.id = steps.run WHERE ? IS NULL OR runs.file = ?), "
+            "latest AS (SELECT file, step, MAX(run) AS run FROM scoped GROUP BY file, step), "
+            "passed AS (SELECT file, step, MAX(run) AS run FROM scoped WHERE status = 'Passed' GROUP BY file, step) "
+            "SELECT scoped.file, scoped.step, MIN(scoped.run) AS run, MIN(scoped.started) AS since, "
+            "COUNT(*) AS failures "
+            "FROM latest "
+            "JOIN scoped AS last ON last.file = latest.file AND last.step = latest.step AND last.run = latest.run "
+            "JOIN scoped ON scoped.file = latest.file AND scoped.step = latest.step "
+            "LEFT JOIN passed ON passed.file = latest.file AND passed.step = latest.step "
+            "WHERE last.status = 'Failed' AND scoped.run > COALESCE(passed.run, 0) "
+            "GROUP BY scoped.file, scoped.step ORDER BY since",
+            (file, file))
+
+    def _latestVersionRuns(self, file, runs):
+        # Runs of the file's current content, oldest first; runs recorded without a fingerprint count as one version.
+        file = history_key(file)
+        return list(reversed(self._query(
+            "SELECT id, status FROM runs WHERE file = ? AND fingerprint IS (SELECT fingerprint FROM runs "
+            "WHERE file = ? ORDER BY id DESC LIMIT 1) AND status IN ('Passed', 'Failed') ORDER BY id DESC LIMIT ?",
+            (file, file, runs))))
+
+    def fileFlakiness(self, files=None, runs=20):
+        """
+        Flip score of each file over its last `runs` runs of unchanged content, flakiest first.
+        """
+        rows = []
+        for file in [history_key(file) for file in files] if files is not None else self.files():
+            statuses = [run["status"] for run in self._latestVersionRuns(file, runs)]
+            rows.append({"file": file, "runs": len(statuses), "failures": statuses.count('Failed'),
+                         "score": flip_score(statuses)})
+        return sorted(rows, key=lambda row: row["score"], reverse=True)
+
+    def stepFlakiness(self, file, runs=20):
+        """
+        Flip score of each step of a file over the same runs as fileFlakiness, flakiest first.
+        """
+        file = history_key(file)
+        versionRuns = self._latestVersionRuns(file, runs)
+        if not versionRuns:
+            return []
+        statuses = {}
+        ids = [run["id"] for run in versionRuns]
+        for row in self._query(f"SELECT step, status FROM steps WHERE run IN ({', '.join('?' * len(ids))}) "
+                               "ORDER BY run", ids):
+            statuses.setdefault(row["step"], []).append(row["status"])
+        rows = [{"file": file, "step": step, "runs": len(values), "failures": values.count('Failed'),
+                 "score": flip_score(values)} for step, values in statuses.items()]
+        return sorted(rows, key=lambda row: row["score"], reverse=True)
+
+    def flakyFiles(self, files, threshold=FLAKY_THRESHOLD, runs=20, min_runs=FLAKY_MIN_RUNS):
+        """
+        {path: score} of the given files whose flip score reaches threshold over at least min_runs runs, keyed by
+        the paths as given, so a sequence finds its own entries.
+        """
+        paths = {history_key(file): file for file in files}
+        return {paths[row["file"]]: row["score"] for row in self.fileFlakiness(list(paths), runs) if
+                row["runs"] >= min_runs and row["score"] >= threshold}
+
+    def close(self):
+        self.connection.close()
+
+
+def load_flaky_files(paths, threshold=FLAKY_THRESHOLD, runs=20, path=None):
+    history = RunHistory(path)
+    try:
+        return history.flakyFiles(paths, threshold, runs)
+    finally:
+        history.close()
@@ -0,0 +1,100 @@
+import os
+import shutil
+
+# Driver executables looked up on PATH when no driver location is configured.
+DRIVER_NAMES = {"Chrome": "chromedriver", "Edge": "msedgedriver"}
+
+# Preferences setting holding the driver location of each browser.
+DRIVER_SETTINGS = {"Chrome": "driverLocation", "Edge": "msedgeLocation"}
+
+NO_PROFILE = "None"
+
+
+def parse_window_size(text):
+    """
+    Parse "1920x1080" into (1920, 1080). An empty size or "default" keeps the browser's own window size (None).
+    """
+    text = (text or "").strip().lower()
+    if text in ("", "default"):
+        return None
+    try:
+        width, height = (int(part) for part in text.replace(" ", "").split("x"))
+    except ValueError:
+        raise ValueError(f"Window size must look like 1920x1080, not '{text}'")
+    if width < 1 or height < 1:
+        raise ValueError(f"Window size {text} is too small")
+    return width, height
+
+
+class LaunchProfile:
+    """
+    How to start a local browser: the driver and browser binary to use, the browser options and the window size.
+    Profiles are saved by name in the "launchProfiles" setting.
+    """
+
+    def __init__(self, name, browser, driver_path="", binary="", options=(), window_size=None):
+        self.name = name
+        self.browser = browser
+        self.driverPath = driver_path
+        self.binary = binary
+        self.options = list(options)
+        self.windowSize = window_size
+
+    @property
+    def key(self):
+        # Everything that goes into the driver path and options objects; the window size is applied per session.
+        return self.browser, self.driverPath, self.binary, tuple(self.options)
+
+    def toDict(self):
+        return {"browser": self.browser, "driverPath": self.driverPath, "binary": self.binary,
+                "options": self.options,
+                "windowSize": f"{self.windowSize[0]}x{self.windowSize[1]}" if self.windowSize else ""}
+
+    @classmethod
+    def fromDict(cls, name, data):
+        return cls(name, data.get("browser", "Chrome"), data.get("driverPath", ""), data.get("binary", ""),
+                   data.get("options", []), parse_window_size(data.get("windowSize", "")))
+
+
+def saved_profiles(settings):
+    return {name: LaunchProfile.fromDict(name, data) for name, data in settings.get("launchProfiles", {}).items()}
+
+
+def selected_profile(settings):
+    """
+    The launch profile chosen in Preferences or with --launch-profile, or None.
+    """
+    name = settings.get("launchProfile") or NO_PROFILE
+    if name == NO_PROFILE:
+        return None
+    profiles = saved_profiles(settings)
+    if name not in profiles:
+        raise ValueError(f"No launch profile named '{name}'")
+    return profiles[name]
+
+
+def launch_profile(settings, browser, options, window_size=None):
+    """
+    The profile a local session of browser with the given options starts from. The driver, binary and default
+    window size come from the selected launch profile when it is for the same browser, else from Preferences; so do
+    the options when none are given.
+    """
+    selected = selected_profile(settings)
+    if selected is not None and selected.browser == browser:
+        return LaunchProfile(selected.name, browser, selected.driverPath, selected.binary, options or selected.options,
+                             window_size or selected.windowSize)
+    return LaunchProfile("", browser, settings.get(DRIVER_SETTINGS.get(browser, ""), ""), options=options,
+                         window_size=window_size)
+
+
+def resolve_driver(browser, path):
+    """
+    Absolute path of the driver executable: the configured path, or the browser's driver found on PATH.
+    """
+    candidate = path or DRIVER_NAMES.get(browser, "")
+    if candidate and os.path.isfile(candidate):
+        return os.path.abspath(candidate)
+    found = shutil.which(candidate) if candidate else None
+    if not found:
+        raise ValueError(f"Invalid {browser} driver location: {candidate or 'none configured'}")
+    return found
@@ -0,0 +1,113 @@
+import itertools
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+BROWSERS = ["Chrome", "Edge"]
+
+# Profile name of the browser options checked in the GUI, or given with --option on the command line.
+CURRENT_PROFILE = "Current Options"
+
+
+def parse_profile(text, saved=None):
+    """
+    A profile argument: "name=Option A,Option B" defines the profile inline, a bare name is looked up in saved
+    ({name: [options]}).
+    """
+    name, sep, options = text.partition("=")
+    if sep:
+        return name.strip(), [option.strip() for option in options.split(",") if option.strip()]
+    if name not in (saved or {}):
+        raise ValueError(f"No browser option profile named '{name}'")
+    return name, list(saved[name])
+
+
+class MatrixCell:
+    """
+    One combination of browser, browser option profile and window size.
+    """
+
+    def __init__(self, browser, profile, options, window_size=None):
+        self.browser = browser
+        self.profile = profile
+        self.options = list(options)
+        self.windowSize = window_size
+
+    @property
+    def label(self):
+        size = f"{self.windowSize[0]}x{self.windowSize[1]}" if self.windowSize else "default size"
+        return f"{self.browser} / {self.profile} / {size}"
+
+
+def matrix_cells(browsers, profiles, window_sizes=None):
+    """
+    Every combination of the browsers, the (name, options) profiles and the window sizes, browser first.
+    """
+    if not browsers or not profiles:
+        raise ValueError("A matrix needs at least one browser and one option profile")
+    unknown = [browser for browser in browsers if browser not in BROWSERS]
+    if unknown:
+        raise ValueError(f"Unsupported browser {', '.join(unknown)}; use {' or '.join(BROWSERS)}")
+    return [MatrixCell(browser, name, options, size) for browser, (name, options), size in
+            itertools.product(browsers, profiles, window_sizes or [None])]
+
+
+class MatrixRun:
+    """
+    Runs the same test once per matrix cell, each cell in its own browser sessions and all cells concurrently,
+    so the whole matrix takes about as long as its slowest cell.
+
+    run_cell(cell) runs the test for one cell and returns its (step, status, details) results; it is called
+    from worker threads.
+    """
+
+    def __init__(self, cells, run_cell, logger, run_log=None):
+        labels = [cell.label for cell in cells]
+        if len(set(labels)) != len(labels):
+            raise ValueError("The matrix lists the same browser, profile and window size more than once")
+        self.cells = cells
+        self.runCell = run_cell
+        self.logger = logger
+        self.runLog = run_log
+        self.cellResults = {}
+        self.cellDurations = {}
+
+    def runOne(self, cell):
+        if self.runLog:
+            self.runLog.context.update(cell=cell.label)
+        self.logger.info(f"Matrix cell {cell.label} started.")
+        started = time.monotonic()
+        try:
+            self.cellResults[cell.label] = self.runCell(cell)
+        finally:
+            self.cellDurations[cell.label] = time.monotonic() - started
+        results = self.cellResults[cell.label]
+        return bool(results) and all(status == 'Passed' for _, status, *_ in results)
+
+    def run(self, max_workers=None, on_wait=None):
+        """
+        Run every cell, at most max_workers at once (all of them by default). Returns {label: 'Passed' | 'Failed'}.
+        """
+        status = {}
+        with ThreadPoolExecutor(max_workers=max(1, max_workers or len(self.cells))) as executor:
+            running = {executor.submit(self.runOne, cell): cell for cell in self.cells}
+            while running:
+                finished, _ = wait(running, timeout=0.1, return_when=FIRST_COMPLETED)
+                if on_wait:
+                    on_wait()
+                for future in finished:
+                    cell = running.pop(future)
+                    try:
+                        passed = future.result()
+                    except Exception as e:
+                        self.logger.error(f"Matrix cell {cell.label} failed to run: {e}")
+                        passed = False
+                    status[cell.label] = 'Passed' if passed else 'Failed'
+                    self.logger.info(f"Matrix cell {cell.label}: {status[cell.label]} in "
+                                     f"{self.cellDurations.get(cell.label, 0):.1f} s")
+        return status
+
+    def results(self):
+        """
+        Results of each cell in matrix order; cells that could not start have none.
+        """
+        return [self.cellResults.get(cell.label, []) for cell in self.cells]
@@ -0,0 +1,171 @@
+import json
+import threading
+import time
+import urllib.request
+
+EXECUTORS = ["Local", "Remote"]
+
+# browserName of each browser in WebDriver capabilities and Grid slot stereotypes.
+BROWSER_NAMES = {"Chrome": "chrome", "Edge": "MicrosoftEdge"}
+
+# Capacity of a node that does not report its slots (Selenium 3 hubs, other providers) and gives none itself.
+DEFAULT_SLOTS = 1
+
+
+def parse_nodes(entries):
+    """
+    Parse remote node entries, "http://grid:4444" or "http://grid:4444=8", into (url, slots or None) pairs.
+    A comma-separated string is split into entries.
+    """
+    if isinstance(entries, str):
+        entries = entries.split(",")
+    nodes = []
+    for entry in entries:
+        entry = entry.strip()
+        if not entry:
+            continue
+        url, sep, slots = entry.rpartition("=")
+        if sep and slots.strip().isdigit():
+            nodes.append((url.strip().rstrip("/"), int(slots)))
+        else:
+            nodes.append((entry.rstrip("/"), None))
+    return nodes
+
+
+def grid_capacity(status):
+    """
+    {browserName: slots} of a Grid 4 or standalone server from its /status response, counting the nodes that are
+    up and no more slots per node than its maxSessions. None when the response does not list nodes.
+    """
+    nodes = (status.get("value") or {}).get("nodes")
+    if nodes is None:
+        return None
+    capacity = {}
+    for node in nodes:
+        if node.get("availability", "UP") != "UP":
+            continue
+        slots = {}
+        for slot in node.get("slots", []):
+            name = slot.get("stereotype", {}).get("browserName")
+            if name:
+                slots[name] = slots.get(name, 0) + 1
+        for name, count in slots.items():
+            capacity[name] = capacity.get(name, 0) + min(count, node.get("maxSessions", count))
+    return capacity
+
+
+def query_capacity(url, timeout=5.0):
+    with urllib.request.urlopen(f"{url}/status", timeout=timeout) as response:
+        return grid_capacity(json.load(response))
+
+
+class RemoteNode:
+    def __init__(self, url, capacity):
+        self.url = url
+        # {browserName: slots}; "*" applies to every browser.
+        self.capacity = capacity
+        self.active = 0
+
+    def slots(self, browser):
+        name = BROWSER_NAMES.get(browser, browser)
+        return self.capacity.get(name, self.capacity.get("*", 0))
+
+
+class NodeLease:
+    """
+    A slot taken on a node; release() gives it back and may be called more than once.
+    """
+
+    def __init__(self, pool, node):
+        self.pool = pool
+        self.node = node
+        self.released = False
+
+    @property
+    def url(self):
+        return self.node.url
+
+    def release(self):
+        with self.pool.condition:
+            if self.released:
+                return
+            self.released = True
+            self.node.active -= 1
+            self.pool.condition.notify_all()
+
+
+class NodePool:
+    """
+    Remote WebDriver endpoints (Grid hubs, standalone servers or single nodes) and how many sessions each can run.
+
+    acquire() hands out the node with the largest share of its slots free, so sessions spread over the nodes in
+    proportion to their capacity, and blocks while every node that runs the browser is full. A Grid hub counts
+    as one node holding the slots of all the nodes behind it; the hub routes each session on from there.
+    """
+
+    def __init__(self, nodes, logger=None, queue_timeout=300.0):
+        self.nodes = nodes
+        self.logger = logger
+        self.queueTimeout = queue_timeout
+        self.condition = threading.Condition()
+
+    @classmethod
+    def discover(cls, entries, logger=None, queue_timeout=300.0, timeout=5.0):
+        """
+        Build a pool from parse_nodes entries, asking each server without a given slot count for its capacity.
+        """
+        nodes = []
+        for url, slots in parse_nodes(entries):
+            if slots is not None:
+                capacity = {"*": slots}
+            else:
+                try:
+                    capacity = query_capacity(url, timeout)
+                except Exception as e:
+                    if logger:
+                        logger.warning(f"Remote node {url} is not reachable and is left out: {e}")
+                    continue
+                if capacity is None:
+                    if logger:
+                        logger.warning(f"Remote node {url} does not report its slots; assuming {DEFAULT_SLOTS}. "
+                                       f"Give its capacity as {url}=<slots>.")
+                    capacity = {"*": DEFAULT_SLOTS}
+            if logger:
+                logger.info(f"Remote node {url}: " + ", ".join(
+                    f"{count} {'sessions of any browser' if name == '*' else name}"
+                    for name, count in capacity.items()))
+            nodes.append(RemoteNode(url, capacity))
+        if not nodes:
+            raise ValueError("No remote WebDriver node is available")
+        return cls(nodes, logger, queue_timeout)
+
+    def capacity(self, browser):
+        return sum(node.slots(browser) for node in self.nodes)
+
+    def acquire(self, browser):
+        candidates = [node for node in self.nodes if node.slots(browser) > 0]
+        if not candidates:
+            raise ValueError(f"No remote node runs {browser}")
+        deadline = time.monotonic() + self.queueTimeout
+        with self.condition:
+            while True:
+                free = [node for node in candidates if node.active < node.slots(browser)]
+                if free:
+                    node = max(free, key=lambda node: (1 - node.active / node.slots(browser),
+                                                       node.slots(browser) - node.active))
+                    node.active += 1
+                    return NodeLease(self, node)
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(f"Every remote {browser} slot stayed busy for {self.queueTimeout:g} seconds")
+                self.condition.wait(remaining)
+
+
+def node_pool_from_settings(settings, logger=None):
+    """
+    The node pool configured in settings, or None when sessions run on this machine.
+    """
+    if settings.get("executor", "Local") != "Remote":
+        return None
+    return NodePool.discover(settings.get("remoteNodes") or [], logger,
+                             float(settings.get("remoteQueueTimeout", 300)))
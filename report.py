@@ -0,0 +1,269 @@
+# Navigation and paint timings in milliseconds, and the summary label of each.
+TIMING_METRICS = [
+    ("timeToFirstByte", "TTFB"),
+    ("firstPaint", "FP"),
+    ("firstContentfulPaint", "FCP"),
+    ("domContentLoaded", "DCL"),
+    ("load", "Load"),
+]
+
+# Chrome's Performance.getMetrics values worth a column in the report.
+CDP_METRICS = ["Nodes", "JSHeapUsedSize", "LayoutCount", "RecalcStyleCount", "LayoutDuration", "ScriptDuration",
+               "TaskDuration"]
+
+
+BUDGET_UNITS = {
+    'Assert Page Load Under': 'ms',
+    'Assert Step Duration Under': 'ms',
+    'Assert Transfer Size Under': 'KB',
+}
+
+
+def format_step_text(step):
+    # STEP
+    action = step[0]
+    if action == 'Sleep':
+        return f'Sleep for {step[1]} seconds'
+    elif action in ['Click Element', 'Input Text']:
+        return f'{action} at {step[1]}: {step[2]}'
+    elif action == 'Navigate to URL':
+        return f'{action}: {step[1]}{navigation_text(step)}'
+    elif action == 'Execute Python Script':
+        return f'{action}: {step[1]}{script_text(step)}'
+    elif action == 'Execute JavaScript':
+        return f'{action}: {step[1]}'
+    elif action == 'Take Screenshot':
+        return f'Take screenshot: {step[1]}{scope_text(step, 2)}'
+    elif action == 'Maximize Window':
+        return 'Maximize Window'
+    elif action == 'Compare Images':
+        return f'Comparing images: {step[1]} and {step[2]}{scope_text(step, 4)}.'
+    elif action in BUDGET_UNITS:
+        return f'{action} {step[1]} {BUDGET_UNITS[action]}'
+    else:
+        return 'Unknown Action'
+
+
+def navigation_text(step):
+    """
+    Suffix describing a navigate step's own page load strategy and ready condition, empty when it uses the run's.
+    """
+    details = []
+    if len(step) > 3 and step[3]:
+        details.append(step[3])
+    if len(step) > 4 and step[4]:
+        details.append(f"ready on {step[4]}" + (f" {step[5]}: {step[6]}" if step[4] == "Element Present" else ""))
+    return f" ({', '.join(details)})" if details else ""
+
+
+def scope_text(step, index):
+    """
+    Suffix naming the element or clip region a screenshot step captures, whose fields start at index; empty for
+    the full viewport.
+    """
+    if len(step) <= index + 1 or not step[index]:
+        return ""
+    if step[index] == 'Clip':
+        return f" (clip {step[index + 1]})"
+    return f" (element {step[index]}: {step[index + 1]})"
+
+
+def script_text(step):
+    """
+    Suffix describing where a Python script step runs, its timeout and result variable, empty for the defaults.
+    """
+    details = []
+    if len(step) > 3 and step[3]:
+        details.append(step[3])
+    if len(step) > 4 and step[4]:
+        details.append(f"timeout {step[4]}s")
+    if len(step) > 5 and step[5]:
+        details.append(f"result in {step[5]}")
+    return f" ({', '.join(details)})" if details else ""
+
+
+def status_text(status, details=None):
+    details = details or {}
+    text = status
+    retries = details.get("attempts", 1) - 1
+    if retries > 0:
+        text += f" after {retries} {'retry' if retries == 1 else 'retries'}"
+    budget = details.get("budget")
+    if budget:
+        text += f" ({budget['measured']:.0f} of {budget['budget']:g} {budget['unit']})"
+    return text
+
+
+def result_details(result):
+    # Results saved before details were recorded are plain (step, status) pairs.
+    return result[2] if len(result) > 2 else {}
+
+
+def metrics_summary(metrics):
+    if not metrics:
+        return ""
+    parts = [f"{label} {metrics[key]:.0f} ms" for key, label in TIMING_METRICS if metrics.get(key)]
+    if metrics.get("transferSize"):
+        parts.append(f"{metrics['transferSize'] / 1024:.0f} KB in {metrics.get('requests', 0)} requests")
+    return ", ".join(parts)
+
+
+def result_rows(results):
+    """
+    [step text, status text] rows for write_report from (step, status, details) results, with a performance
+    summary as a third column when any step collected metrics.
+    """
+    withMetrics = any(result_details(result).get("metrics") for result in results)
+    rows = []
+    for result in results:
+        details = result_details(result)
+        row = [format_step_text(result[0]), status_text(result[1], details)]
+        if withMetrics:
+            row.append(metrics_summary(details.get("metrics")))
+        rows.append(row)
+    return rows
+
+
+def performance_rows(results):
+    """
+    One row per step that collected metrics: step text, the timings, transfer size and request count, then the
+    CDP metrics. The first row holds the column names.
+    """
+    rows = []
+    for result in results:
+        metrics = result_details(result).get("metrics")
+        if not metrics:
+            continue
+        cdp = metrics.get("cdp", {})
+        rows.append([format_step_text(result[0])] + [metrics.get(key) for key, _ in TIMING_METRICS] +
+                    [metrics.get("transferSize"), metrics.get("requests")] + [cdp.get(name) for name in CDP_METRICS])
+    if not rows:
+        return []
+    header = ["Step"] + [f"{label} (ms)" for _, label in TIMING_METRICS] + ["Transfer Size (bytes)",
+                                                                           "Requests"] + CDP_METRICS
+    return [header] + rows
+
+
+def matrix_rows(labels, cell_results, cell_durations=None):
+    """
+    Rows for write_matrix_report: a header row with one column per matrix cell, then [step text, status of the step
+    in each cell...] rows with each step's duration, and the outcome and duration of each cell at the end.
+    Steps are matched by position; a cell that stopped early shows 'Not run' for the rest.
+    """
+    longest = max(cell_results, key=len, default=[])
+    rows = [["Step"] + list(labels)]
+    for index, result in enumerate(longest):
+        row = [format_step_text(result[0])]
+        for results in cell_results:
+            if index >= len(results):
+                row.append('Not run')
+                continue
+            details = result_details(results[index])
+            text = status_text(results[index][1], details)
+            if details.get("duration") is not None:
+                text += f", {details['duration']:,.0f} ms"
+            row.append(text)
+        rows.append(row)
+    rows.append(["Result"] + ['Passed' if results and all(result[1] == 'Passed' for result in results) else 'Failed'
+                              for results in cell_results])
+    if cell_durations:
+        rows.append(["Duration"] + [f"{duration:.1f} s" if duration is not None else "" for duration in
+                                    cell_durations])
+    return rows
+
+
+def status_fill(value):
+    from openpyxl.styles import PatternFill
+
+    if str(value).startswith("Passed"):
+        return PatternFill(start_color='C6EFCE', end_color='C6EFCE', fill_type='solid')
+    if str(value).startswith("Failed"):
+        return PatternFill(start_color='FFC7CE', end_color='FFC7CE', fill_type='solid')
+    return None
+
+
+def write_matrix_report(path, test_name, description, rows, cell_options):
+    """
+    Write an Excel report of a matrix run: test details, then the matrix_rows table with one status column per
+    cell, then the browser options of each cell.
+    """
+    from openpyxl import Workbook
+    from openpyxl.styles import Font
+
+    wb = Workbook()
+    ws = wb.active
+    ws.append(["Test Name", test_name])
+    ws.append(["Description", description])
+    ws.append([])
+    header = ws.max_row + 1
+    for row in rows:
+        ws.append(row)
+    ws.append([])
+    ws.append(["Browser Options"] + [', '.join(options) or 'None' for options in cell_options])
+
+    for row in ws.iter_rows(min_row=header):
+        for cell in row:
+            if cell.row == header or cell.column == 1 and cell.value in ("Result", "Duration", "Browser Options"):
+                cell.font = Font(bold=True)
+            elif cell.column > 1 and cell.row > header:
+                fill = status_fill(cell.value)
+                if fill:
+                    cell.fill = fill
+    ws.column_dimensions["A"].width = 60
+    wb.save(path)
+
+
+def write_report(path, test_name, description, rows, browser_options, performance=None):
+    """
+    Write an Excel report: test details, one [step text, status] row per step, then the browser options.
+    Rows may carry a third, performance column. performance, from performance_rows, goes on its own sheet.
+    """
+    import pandas as pd
+    from openpyxl import Workbook
+    from openpyxl.styles import Font
+    from openpyxl.utils.dataframe import dataframe_to_rows
+
+    data = []
+
+    # Adding test details
+    data.append(["Test Name", test_name])
+    data.append(["Description", description])
+    data.append(["", ""])  # Spacer row
+
+    # Collecting steps and statuses
+    data.extend(rows)
+    data.append(["", ""])  # Spacer row
+
+    columns = ["Step", "Status"] + (["Performance"] if any(len(row) > 2 for row in rows) else [])
+    data = [list(row) + [""] * (len(columns) - len(row)) for row in data]
+    df = pd.DataFrame(data, columns=columns)
+
+    browser_options_row = ["Browser Options", ', '.join(browser_options)] if browser_options else [
+        "Browser Options", 'None']
+    df.loc[df.index.max() + 1] = browser_options_row + [""] * (len(columns) - 2)
+
+    # Create a new Excel workbook
+    wb = Workbook()
+    ws = wb.active
+
+    # Convert DataFrame to Excel rows
+    for r_idx, row in enumerate(dataframe_to_rows(df, index=False, header=True)):
+        for c_idx, value in enumerate(row, 1):
+            cell = ws.cell(row=r_idx + 1, column=c_idx, value=value)
+
+            # Applying styles
+            if r_idx == 0:  # Header row
+                cell.font = Font(bold=True)
+            if c_idx == 2 and status_fill(value):  # Status column
+                cell.fill = status_fill(value)
+
+    if performance:
+        performance_sheet = wb.create_sheet("Performance")
+        for r_idx, row in enumerate(performance, 1):
+            for c_idx, value in enumerate(row, 1):
+                cell = performance_sheet.cell(row=r_idx, column=c_idx, value=value)
+                if r_idx == 1:
+                    cell.font = Font(bold=True)
+
+    # Save the workbook
+    wb.save(path)
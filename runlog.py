@@ -0,0 +1,132 @@
+import copy
+import gzip
+import json
+import logging
+import os
+import queue
+import shutil
+import threading
+import uuid
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+RUN_FIELDS = ("run_id", "file", "cell", "step", "action")
+
+
+def new_run_id():
+    return uuid.uuid4().hex[:12]
+
+
+class RunContext(logging.Filter):
+    """
+    Stamp run id, file, matrix cell, step index and action onto every record passing through.
+    Filters run in the thread that emits the record, and the step fields are kept per thread, so the values
+    reflect the step that thread is executing even when sequencer files run concurrently.
+    """
+
+    def __init__(self, run_id, file=None):
+        super().__init__()
+        self.run_id = run_id
+        self.file = file
+        self.local = threading.local()
+
+    def update(self, **fields):
+        for key, value in fields.items():
+            setattr(self.local, key, value)
+
+    def filter(self, record):
+        for field in RUN_FIELDS:
+            if not hasattr(record, field):
+                setattr(record, field, getattr(self.local, field, getattr(self, field, None)))
+        return True
+
+
+class JsonLinesFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for field in RUN_FIELDS:
+            entry[field] = getattr(record, field, None)
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class RunQueueHandler(QueueHandler):
+    """
+    QueueHandler that keeps the message and the traceback apart. The stock prepare() folds the traceback into the
+    message and drops exc_info; here the formatted traceback travels in exc_text, which JsonLinesFormatter reads.
+    """
+    tracebackFormatter = logging.Formatter()
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            # Formatted on the emitting thread; exc_info itself does not survive the trip through the queue.
+            record.exc_text = self.tracebackFormatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def _gzip_namer(name):
+    return name + ".gz"
+
+
+def _gzip_rotator(source, dest):
+    with open(source, "rb") as src, gzip.open(dest, "wb") as dst:
+        shutil.copyfileobj(src, dst)
+    os.remove(source)
+
+
+class RunLog:
+    """
+    Per-run JSON-lines log written by a background QueueListener.
+    The logging thread only enqueues records; formatting and file I/O happen on the listener thread.
+    """
+
+    def __init__(self, logger, log_dir, run_id=None, file=None, compress=False, max_bytes=5 * 1024 * 1024,
+                 backup_count=5):
+        self.logger = logger
+        self.run_id = run_id or new_run_id()
+        self.context = RunContext(self.run_id, file)
+
+        os.makedirs(log_dir, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        self.path = os.path.join(log_dir, f"atom8_{stamp}_{self.run_id}.jsonl")
+
+        self.fileHandler = RotatingFileHandler(self.path, maxBytes=max_bytes, backupCount=backup_count,
+                                               encoding="utf-8", delay=True)
+        self.fileHandler.setFormatter(JsonLinesFormatter())
+        if compress:
+            self.fileHandler.namer = _gzip_namer
+            self.fileHandler.rotator = _gzip_rotator
+
+        self.queue = queue.SimpleQueue()
+        self.queueHandler = RunQueueHandler(self.queue)
+        self.queueHandler.addFilter(self.context)
+        self.listener = QueueListener(self.queue, self.fileHandler, respect_handler_level=True)
+
+    def start(self):
+        self.logger.addHandler(self.queueHandler)
+        self.listener.start()
+        return self
+
+    def stop(self):
+        self.logger.removeHandler(self.queueHandler)
+        self.listener.stop()
+        self.fileHandler.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
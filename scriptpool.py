@@ -0,0 +1,95 @@
+import atexit
+import contextlib
+import io
+import multiprocessing
+import os
+import threading
+import traceback
+
+# Where an Execute Python Script step runs. "In Process" shares the run's namespace and driver; the others run in
+# a worker process, "Background" without waiting, so later browser steps run while the script does.
+RUN_MODES = ["In Process", "Process Pool", "Background"]
+
+_compiled_scripts = {}
+_compiled_scripts_lock = threading.Lock()
+
+
+def compile_script(path):
+    """
+    Compiled code of a Python script, cached by path and reused until the file's modification time or size changes.
+    """
+    stat = os.stat(path)
+    key = (stat.st_mtime_ns, stat.st_size)
+    with _compiled_scripts_lock:
+        cached = _compiled_scripts.get(path)
+        if cached and cached[0] == key:
+            return cached[1]
+    with open(path, "rb") as file:
+        code = compile(file.read(), path, "exec")
+    with _compiled_scripts_lock:
+        _compiled_scripts[path] = (key, code)
+    return code
+
+
+def run_script(path, step, variables):
+    """
+    Run a script in a worker process. The script sees step and a copy of the run's variables, and may set result.
+    Returns the result, the variables as the script left them, its captured output and the traceback if it raised.
+    """
+    namespace = {"__name__": "__atom8_script__", "__file__": path, "step": step, "variables": variables,
+                 "result": None}
+    stdout, stderr = io.StringIO(), io.StringIO()
+    error = None
+    with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+        try:
+            exec(compile_script(path), namespace)
+        except Exception:
+            error = traceback.format_exc()
+    return {"result": namespace.get("result"), "variables": variables, "stdout": stdout.getvalue(),
+            "stderr": stderr.getvalue(), "error": error}
+
+
+class ScriptPool:
+    """
+    Reusable pool of worker processes for Python script steps. Workers are started on first use and kept for
+    later steps; a script that overruns its timeout takes the whole pool down with it, and the next script starts
+    a fresh one.
+    """
+
+    def __init__(self, processes=None):
+        self.processes = processes or max(1, (os.cpu_count() or 2) - 1)
+        self.pool = None
+        # Bumped on every restart, so scripts submitted to a terminated pool know they will never finish.
+        self.generation = 0
+        self.lock = threading.Lock()
+
+    def submit(self, path, step, variables):
+        with self.lock:
+            if self.pool is None:
+                # Spawned rather than forked: forking a process that runs Qt and driver threads is unsafe.
+                self.pool = multiprocessing.get_context("spawn").Pool(self.processes)
+            return self.generation, self.pool.apply_async(run_script, (path, list(step), dict(variables)))
+
+    def restart(self):
+        with self.lock:
+            if self.pool is not None:
+                self.pool.terminate()
+                self.pool.join()
+                self.pool = None
+            self.generation += 1
+
+    def close(self):
+        self.restart()
+
+
+_shared_pool = None
+_shared_pool_lock = threading.Lock()
+
+
+def shared_pool(processes=None):
+    global _shared_pool
+    with _shared_pool_lock:
+        if _shared_pool is None:
+            _shared_pool = ScriptPool(processes)
+            atexit.register(_shared_pool.close)
+        return _shared_pool
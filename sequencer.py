@@ -0,0 +1,502 @@
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+
+import atm8file
+from settings import app_data_path
+
+SEQUENCE_VERSION = 2
+SHARD_RESULTS_VERSION = 1
+
+# What a sequence does with files the run history marks as flaky: run them as usual, run them after the other
+# files, leave them out, or rerun them on their own when they fail.
+FLAKY_POLICIES = ["run", "deprioritize", "quarantine", "isolate"]
+
+
+def load_sequence(path):
+    """
+    Read a .seq file. Version 1 files are a flat list of .atm8 paths that run one after another in a single
+    browser session; version 2 files list each file with the files it requires.
+    """
+    with open(path, "r") as file:
+        content = json.load(file)
+    if isinstance(content, list):
+        return {"version": 1, "files": [{"path": file_name, "requires": []} for file_name in content]}
+    if not isinstance(content, dict) or not isinstance(content.get("files"), list):
+        raise ValueError("Sequence content is not in the expected format")
+    files = []
+    for entry in content["files"]:
+        if isinstance(entry, str):
+            entry = {"path": entry}
+        if not isinstance(entry, dict) or "path" not in entry:
+            raise ValueError(f"Invalid sequence entry: {entry}")
+        files.append({"path": entry["path"], "requires": list(entry.get("requires", []))})
+    return dict(content, files=files)
+
+
+def save_sequence(path, files, **options):
+    with atm8file.atomic_write(path) as file:
+        json.dump(dict(options, version=SEQUENCE_VERSION, files=files), file, indent=2)
+
+
+def resolve_dependencies(files):
+    """
+    Map each file path to the paths it requires. A requirement may name a file by its full path or its file name.
+    """
+    paths = [entry["path"] for entry in files]
+    by_name = {}
+    for file_path in paths:
+        by_name.setdefault(os.path.basename(file_path), []).append(file_path)
+
+    graph = {}
+    for entry in files:
+        requires = []
+        for requirement in entry.get("requires", []):
+            if requirement in paths:
+                requires.append(requirement)
+            elif len(by_name.get(requirement, [])) == 1:
+                requires.append(by_name[requirement][0])
+            elif requirement in by_name:
+                raise ValueError(f"Requirement '{requirement}' of {entry['path']} matches several files")
+            else:
+                raise ValueError(f"{entry['path']} requires '{requirement}', which is not in the sequence")
+        graph[entry["path"]] = requires
+    topological_order(graph)
+    return graph
+
+
+def topological_order(graph):
+    order = []
+    state = {}
+
+    def visit(node, chain):
+        if state.get(node) == "done":
+            return
+        if state.get(node) == "visiting":
+            raise ValueError("Sequence dependencies form a cycle: " + " -> ".join(chain + [node]))
+        state[node] = "visiting"
+        for requirement in graph[node]:
+            visit(requirement, chain + [node])
+        state[node] = "done"
+        order.append(node)
+
+    for node in graph:
+        visit(node, [])
+    return order
+
+
+def parse_shard(text):
+    """
+    Parse 'i/n' (1-based) into a 0-based shard index and the shard count.
+    """
+    try:
+        index, count = (int(part) for part in text.split("/"))
+    except ValueError:
+        raise ValueError(f"Shard must look like i/n, e.g. 1/4, not '{text}'")
+    if count < 1 or not 1 <= index <= count:
+        raise ValueError(f"Shard {text} is out of range")
+    return index - 1, count
+
+
+def shard_files(files, index, count, durations=None):
+    """
+    Entries of the sequence that belong to shard index (0-based) of count. Every machine computes the same split
+    from the same sequence and durations, so shards never overlap and together cover every file.
+
+    Files connected by requirements stay on one shard. Groups are dealt out longest first to the least loaded
+    shard, using durations ({path: seconds}) where known and the mean known duration otherwise. Files keep their
+    sequence order within a shard.
+    """
+    paths = [entry["path"] for entry in files]
+    graph = resolve_dependencies(files)
+
+    group_of = {path: path for path in paths}
+
+    def root(path):
+        while group_of[path] != path:
+            group_of[path] = group_of[group_of[path]]
+            path = group_of[path]
+        return path
+
+    for path, requires in graph.items():
+        for requirement in requires:
+            group_of[root(requirement)] = root(path)
+
+    durations = durations or {}
+    known = [durations[path] for path in paths if path in durations]
+    default = sum(known) / len(known) if known else 1.0
+
+    groups = {}
+    for position, path in enumerate(paths):
+        group = groups.setdefault(root(path), {"first": position, "weight": 0.0, "paths": []})
+        group["weight"] += durations.get(path, default)
+        group["paths"].append(path)
+
+    loads = [0.0] * count
+    assigned = set()
+    for group in sorted(groups.values(), key=lambda group: (-group["weight"], group["first"])):
+        shard = min(range(count), key=lambda shard: (loads[shard], shard))
+        loads[shard] += group["weight"]
+        if shard == index:
+            assigned.update(group["paths"])
+    return [entry for entry in files if entry["path"] in assigned]
+
+
+def load_durations(path):
+    if not path or not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as file:
+        return json.load(file)
+
+
+def update_durations(path, measured, weight=0.5):
+    """
+    Fold newly measured file durations into the history at path as a moving average.
+    """
+    durations = load_durations(path)
+    for file_path, seconds in measured.items():
+        previous = durations.get(file_path)
+        durations[file_path] = seconds if previous is None else previous + weight * (seconds - previous)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with atm8file.atomic_write(path) as file:
+        json.dump(durations, file, indent=2, sort_keys=True)
+    return durations
+
+
+def save_shard_results(path, sequence_path, shard, run, status, browser_options):
+    """
+    Write the outcome of one shard so merge_shard_results can combine it with the others.
+    shard is the (index, count) pair from parse_shard.
+    """
+    files = []
+    for file_path in run.paths:
+        results = run.fileResults.get(file_path)
+        duration = run.fileDurations.get(file_path)
+        if results is None and run.checkpoint:
+            results = run.checkpoint.results(file_path)
+            duration = run.checkpoint.entries.get(file_path, {}).get("duration")
+        files.append({
+            "path": file_path,
+            "status": status.get(file_path, 'Skipped'),
+            "duration": duration,
+            "results": [[list(step), *rest] for step, *rest in results or []],
+        })
+    with atm8file.atomic_write(path) as file:
+        json.dump({
+            "version": SHARD_RESULTS_VERSION,
+            "sequence": sequence_path,
+            "shard": [shard[0] + 1, shard[1]],
+            "browserOptions": list(browser_options),
+            "files": files,
+        }, file, indent=2)
+
+
+def merge_shard_results(paths, sequence=None):
+    """
+    Combine shard result files into one result set. Raises ValueError when shards disagree on the shard count,
+    a shard is missing or given twice, or a file appears in more than one shard.
+
+    Returns a dict with the sequence path, the shard count, the browser options, and the file entries in sequence
+    order when the loaded sequence is given, otherwise in shard order.
+    """
+    shards = {}
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as file:
+            content = json.load(file)
+        if content.get("version") != SHARD_RESULTS_VERSION:
+            raise ValueError(f"{path} is not a shard results file")
+        index, count = content["shard"]
+        if index in shards:
+            raise ValueError(f"Shard {index}/{count} is given more than once")
+        shards[index] = content
+
+    counts = {content["shard"][1] for content in shards.values()}
+    if len(counts) != 1:
+        raise ValueError("Shard results come from runs with different shard counts")
+    count = counts.pop()
+    missing = [str(index) for index in range(1, count + 1) if index not in shards]
+    if missing:
+        raise ValueError(f"Missing results for shard {', '.join(missing)} of {count}")
+
+    files = {}
+    for index in sorted(shards):
+        for entry in shards[index]["files"]:
+            if entry["path"] in files:
+                raise ValueError(f"{entry['path']} appears in more than one shard")
+            files[entry["path"]] = entry
+
+    order = [entry["path"] for entry in sequence["files"]] if sequence else list(files)
+    return {
+        "sequence": shards[1]["sequence"],
+        "shards": count,
+        "browserOptions": shards[1].get("browserOptions", []),
+        "files": [files[path] for path in order if path in files],
+    }
+
+
+def run_serial(paths, run_file, done=None, on_done=None, logger=None):
+    """
+    Run files one after another. A failed file does not stop the files after it.
+    Files already present in done keep their status and are not run.
+    """
+    status = dict(done or {})
+    for path in paths:
+        if path in status:
+            continue
+        try:
+            passed = bool(run_file(path))
+        except Exception as e:
+            if logger:
+                logger.error(f"Error while running {path}: {e}")
+            passed = False
+        status[path] = 'Passed' if passed else 'Failed'
+        if on_done:
+            on_done(path, status[path])
+    return status
+
+
+def run_dag(graph, run_file, max_workers=4, on_wait=None, logger=None, done=None, on_done=None):
+    """
+    Run every file of the dependency graph, starting each one as soon as all the files it requires have passed.
+    Independent files run concurrently. A file whose requirement failed or was skipped is skipped.
+    Files already present in done keep their status and are not run.
+
+    run_file(path) must return True when the file passed. Returns {path: 'Passed' | 'Failed' | 'Skipped'}.
+    """
+    status = dict(done or {})
+    dependents = {node: [] for node in graph}
+    for node, requires in graph.items():
+        for requirement in requires:
+            dependents[requirement].append(node)
+
+    def ready(node):
+        return node not in status and all(status.get(requirement) == 'Passed' for requirement in graph[node])
+
+    def blocked(node):
+        return any(status.get(requirement) in ('Failed', 'Skipped', 'Quarantined') for requirement in graph[node])
+
+    def skip(node, reason):
+        if node in status:
+            return
+        status[node] = 'Skipped'
+        if logger:
+            logger.warning(f"Skipping {node}: {reason}")
+        if on_done:
+            on_done(node, 'Skipped')
+        for dependent in dependents[node]:
+            skip(dependent, f"requirement {node} did not pass")
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        running = {}
+
+        def submit(node):
+            status[node] = 'Running'
+            running[executor.submit(run_file, node)] = node
+
+        for node in graph:
+            if node in status:
+                continue
+            if blocked(node):
+                skip(node, "a requirement did not pass")
+            elif ready(node):
+                submit(node)
+
+        while running:
+            finished, _ = wait(running, timeout=0.1, return_when=FIRST_COMPLETED)
+            if on_wait:
+                on_wait()
+            for future in finished:
+                node = running.pop(future)
+                try:
+                    passed = bool(future.result())
+                except Exception as e:
+                    if logger:
+                        logger.error(f"Error while running {node}: {e}")
+                    passed = False
+                status[node] = 'Passed' if passed else 'Failed'
+                if on_done:
+                    on_done(node, status[node])
+                for dependent in dependents[node]:
+                    if not passed:
+                        skip(dependent, f"requirement {node} failed")
+                    elif ready(dependent):
+                        submit(dependent)
+    return status
+
+
+def checkpoint_path(paths):
+    key = hashlib.sha1(json.dumps(list(paths)).encode("utf-8")).hexdigest()[:16]
+    return app_data_path('checkpoints', f"{key}.jsonl")
+
+
+class Checkpoint:
+    """
+    Append-only journal of the files a sequence run has finished, with their step results.
+    Each line is flushed and synced as soon as its file finishes, so the journal survives a crash or reboot.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as file:
+                for line in file:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # A line cut short by a crash; everything before it is still valid.
+                        continue
+                    self.entries[entry["path"]] = entry
+
+    def record(self, file_path, status, results, duration=None):
+        entry = {
+            "path": file_path,
+            "status": status,
+            "results": [[list(step), *rest] for step, *rest in results],
+            "duration": duration,
+            "finished": datetime.now().isoformat(timespec="seconds"),
+        }
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as file:
+            file.write(json.dumps(entry) + "\n")
+            file.flush()
+            os.fsync(file.fileno())
+        self.entries[file_path] = entry
+
+    def reset(self):
+        self.entries = {}
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def done(self, mode, paths):
+        """
+        Statuses to treat as already known for a run mode: 'resume' skips files that passed, 'failed' runs only
+        the files that failed (and those skipped because of them), anything else runs everything.
+        """
+        statuses = {path: entry["status"] for path, entry in self.entries.items()}
+        if mode == "resume":
+            return {path: 'Passed' for path in paths if statuses.get(path) == 'Passed'}
+        if mode == "failed":
+            return {path: 'Passed' if statuses.get(path) == 'Passed' else 'Skipped' for path in paths if
+                    statuses.get(path) not in ('Failed', 'Skipped')}
+        return {}
+
+    def results(self, file_path):
+        # Entries written before step details were recorded hold [step, status] pairs.
+        return [(result[0], result[1], result[2] if len(result) > 2 else {}) for result in
+                self.entries.get(file_path, {}).get("results", [])]
+
+
+class SequenceRun:
+    """
+    Runs the files of a loaded sequence. Version 1 sequences share one browser session across all files, in
+    order; version 2 sequences run each file in its own session following the dependency graph.
+
+    new_driver() returns a WebDriver and new_engine(driver, header) an AutomationEngine for the file with that
+    .atm8 header; both are called from worker threads in graph mode.
+
+    flaky maps the paths the run history marks as flaky to their scores; the sequence's "flaky" option picks
+    the FLAKY_POLICIES entry applied to them, and "flakyReruns" how often an isolated file is retried.
+    """
+
+    def __init__(self, sequence, new_driver, new_engine, logger, checkpoint=None, run_log=None, flaky=None):
+        self.sequence = sequence
+        self.newDriver = new_driver
+        self.newEngine = new_engine
+        self.logger = logger
+        self.checkpoint = checkpoint
+        self.runLog = run_log
+        self.flaky = {path: score for path, score in (flaky or {}).items() if path in self.paths}
+        self.flakyPolicy = sequence.get("flaky", "run") if self.flaky else "run"
+        self.sharedDriver = None
+        self.fileResults = {}
+        self.fileDurations = {}
+        self.failedAttempts = {}
+
+    @property
+    def paths(self):
+        return [entry["path"] for entry in self.sequence["files"]]
+
+    def runFile(self, path):
+        if self.runLog:
+            self.runLog.context.update(file=path, step=None, action=None)
+        started = time.monotonic()
+        results = self.runFileOnce(path, isolated=False)
+        passed = all(status == 'Passed' for _, status, _ in results)
+        if not passed and self.flakyPolicy == "isolate" and path in self.flaky:
+            reruns = int(self.sequence.get("flakyReruns", 2))
+            for attempt in range(1, reruns + 1):
+                self.logger.warning(f"{path} is flaky (score {self.flaky[path]:.2f}); rerunning it in its own "
+                                    f"session ({attempt}/{reruns}).")
+                # Failed attempts are kept for the run history, so a pass on rerun does not hide the flakiness.
+                self.failedAttempts.setdefault(path, []).append(results)
+                results = self.runFileOnce(path, isolated=True)
+                passed = all(status == 'Passed' for _, status, _ in results)
+                if passed:
+                    break
+        self.fileResults[path] = results
+        self.fileDurations[path] = time.monotonic() - started
+        return passed
+
+    def runFileOnce(self, path, isolated):
+        with atm8file.open_steps(path) as reader:
+            if self.sequence["version"] == 1 and not isolated:
+                if self.sharedDriver is None:
+                    self.sharedDriver = self.newDriver()
+                driver = self.sharedDriver
+            else:
+                driver = self.newDriver()
+            try:
+                engine = self.newEngine(driver, reader.header)
+                return engine.run(reader, on_step=self.onStep)
+            finally:
+                if driver is not self.sharedDriver:
+                    driver.quit()
+
+    def onStep(self, index, step):
+        if self.runLog:
+            self.runLog.context.update(step=index + 1, action=step[0])
+
+    def record(self, path, status):
+        if self.checkpoint:
+            self.checkpoint.record(path, status, self.fileResults.get(path, []), self.fileDurations.get(path))
+
+    def run(self, mode="all", max_workers=4, on_wait=None):
+        done = self.checkpoint.done(mode, self.paths) if self.checkpoint else {}
+        if done:
+            self.logger.info(f"Checkpoint: {len(done)} of {len(self.paths)} files will not be run again.")
+        if self.flaky:
+            self.logger.info(f"{len(self.flaky)} flaky files, policy '{self.flakyPolicy}': {', '.join(self.flaky)}")
+        if self.flakyPolicy == "quarantine":
+            # Quarantined files are reported but not run; in graph mode the files that require them are skipped.
+            done = dict(done, **{path: 'Quarantined' for path in self.flaky if path not in done})
+        if self.sequence["version"] == 1:
+            if self.flakyPolicy == "deprioritize":
+                self.logger.info("Files of a shared-session sequence run in their listed order; not reordering.")
+            try:
+                return run_serial(self.paths, self.runFile, done, on_done=self.record, logger=self.logger)
+            finally:
+                if self.sharedDriver is not None:
+                    self.sharedDriver.quit()
+                    self.sharedDriver = None
+        graph = resolve_dependencies(self.sequence["files"])
+        if self.flakyPolicy == "deprioritize":
+            # Files are submitted in graph order, so flaky ones queue behind every other file that is ready.
+            graph = dict(sorted(graph.items(), key=lambda item: item[0] in self.flaky))
+        return run_dag(graph, self.runFile, max_workers=max_workers, on_wait=on_wait, logger=self.logger, done=done,
+                       on_done=self.record)
+
+    def results(self):
+        """
+        Step results of the whole sequence in file order, taking files that were not run from the checkpoint.
+        """
+        results = []
+        for path in self.paths:
+            if path in self.fileResults:
+                results.extend(self.fileResults[path])
+            elif self.checkpoint:
+                results.extend(self.checkpoint.results(path))
+        return results
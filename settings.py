@@ -0,0 +1,14 @@
+import json
+import os
+
+
+def app_data_path(*parts):
+    return os.path.join(os.getenv('APPDATA', os.path.expanduser('~')), 'Atom8', *parts)
+
+
+def load_settings():
+    try:
+        with open(app_data_path('settings.json'), 'r') as file:
+            return json.load(file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
@@ -0,0 +1,36 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import aql
+
+
+class CommentTest(unittest.TestCase):
+    def test_css_id_selector_is_not_a_comment(self):
+        program = aql.parse("click css #login\ntype css #user alice # the test account")
+        self.assertEqual(list(aql.steps(program)), [
+            ('Click Element', 'CSS Selector', '#login', '', ''),
+            ('Input Text', 'CSS Selector', '#user', 'alice', ''),
+        ])
+
+    def test_url_fragment_is_kept(self):
+        program = aql.parse("navigate https://example.test/page#top")
+        self.assertEqual(list(aql.steps(program)), [('Navigate to URL', 'https://example.test/page#top', '')])
+
+    def test_comment_lines_and_quoted_hashes(self):
+        program = aql.parse("# log in:\n  # indented\njs 'location.hash = \"# x\"'  # set the hash")
+        self.assertEqual(list(aql.steps(program)), [('Execute JavaScript', 'location.hash = "# x"', '')])
+
+
+class DatasetTest(unittest.TestCase):
+    def test_missing_csv_raises_aql_error_with_line(self):
+        program = aql.parse("sleep 1\nfor row in csv missing.csv:\n  sleep 1\nend", base_dir=os.path.dirname(__file__))
+        with self.assertRaises(aql.AqlError) as raised:
+            list(aql.steps(program))
+        self.assertEqual(raised.exception.line, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import atm8file
+
+
+class JournalRecoveryTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.steps = []
+
+    def insert(self, journal, count):
+        for _ in range(count):
+            step = ('Sleep', str(len(self.steps)))
+            edit = {"op": "insert", "index": len(self.steps), "steps": [atm8file.step_to_record(step)]}
+            atm8file.apply_edit({}, self.steps, edit)
+            journal.record(edit)
+        journal.flush({}, self.steps)
+
+    def test_recovered_journal_counts_only_edits_after_the_snapshot(self):
+        journal = atm8file.Journal(self.directory, compact_after=3).start()
+        self.insert(journal, 4)
+        self.insert(journal, 2)
+        self.assertEqual(journal.edits, 2)
+
+        _, _, steps, edits = atm8file.replay_journal(journal.path)
+        self.assertEqual((len(steps), edits), (6, 6))
+
+        recovered = atm8file.Journal(self.directory, compact_after=3)
+        recovered.edits = edits - recovered.snapshotEdits
+        self.assertEqual(recovered.edits, 2)
+        self.insert(recovered, 1)
+        self.assertEqual(recovered.snapshot, journal.snapshot)
+
+        self.insert(recovered, 1)
+        self.assertNotEqual(recovered.snapshot, journal.snapshot)
+        self.assertEqual(atm8file.replay_journal(recovered.path)[3], 8)
+
+
+if __name__ == '__main__':
+    unittest.main()
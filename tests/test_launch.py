@@ -0,0 +1,27 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import launch
+
+SETTINGS = {"launchProfile": "Headless", "driverLocation": "chromedriver",
+            "launchProfiles": {"Headless": {"browser": "Chrome", "options": ["Headless Mode"], "windowSize": "800x600"}}}
+
+
+class LaunchProfileTest(unittest.TestCase):
+    def test_selected_profile_options_are_used_when_none_are_given(self):
+        profile = launch.launch_profile(SETTINGS, "Chrome", [])
+        self.assertEqual((profile.name, profile.options, profile.windowSize), ("Headless", ["Headless Mode"], (800, 600)))
+
+    def test_given_options_override_the_profile(self):
+        self.assertEqual(launch.launch_profile(SETTINGS, "Chrome", ["No Sandbox"]).options, ["No Sandbox"])
+
+    def test_profile_of_another_browser_is_ignored(self):
+        profile = launch.launch_profile(SETTINGS, "Edge", [])
+        self.assertEqual((profile.name, profile.options), ("", []))
+
+
+if __name__ == '__main__':
+    unittest.main()